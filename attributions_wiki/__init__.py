@@ -0,0 +1,3 @@
+"""The AttributionsWiki application."""
+# Imported first so the startup clock starts before anything else is imported
+from . import startup
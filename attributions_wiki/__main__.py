@@ -0,0 +1,7 @@
+"""Command line entry point, ``python -m attributions_wiki serve``."""
+import sys
+
+from .server import main
+
+if __name__ == "__main__":
+    sys.exit(main())
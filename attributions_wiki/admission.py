@@ -0,0 +1,165 @@
+"""Admission control and load shedding for database-bound requests.
+
+Every worker admits at most ``max_in_flight`` database-bound requests at a time.
+Up to ``max_queue`` more wait in FIFO order for at most ``queue_timeout``
+seconds; anything beyond that is answered straight away with 503 and a
+``Retry-After`` header. Requests therefore never pile up on the Prisma pool
+until they all time out: latency for admitted requests stays bounded and the
+excess is shed early and cheaply.
+"""
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from . import config
+from .exceptions import OverloadedError
+from .metrics import count_exception
+
+# Routes that talk to the database; everything else (static files, probes) is not limited
+DB_BOUND_PREFIXES = ("/api/", "/templates/")
+
+
+class AdmissionController:
+    """A concurrency limit with a bounded, deadline-aware wait queue."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float) -> None:
+        """Initialize an AdmissionController.
+
+        Args:
+            max_in_flight: Requests allowed to run at the same time.
+            max_queue: Requests allowed to wait for a free slot.
+            queue_timeout: Seconds a request may wait before it is rejected.
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted_total = 0
+        self.rejected_queue_full_total = 0
+        self.rejected_timeout_total = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+
+    async def acquire(self) -> None:
+        """Wait for a slot.
+
+        Raises:
+            OverloadedError: If the wait queue is full or the queue deadline passes.
+        """
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected_queue_full_total += 1
+            raise OverloadedError("Too many queued requests")
+
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._slots.acquire()
+        except TimeoutError as err:
+            self.rejected_timeout_total += 1
+            raise OverloadedError("Timed out waiting for a free slot") from err
+        finally:
+            self.queued -= 1
+            waited = time.perf_counter() - started
+            self.queue_seconds_total += waited
+            self.queue_seconds_max = max(self.queue_seconds_max, waited)
+
+        self.in_flight += 1
+        self.admitted_total += 1
+
+    def release(self) -> None:
+        """Free the slot taken by ``acquire``."""
+        self.in_flight -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, Any]:
+        """Current queue depth and admission counters."""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "admitted_total": self.admitted_total,
+            "rejected_queue_full_total": self.rejected_queue_full_total,
+            "rejected_timeout_total": self.rejected_timeout_total,
+            "queue_seconds_total": round(self.queue_seconds_total, 6),
+            "queue_seconds_max": round(self.queue_seconds_max, 6),
+        }
+
+
+class AdmissionMiddleware:
+    """Run database-bound requests through an AdmissionController."""
+
+    def __init__(
+        self,
+        app: Any,
+        controller: AdmissionController,
+        retry_after: int = 1,
+        prefixes: tuple[str, ...] = DB_BOUND_PREFIXES,
+    ) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            controller: The controller that decides which requests get in.
+            retry_after: Seconds sent in the ``Retry-After`` header of rejections.
+            prefixes: Path prefixes of the routes that are limited.
+        """
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+        self.prefixes = prefixes
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Admit, queue or reject the request."""
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire()
+        except OverloadedError as err:
+            count_exception(err)
+            await self._reject(send, str(err))
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _reject(self, send: Any, reason: str) -> None:
+        body = json.dumps({"detail": f"Server overloaded: {reason}"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+admission_controller = AdmissionController(
+    max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+)
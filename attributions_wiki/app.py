@@ -1,12 +1,32 @@
 """Main FastAPI application."""
 
-from fastapi import APIRouter, FastAPI
+from fastapi import APIRouter, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 
+from . import config
+from .admission import AdmissionMiddleware, admission_controller
+from .assets import AssetFiles
+from .compression import CompressionMiddleware
 from .db import lifespan
-from .routers.api import attribution_router, belief_router, factor_router, user_router
+from .deadline import DeadlineMiddleware
+from .exceptions import DeadlineExceededError
+from .memory import MemorySamplingMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .read_snapshot import SnapshotVersionMiddleware
+from .routers.api import (
+    attribution_router,
+    batch_router,
+    belief_router,
+    factor_router,
+    user_router,
+)
+from .routers.ops import debug_router, health_router, metrics_router
 from .routers.views import views
+from .routing import ReplicaRoutingMiddleware
+from .startup import timings
+from .tracing import TracingMiddleware
 
 app = FastAPI(lifespan=lifespan)
 
@@ -18,14 +38,32 @@ api_router.include_router(factor_router.router)
 api_router.include_router(attribution_router.router)
 api_router.include_router(user_router.router)
 api_router.include_router(belief_router.router)
+api_router.include_router(batch_router.router)
 views_router.include_router(views.router)
 
 app.include_router(api_router)
 app.include_router(views_router)
+app.include_router(health_router.router)
+app.include_router(metrics_router.router)
+app.include_router(debug_router.router)
+
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError) -> JSONResponse:
+    """Answer requests whose database calls ran past the deadline with 504."""
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
 
+app.mount("/static", AssetFiles(directory="static"), name="static")
+# templates = Jinja2Templates(directory="static/templates") - these are loaded in templating.py
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-# templates = Jinja2Templates(directory="static/templates") - these are loaded in the views.py file
+# Peak allocation per route, only measured while tracemalloc runs; see memory.py
+if config.MEMORY_SAMPLE_RATE > 0:
+    app.add_middleware(MemorySamplingMiddleware, sample_rate=config.MEMORY_SAMPLE_RATE)
+
+# Innermost, so a sampling profile covers the request's own task; see profiling.py
+if config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -35,3 +73,35 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+
+# Inside admission control, so the CPU spent compressing counts as load; see compression.py
+if config.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Pin clients to the primary right after they write so they read their own writes
+if config.READ_REPLICA_URL:
+    app.add_middleware(ReplicaRoutingMiddleware)
+
+# Tell clients which version of the in-process snapshot served them, see read_snapshot.py
+if config.READ_SNAPSHOT_ENABLED:
+    app.add_middleware(SnapshotVersionMiddleware)
+
+# Shed load before it reaches the database pool
+if config.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission_controller,
+        retry_after=config.ADMISSION_RETRY_AFTER,
+    )
+
+# Wraps AdmissionMiddleware, so queue time counts against the deadline and queued
+# requests are cancelled too when their client disconnects
+app.add_middleware(DeadlineMiddleware)
+
+# Request ids and span trees, see tracing.py
+app.add_middleware(TracingMiddleware)
+
+# Wraps everything else so shed and timed out requests are measured too
+app.add_middleware(MetricsMiddleware)
+
+timings.mark_imported()
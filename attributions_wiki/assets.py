@@ -0,0 +1,279 @@
+"""Self-hosted, fingerprinted and precompressed static assets.
+
+Usage::
+
+    python -m attributions_wiki.assets vendor   # download the third-party scripts
+    python -m attributions_wiki.assets build    # fingerprint and precompress static/
+
+``vendor`` downloads the scripts in ``VENDORED`` into ``static/vendor/``, where
+they are committed, so pages never depend on a CDN. Each download is checked
+against the sha256 pinned next to its URL before anything is written.
+
+``build`` copies every file under ``static/`` (except templates and earlier
+builds) to ``static/dist/`` under a name carrying a hash of its content, e.g.
+``vendor/htmx.min.3f2a9c1e.js``, next to ``.gz`` and, with the optional
+``brotli`` package, ``.br`` versions, and records the names in
+``static/dist/manifest.json``.
+
+Templates link assets with ``asset_url("vendor/htmx.min.js")``. It resolves to
+the fingerprinted file when the asset was built and to the plain file under
+``/static`` when it was not. A vendored script that is missing from
+``static/`` raises instead of quietly falling back to its upstream URL.
+
+``AssetFiles`` serves ``/static``. A fingerprinted name changes whenever its
+content does, so files under ``dist/`` are sent with a year-long
+``Cache-Control: immutable`` and in the best precompressed encoding the client
+accepts; everything else must be revalidated.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+import sys
+import urllib.request
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+STATIC_DIR = Path("static")
+DIST = "dist"
+MANIFEST = "manifest.json"
+# Sources that are not served as assets
+SKIPPED = {"templates", DIST}
+
+
+@dataclass(frozen=True)
+class Vendored:
+    """A third-party file kept in ``static/``, and where it came from."""
+
+    url: str
+    # Hex sha256 of the file at ``url``; vendor() refuses to write anything else
+    sha256: str | None
+
+
+# Pin each digest with ``sha256sum`` of a download you have checked; an
+# unpinned entry cannot be vendored
+VENDORED = {
+    "vendor/htmx.min.js": Vendored("https://unpkg.com/htmx.org@1.4.1/dist/htmx.min.js", None),
+    "vendor/json-enc.js": Vendored("https://unpkg.com/htmx.org@1.4.1/dist/ext/json-enc.js", None),
+    "vendor/tailwind.js": Vendored("https://cdn.tailwindcss.com/3.4.1", None),
+}
+
+COMPRESSIBLE = {".js", ".css", ".svg", ".json", ".html", ".txt", ".map"}
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def fingerprinted(path: str, content: bytes) -> str:
+    """The name of an asset with a hash of its content before the extension."""
+    stem, dot, extension = path.rpartition(".")
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    if not dot or "/" in extension:
+        return f"{path}.{digest}"
+    return f"{stem}.{digest}.{extension}"
+
+
+def _sources(static_dir: Path) -> list[Path]:
+    return sorted(
+        path
+        for path in static_dir.rglob("*")
+        if path.is_file() and path.relative_to(static_dir).parts[0] not in SKIPPED
+    )
+
+
+def _write_compressed(target: Path, content: bytes) -> None:
+    """Write ``.gz`` (and ``.br``) next to ``target`` when they are smaller."""
+    if target.suffix not in COMPRESSIBLE:
+        return
+    # mtime=0 keeps builds of the same content byte for byte identical
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(content):
+            target.with_name(target.name + suffix).write_bytes(compressed)
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """Fingerprint and precompress every asset into ``dist/`` and write the manifest.
+
+    Returns:
+        dict[str, str]: Fingerprinted names by asset path, as in the manifest.
+    """
+    dist = static_dir / DIST
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for source in _sources(static_dir):
+        path = source.relative_to(static_dir).as_posix()
+        content = source.read_bytes()
+        name = fingerprinted(path, content)
+        target = dist / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        _write_compressed(target, content)
+        manifest[path] = name
+    (dist / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    load_manifest.cache_clear()
+    return manifest
+
+
+def vendor(static_dir: Path = STATIC_DIR) -> list[str]:
+    """Download the vendored scripts that are not in ``static/`` yet.
+
+    Returns:
+        list[str]: The paths downloaded.
+
+    Raises:
+        ValueError: If a script has no pinned digest, or its download does not
+            match it; nothing is written for that script.
+    """
+    fetched = []
+    for path, source in VENDORED.items():
+        target = static_dir / path
+        if target.exists():
+            continue
+        if source.sha256 is None:
+            raise ValueError(f"{path} has no pinned sha256, pin the digest of {source.url}")
+        with urllib.request.urlopen(source.url, timeout=30) as response:
+            content = response.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if digest != source.sha256:
+            raise ValueError(f"{source.url} has sha256 {digest}, expected {source.sha256}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(target.name + ".tmp")
+        temporary.write_bytes(content)
+        temporary.replace(target)
+        fetched.append(path)
+    return fetched
+
+
+@cache
+def load_manifest(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """The manifest of the last build, or an empty one if assets were never built."""
+    try:
+        return json.loads((static_dir / DIST / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """The URL of a static asset, fingerprinted when it was built.
+
+    Raises:
+        FileNotFoundError: If ``path`` is a vendored script missing from ``static/``.
+    """
+    name = load_manifest(STATIC_DIR).get(path)
+    if name is not None:
+        return f"/static/{DIST}/{name}"
+    if path in VENDORED and not (STATIC_DIR / path).exists():
+        raise FileNotFoundError(
+            f"{STATIC_DIR / path} is missing, run python -m attributions_wiki.assets vendor"
+        )
+    return f"/static/{path}"
+
+
+def accepted_encodings(headers: Headers) -> tuple[set[str], set[str]]:
+    """The content codings an ``Accept-Encoding`` header allows and those it refuses.
+
+    Returns:
+        tuple: The codings with a non-zero ``q`` (``*`` stands for any other) and
+            the codings refused with ``q=0``.
+    """
+    accepted = set()
+    refused = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            (accepted if quality > 0 else refused).add(coding.strip().lower())
+    return accepted, refused
+
+
+def allowed_encodings(headers: Headers, codings: Iterable[str]) -> list[str]:
+    """Those of ``codings`` the request's ``Accept-Encoding`` allows, in the same order.
+
+    A coding refused with ``q=0`` stays refused when ``*`` allows the others.
+    """
+    accepted, refused = accepted_encodings(headers)
+    return [
+        coding
+        for coding in codings
+        if coding not in refused and (coding in accepted or "*" in accepted)
+    ]
+
+
+class AssetFiles(StaticFiles):
+    """Static files with long-lived caching and precompressed variants for built assets."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        """Serve ``path``, preferring a precompressed variant under ``dist/``."""
+        immutable = Path(path).parts[:1] == (DIST,)
+        response = None
+        if immutable and scope["method"] in ("GET", "HEAD"):
+            response = self._precompressed(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+        if immutable:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    def _precompressed(self, path: str, scope: Scope) -> Response | None:
+        allowed = allowed_encodings(Headers(scope=scope), dict(ENCODINGS))
+        for coding, suffix in ENCODINGS:
+            if coding not in allowed:
+                continue
+            full_path, stat_result = self.lookup_path(path + suffix)
+            if stat_result is None:
+                continue
+            response: Any = self.file_response(full_path, stat_result, scope)
+            media_type, _ = mimetypes.guess_type(path)
+            response.headers["Content-Type"] = media_type or "application/octet-stream"
+            response.headers["Content-Encoding"] = coding
+            return response
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Vendor or build the static assets from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("command", choices=("vendor", "build"))
+    parser.add_argument("--static-dir", type=Path, default=STATIC_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "vendor":
+        fetched = vendor(args.static_dir)
+        sys.stdout.write(f"downloaded {len(fetched)} of {len(VENDORED)} vendored files\n")
+    else:
+        manifest = build(args.static_dir)
+        compressor = "gzip and brotli" if brotli is not None else "gzip"
+        sys.stdout.write(f"built {len(manifest)} assets, precompressed with {compressor}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
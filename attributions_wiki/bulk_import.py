@@ -0,0 +1,657 @@
+"""Streaming bulk import of beliefs, attributions, factors and links from CSV/JSONL dumps.
+
+Usage::
+
+    python -m attributions_wiki.bulk_import beliefs.jsonl --entity belief --source oldwiki
+    python -m attributions_wiki.bulk_import attributions.csv --entity attribution --source oldwiki
+
+Every record carries the id it had in the source wiki in ``id``. Records look
+like the ``*CreateInput`` shapes plus references by source id:
+
+- ``belief``: ``id``, ``description``
+- ``attribution``: ``id``, ``locus``, ``stability``, ``controllability``,
+  ``reason`` and optionally ``beliefs``, a list of belief ids ("|" separated in CSV)
+- ``factor``: ``id``, ``description`` and optionally ``belief`` and ``attribution``
+- ``link``: ``belief`` and ``attribution``
+
+Import beliefs first, then attributions, factors and links. Source ids are
+mapped to ours in the ``ImportIdMap`` table, so references are resolved with one
+query per batch and memory stays flat however large the dump is: records are
+read lazily, a bounded queue holds at most ``2 * workers`` batches and nothing
+else grows with the input.
+
+Each batch is validated with the matching ``*CreateInput``, gets its ids from
+the table's sequence and is written in one transaction, together with its id
+map rows, through ``COPY`` (asyncpg) or ``create_many`` (Prisma). Invalid rows
+and rows with unknown references, or that would give a belief or attribution a
+second factor, go to the reject file (JSON lines with the line number and
+reason), as do lines that are not valid JSON. After every batch, the last line
+up to which all batches are written is saved to the checkpoint file and a rerun
+starts from there. Records whose source id is already mapped are skipped, so
+batches finished after the checkpoint are not imported twice, and the reject
+lines and counts of a batch are only written once the checkpoint moves past it,
+so a rerun does not reject a record twice.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from prisma.types import AttributionCreateInput, BeliefCreateInput, FactorCreateInput
+from pydantic import TypeAdapter, ValidationError
+
+from prisma import errors as prisma_errors
+
+from . import config
+from .db import asyncpg_dsn, db
+
+try:
+    import asyncpg  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    asyncpg = None
+
+CSV_LIST_SEPARATOR = "|"
+
+RESERVE_IDS = (
+    "SELECT nextval(pg_get_serial_sequence($1, 'id'))::int AS id FROM generate_series(1, $2)"
+)
+LOOKUP_IDS = (
+    'SELECT "source_id", "id" FROM "ImportIdMap" '
+    'WHERE "source" = $1 AND "entity" = $2 AND "source_id" = ANY($3::text[])'
+)
+INSERT_LINKS = (
+    'INSERT INTO "_BeliefAttribution" ("A", "B") '
+    "SELECT * FROM unnest($1::int4[], $2::int4[]) ON CONFLICT DO NOTHING"
+)
+TAKEN_KEYS = 'SELECT "{column}" AS "id" FROM "{table}" WHERE "{column}" = ANY($1::int4[])'
+ID_MAP_COLUMNS = ("source", "entity", "source_id", "id")
+
+
+@dataclass(frozen=True)
+class Entity:
+    """How records of one kind are validated and stored."""
+
+    name: str
+    table: str
+    fields: tuple[str, ...]
+    validator: TypeAdapter[Any] | None
+    # Source id fields resolved to our ids: record field -> referenced entity
+    references: tuple[tuple[str, str], ...] = ()
+    # References stored in @unique columns, e.g. a belief has at most one factor
+    unique: tuple[str, ...] = ()
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        """The table columns written for every row."""
+        return ("id", "created_at", "updated_at", *self.fields, *self.foreign_keys)
+
+    @property
+    def foreign_keys(self) -> tuple[str, ...]:
+        """Columns filled from single references, e.g. a factor's ``beliefId``."""
+        return tuple(f"{field}Id" for field, _ in self.references if field != "beliefs")
+
+
+ENTITIES = {
+    "belief": Entity("belief", "Belief", ("description",), TypeAdapter(BeliefCreateInput)),
+    "attribution": Entity(
+        "attribution",
+        "Attribution",
+        ("locus", "stability", "controllability", "reason"),
+        TypeAdapter(AttributionCreateInput),
+        (("beliefs", "belief"),),
+    ),
+    "factor": Entity(
+        "factor",
+        "Factor",
+        ("description",),
+        TypeAdapter(FactorCreateInput),
+        (("attribution", "attribution"), ("belief", "belief")),
+        ("attribution", "belief"),
+    ),
+    "link": Entity(
+        "link", "_BeliefAttribution", (), None, (("attribution", "attribution"), ("belief", "belief"))
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Malformed:
+    """A JSONL line that is not valid JSON, read in place of its record."""
+
+    text: str
+    reason: str
+
+
+@dataclass
+class Parsed:
+    """A validated record waiting for its references to be resolved."""
+
+    line: int
+    record: dict[str, Any]
+    source_id: str | None
+    data: dict[str, Any]
+    references: dict[str, list[str]]
+
+
+@dataclass
+class Batch:
+    """Consecutive records, numbered in input order."""
+
+    number: int
+    records: list[tuple[int, Any]]
+
+    @property
+    def last_line(self) -> int:
+        """The line of the last record in the batch."""
+        return self.records[-1][0]
+
+
+@dataclass
+class Stats:
+    """What happened to the records of an import."""
+
+    imported: int = 0
+    skipped: int = 0
+    rejected: int = 0
+    links: int = 0
+
+
+def read_records(path: Path, fmt: str, start_after: int = 0) -> Iterator[tuple[int, Any]]:
+    """Yield (line number, record) pairs lazily, skipping the lines up to ``start_after``.
+
+    Args:
+        path: The CSV or JSONL file.
+        fmt: "csv" or "jsonl".
+        start_after: The checkpointed line; records on or before it are skipped.
+
+    Yields:
+        tuple: The 1-based line the record ends on and the record, or a
+            ``Malformed`` for a line that is not valid JSON, so it is rejected
+            rather than ending the import.
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        if fmt == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                if reader.line_num > start_after:
+                    yield reader.line_num, _from_csv(record)
+        else:
+            for line, text in enumerate(file, 1):
+                if line > start_after and text.strip():
+                    try:
+                        yield line, json.loads(text)
+                    except json.JSONDecodeError as err:
+                        yield line, Malformed(text.rstrip("\r\n"), f"invalid JSON: {err}")
+
+
+def _from_csv(record: dict[str, str]) -> dict[str, Any]:
+    parsed: dict[str, Any] = {key: value or None for key, value in record.items()}
+    if parsed.get("beliefs"):
+        parsed["beliefs"] = parsed["beliefs"].split(CSV_LIST_SEPARATOR)
+    return parsed
+
+
+def batches(records: Iterator[tuple[int, Any]], size: int) -> Iterator[Batch]:
+    """Group records into numbered batches of at most ``size``."""
+    chunk: list[tuple[int, Any]] = []
+    number = 0
+    for item in records:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield Batch(number, chunk)
+            number += 1
+            chunk = []
+    if chunk:
+        yield Batch(number, chunk)
+
+
+def parse(entity: Entity, line: int, record: Any) -> Parsed:
+    """Validate a record against its ``*CreateInput`` and pull out its references.
+
+    Raises:
+        ValueError: If the record is malformed, is missing its id or does not validate.
+    """
+    if isinstance(record, Malformed):
+        raise ValueError(record.reason)
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    source_id = record.get("id")
+    if entity.name != "link" and source_id in (None, ""):
+        raise ValueError("missing id")
+    data = {key: record[key] for key in entity.fields if record.get(key) is not None}
+    if entity.validator is not None:
+        try:
+            data = dict(entity.validator.validate_python(data))
+        except ValidationError as err:
+            reasons = "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in err.errors()
+            )
+            raise ValueError(reasons) from err
+    references: dict[str, list[str]] = {}
+    for key, _ in entity.references:
+        value = record.get(key)
+        if value in (None, "", []):
+            continue
+        references[key] = [str(item) for item in value] if isinstance(value, list) else [str(value)]
+    if entity.name == "link" and len(references) != 2:
+        raise ValueError("a link needs both belief and attribution")
+    return Parsed(line, record, None if source_id is None else str(source_id), data, references)
+
+
+class Checkpoint:
+    """The last line up to which every batch is written, saved after each batch.
+
+    Batches finish out of order when several workers run, so the checkpoint
+    only moves past a batch once every earlier batch has finished too. The
+    counts and reject lines of a batch are added at the same time: a rerun
+    starts over from the checkpoint, and anything recorded for the batches
+    after it would be recorded again.
+    """
+
+    def __init__(self, path: Path, rejects: Any | None = None) -> None:
+        """Initialize a Checkpoint, loading the saved state if there is one.
+
+        Args:
+            path: The checkpoint file.
+            rejects: The reject file, opened for appending. On a rerun, lines
+                written after the checkpoint was last saved are dropped.
+        """
+        self.path = path
+        self.rejects = rejects
+        self.line = 0
+        self.stats = Stats()
+        self.rejects_size = rejects.tell() if rejects is not None else 0
+        if path.exists():
+            saved = json.loads(path.read_text())
+            self.line = saved["line"]
+            self.stats = Stats(**saved["stats"])
+            self.rejects_size = saved.get("rejects_size", 0)
+            if rejects is not None:
+                rejects.truncate(self.rejects_size)
+                rejects.seek(self.rejects_size)
+        self._next = 0
+        self._finished: dict[int, tuple[int, Stats, list[str]]] = {}
+
+    def finish(self, batch: Batch, stats: Stats | None = None, rejects: Sequence[str] = ()) -> None:
+        """Record a written batch and save if the checkpoint moved.
+
+        Args:
+            batch: The batch.
+            stats: What happened to its records.
+            rejects: Its reject file lines.
+        """
+        self._finished[batch.number] = (batch.last_line, stats or Stats(), list(rejects))
+        moved = False
+        while self._next in self._finished:
+            self.line, done, lines = self._finished.pop(self._next)
+            for name, count in vars(done).items():
+                setattr(self.stats, name, getattr(self.stats, name) + count)
+            if self.rejects is not None:
+                self.rejects.writelines(lines)
+            self._next += 1
+            moved = True
+        if moved:
+            self.save()
+
+    def save(self) -> None:
+        """Write the checkpoint atomically, after the reject lines it covers."""
+        if self.rejects is not None:
+            self.rejects.flush()
+            self.rejects_size = self.rejects.tell()
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(
+            json.dumps(
+                {"line": self.line, "stats": vars(self.stats), "rejects_size": self.rejects_size}
+            )
+        )
+        os.replace(temporary, self.path)
+
+
+class CopyWriter:
+    """Writes batches with asyncpg ``COPY``."""
+
+    conflict_errors: tuple[type[Exception], ...] = (
+        (asyncpg.UniqueViolationError,) if asyncpg is not None else ()
+    )
+
+    def __init__(self, pool: Any) -> None:
+        """Initialize a CopyWriter on an asyncpg pool."""
+        self.pool = pool
+
+    def now(self) -> datetime:
+        """The timestamp for new rows; the columns store UTC without a time zone."""
+        return datetime.now(UTC).replace(tzinfo=None)
+
+    async def reserve_ids(self, table: str, count: int) -> list[int]:
+        """Take ``count`` ids from the table's sequence."""
+        rows = await self.pool.fetch(RESERVE_IDS, f'"{table}"', count)
+        return [row["id"] for row in rows]
+
+    async def lookup(self, source: str, entity: str, source_ids: list[str]) -> dict[str, int]:
+        """Map source ids of an entity to our ids, leaving out unknown ones."""
+        rows = await self.pool.fetch(LOOKUP_IDS, source, entity, source_ids)
+        return {row["source_id"]: row["id"] for row in rows}
+
+    async def taken(self, entity: Entity, column: str, ids: list[int]) -> set[int]:
+        """Return which of ``ids`` are already stored in a unique column."""
+        rows = await self.pool.fetch(TAKEN_KEYS.format(table=entity.table, column=column), ids)
+        return {row["id"] for row in rows}
+
+    async def write(
+        self,
+        entity: Entity,
+        rows: list[tuple[Any, ...]],
+        mapped: list[tuple[str, str, str, int]],
+        links: list[tuple[int, int]],
+    ) -> None:
+        """Write rows, their id map entries and links in one transaction."""
+        async with self.pool.acquire() as conn, conn.transaction():
+            if rows:
+                await conn.copy_records_to_table(entity.table, records=rows, columns=entity.columns)
+            if mapped:
+                await conn.copy_records_to_table(
+                    "ImportIdMap", records=mapped, columns=ID_MAP_COLUMNS
+                )
+            if links:
+                await conn.execute(INSERT_LINKS, *map(list, zip(*links, strict=True)))
+
+
+class PrismaWriter:
+    """Writes batches with Prisma ``create_many``."""
+
+    conflict_errors: tuple[type[Exception], ...] = (prisma_errors.UniqueViolationError,)
+
+    def now(self) -> datetime:
+        """The timestamp for new rows."""
+        return datetime.now(UTC)
+
+    async def reserve_ids(self, table: str, count: int) -> list[int]:
+        """Take ``count`` ids from the table's sequence."""
+        rows = await db.query_raw(RESERVE_IDS, f'"{table}"', count)
+        return [row["id"] for row in rows]
+
+    async def lookup(self, source: str, entity: str, source_ids: list[str]) -> dict[str, int]:
+        """Map source ids of an entity to our ids, leaving out unknown ones."""
+        found = await db.importidmap.find_many(
+            where={"source": source, "entity": entity, "source_id": {"in": source_ids}}
+        )
+        return {row.source_id: row.id for row in found}
+
+    async def taken(self, entity: Entity, column: str, ids: list[int]) -> set[int]:
+        """Return which of ``ids`` are already stored in a unique column."""
+        rows = await db.query_raw(TAKEN_KEYS.format(table=entity.table, column=column), ids)
+        return {row["id"] for row in rows}
+
+    async def write(
+        self,
+        entity: Entity,
+        rows: list[tuple[Any, ...]],
+        mapped: list[tuple[str, str, str, int]],
+        links: list[tuple[int, int]],
+    ) -> None:
+        """Write rows, their id map entries and links in one transaction."""
+        async with db.tx() as tx:
+            if rows:
+                actions = getattr(tx, entity.table.lower())
+                await actions.create_many(data=[dict(zip(entity.columns, row, strict=True)) for row in rows])
+            if mapped:
+                await tx.importidmap.create_many(
+                    data=[dict(zip(ID_MAP_COLUMNS, row, strict=True)) for row in mapped]
+                )
+            # Postgres takes at most 32767 parameters per statement
+            for start in range(0, len(links), 10_000):
+                chunk = links[start : start + 10_000]
+                values = ", ".join(f"(${2 * n + 1}, ${2 * n + 2})" for n in range(len(chunk)))
+                await tx.execute_raw(
+                    f'INSERT INTO "_BeliefAttribution" ("A", "B") VALUES {values} '
+                    "ON CONFLICT DO NOTHING",
+                    *(value for link in chunk for value in link),
+                )
+
+
+@dataclass
+class Plan:
+    """What one batch writes, and what it rejects and skips."""
+
+    rows: list[tuple[Any, ...]] = field(default_factory=list)
+    mapped: list[tuple[str, str, str, int]] = field(default_factory=list)
+    links: list[tuple[int, int]] = field(default_factory=list)
+    rejects: list[tuple[Parsed, str]] = field(default_factory=list)
+    skipped: int = 0
+
+
+def reject_line(line: int, record: Any, reason: str) -> str:
+    """Format a rejected record as a line of the reject file."""
+    if isinstance(record, Malformed):
+        record = record.text
+    return json.dumps({"line": line, "reason": reason, "record": record}) + "\n"
+
+
+@dataclass
+class Importer:
+    """Streams one file into the database."""
+
+    entity: Entity
+    source: str
+    writer: Any
+    checkpoint: Checkpoint
+
+    @property
+    def stats(self) -> Stats:
+        """Counts for every batch up to the checkpoint, including earlier runs."""
+        return self.checkpoint.stats
+
+    async def _resolve(self, parsed: list[Parsed]) -> dict[str, dict[str, int]]:
+        """Look up every referenced source id of the batch, one query per entity."""
+        targets = dict(self.entity.references)
+        wanted: dict[str, set[str]] = {}
+        for item in parsed:
+            for key, ids in item.references.items():
+                wanted.setdefault(targets[key], set()).update(ids)
+        return {
+            target: await self.writer.lookup(self.source, target, sorted(ids))
+            for target, ids in wanted.items()
+        }
+
+    async def _taken(
+        self, parsed: list[Parsed], resolved: dict[str, dict[str, int]]
+    ) -> dict[str, set[int]]:
+        """Find the referenced ids already stored in the entity's unique columns."""
+        targets = dict(self.entity.references)
+        taken: dict[str, set[int]] = {}
+        for key in self.entity.unique:
+            found = resolved.get(targets[key], {})
+            ids = {
+                found[source_id]
+                for item in parsed
+                for source_id in item.references.get(key, ())
+                if source_id in found
+            }
+            taken[key] = set()
+            if ids:
+                taken[key] = await self.writer.taken(self.entity, f"{key}Id", sorted(ids))
+        return taken
+
+    async def _plan(self, parsed: list[Parsed]) -> Plan:
+        plan = Plan()
+        targets = dict(self.entity.references)
+        resolved = await self._resolve(parsed)
+        # Holds the ids used earlier in this batch too, once their rows are accepted
+        taken = await self._taken(parsed, resolved)
+        existing: dict[str, int] = {}
+        if self.entity.name != "link":
+            existing = await self.writer.lookup(
+                self.source, self.entity.name, [str(item.source_id) for item in parsed]
+            )
+
+        ready: list[tuple[Parsed, dict[str, list[int]]]] = []
+        seen: set[str] = set()
+        for item in parsed:
+            if item.source_id in existing:
+                plan.skipped += 1
+                continue
+            if item.source_id is not None and item.source_id in seen:
+                plan.rejects.append((item, f"duplicate id {item.source_id}"))
+                continue
+            ours: dict[str, list[int]] = {}
+            unknown = [
+                f"unknown {key} {source_id}"
+                for key, ids in item.references.items()
+                for source_id in ids
+                if source_id not in resolved[targets[key]]
+            ]
+            if unknown:
+                plan.rejects.append((item, ", ".join(unknown)))
+                continue
+            for key, ids in item.references.items():
+                ours[key] = [resolved[targets[key]][source_id] for source_id in ids]
+            used = [
+                f"{key} {item.references[key][0]} already has a {self.entity.name}"
+                for key in self.entity.unique
+                if key in ours and ours[key][0] in taken[key]
+            ]
+            if used:
+                plan.rejects.append((item, ", ".join(used)))
+                continue
+            for key in self.entity.unique:
+                if key in ours:
+                    taken[key].add(ours[key][0])
+            if item.source_id is not None:
+                seen.add(item.source_id)
+            ready.append((item, ours))
+
+        if self.entity.name == "link":
+            plan.links = [(ours["attribution"][0], ours["belief"][0]) for _, ours in ready]
+            return plan
+        if not ready:
+            return plan
+
+        ids = await self.writer.reserve_ids(self.entity.table, len(ready))
+        now = self.writer.now()
+        single = [key for key, _ in self.entity.references if key != "beliefs"]
+        for new_id, (item, ours) in zip(ids, ready, strict=True):
+            values = [item.data.get(name) for name in self.entity.fields]
+            foreign = [ours[key][0] if key in ours else None for key in single]
+            plan.rows.append((new_id, now, now, *values, *foreign))
+            plan.mapped.append((self.source, self.entity.name, str(item.source_id), new_id))
+            plan.links.extend((new_id, belief_id) for belief_id in ours.get("beliefs", []))
+        return plan
+
+    async def process(self, batch: Batch) -> None:
+        """Validate, resolve and write one batch, then move the checkpoint."""
+        parsed: list[Parsed] = []
+        rejected: list[tuple[int, Any, str]] = []
+        for line, record in batch.records:
+            try:
+                parsed.append(parse(self.entity, line, record))
+            except ValueError as err:
+                rejected.append((line, record, str(err)))
+        plan = await self._plan(parsed)
+        try:
+            await self.writer.write(self.entity, plan.rows, plan.mapped, plan.links)
+        except self.writer.conflict_errors:
+            # Another worker imported one of these source ids, or used one of
+            # these unique references, meanwhile; planning again finds it and
+            # skips or rejects the record
+            plan = await self._plan(parsed)
+            await self.writer.write(self.entity, plan.rows, plan.mapped, plan.links)
+
+        rejected.extend((item.line, item.record, reason) for item, reason in plan.rejects)
+        rejected.sort(key=lambda reject: reject[0])
+        stats = Stats(len(plan.rows), plan.skipped, len(rejected), len(plan.links))
+        self.checkpoint.finish(batch, stats, [reject_line(*reject) for reject in rejected])
+
+    async def run(self, records: Iterator[tuple[int, Any]], size: int, workers: int) -> None:
+        """Import every record with up to ``workers`` batches being written at once."""
+        # Bounded, so reading never runs far ahead of writing
+        queue: asyncio.Queue[Batch | None] = asyncio.Queue(maxsize=2 * workers)
+
+        async def work() -> None:
+            while (batch := await queue.get()) is not None:
+                await self.process(batch)
+
+        # A failing worker cancels the others and the reading loop below
+        async with asyncio.TaskGroup() as group:
+            for _ in range(workers):
+                group.create_task(work())
+            for batch in batches(records, size):
+                await queue.put(batch)
+            for _ in range(workers):
+                await queue.put(None)
+
+
+async def import_file(args: argparse.Namespace, rejects: Any) -> Stats:
+    """Import one file as described by the command line arguments.
+
+    Args:
+        args: The parsed command line.
+        rejects: The open reject file.
+
+    Returns:
+        Stats: Counts for the whole import, including earlier runs of it.
+    """
+    path = Path(args.path)
+    fmt = args.format or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    checkpoint = Checkpoint(Path(args.checkpoint or f"{path}.checkpoint.json"), rejects)
+    method = args.method or ("copy" if asyncpg is not None else "create_many")
+
+    pool = None
+    if method == "copy":
+        if asyncpg is None:
+            raise RuntimeError("COPY needs asyncpg, install the asyncpg extra")
+        pool = await asyncpg.create_pool(
+            asyncpg_dsn(args.database_url), min_size=1, max_size=args.workers + 1
+        )
+        writer: Any = CopyWriter(pool)
+    else:
+        await db.connect()
+        writer = PrismaWriter()
+
+    try:
+        importer = Importer(ENTITIES[args.entity], args.source, writer, checkpoint)
+        records = read_records(path, fmt, start_after=checkpoint.line)
+        await importer.run(records, args.batch_size, args.workers)
+    finally:
+        if pool is not None:
+            await pool.close()
+        elif db.is_connected():
+            await db.disconnect()
+    checkpoint.save()
+    return importer.stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run an import from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("path", help="A .csv or .jsonl file")
+    parser.add_argument("--entity", choices=sorted(ENTITIES), required=True)
+    parser.add_argument("--source", required=True, help="Name of the wiki the dump comes from")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="Batches written concurrently")
+    parser.add_argument("--method", choices=("copy", "create_many"), help="Defaults to copy with asyncpg")
+    parser.add_argument("--checkpoint", help="Defaults to <path>.checkpoint.json")
+    parser.add_argument("--rejects", help="Defaults to <path>.rejects.jsonl")
+    parser.add_argument("--database-url", default=config.DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with open(args.rejects or f"{args.path}.rejects.jsonl", "a", encoding="utf-8") as rejects:
+        stats = asyncio.run(import_file(args, rejects))
+    sys.stdout.write(
+        f"imported {stats.imported}, links {stats.links}, skipped {stats.skipped}, "
+        f"rejected {stats.rejected} in {time.perf_counter() - started:.1f}s\n"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
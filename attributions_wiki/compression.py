@@ -0,0 +1,269 @@
+"""Compression of dynamic responses.
+
+``CompressionMiddleware`` compresses JSON and HTML responses in the best
+encoding the client accepts: brotli (with the optional ``brotli`` package),
+zstd (with the optional ``zstandard`` package) or gzip. Responses smaller than
+``COMPRESSION_MIN_SIZE``, of a type outside ``COMPRESSIBLE_TYPES``, already
+encoded (the precompressed static assets), partial or marked ``no-transform``
+are sent as they are.
+
+Streamed responses stay streamed: every chunk is compressed and flushed as it
+arrives, so the first belief cards of ``/templates/belief/get_all`` still reach
+the browser before the rest are fetched. A streamed response has no
+``Content-Length`` to go by, so it is compressed whatever its size.
+
+A compressed response's ``ETag`` gets the content coding appended
+(``etags.encoded_etag``): its bytes differ from the uncompressed body's, so a
+strong ETag may not be shared between them. A ``304`` keeps the encoded ETag
+the client revalidated with.
+
+The levels default to the fast end of each codec (gzip 6, brotli 4, zstd 3);
+``python -m benchmarks.compression_bench`` measures what each level costs and
+saves on our own payloads.
+"""
+import zlib
+from typing import Any, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from . import config
+from .assets import allowed_encodings
+from .etags import encoded_etag
+from .metrics import Counter, registry
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+}
+# Statuses that never carry a body, or carry a byte range of the unencoded one
+UNCOMPRESSED_STATUSES = {204, 206, 304}
+
+compressed_bytes = registry.register(
+    Counter(
+        "http_response_compression_bytes_total",
+        "Response body bytes before (stage=in) and after (stage=out) compression, by encoding.",
+        ("encoding", "stage"),
+    )
+)
+
+
+class Compressor(Protocol):
+    """An incremental compressor for one response body."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress ``data``, returning whatever output is ready."""
+
+    def flush(self) -> bytes:
+        """Return everything compressed so far, keeping the stream open."""
+
+    def finish(self) -> bytes:
+        """Return the rest of the output and end the stream."""
+
+
+class GzipCompressor:
+    """gzip through zlib."""
+
+    def __init__(self, level: int) -> None:
+        """Initialize a GzipCompressor at ``level`` (1 to 9)."""
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress ``data``, returning whatever output is ready."""
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Return everything compressed so far, keeping the stream open."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Return the rest of the output and end the stream."""
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    """brotli, needs the ``brotli`` extra."""
+
+    def __init__(self, level: int) -> None:
+        """Initialize a BrotliCompressor at quality ``level`` (0 to 11)."""
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress ``data``, returning whatever output is ready."""
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        """Return everything compressed so far, keeping the stream open."""
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        """Return the rest of the output and end the stream."""
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    """zstd, needs the ``zstd`` extra."""
+
+    def __init__(self, level: int) -> None:
+        """Initialize a ZstdCompressor at ``level`` (1 to 22)."""
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress ``data``, returning whatever output is ready."""
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Return everything compressed so far, keeping the stream open."""
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        """Return the rest of the output and end the stream."""
+        return self._compressor.flush()
+
+
+# Every codec installed, preferred first
+CODECS: dict[str, type[Compressor]] = {}
+if brotli is not None:
+    CODECS["br"] = BrotliCompressor
+if zstandard is not None:
+    CODECS["zstd"] = ZstdCompressor
+CODECS["gzip"] = GzipCompressor
+
+
+def default_levels() -> dict[str, int]:
+    """The configured level of every codec."""
+    return {
+        "br": config.COMPRESSION_BROTLI_QUALITY,
+        "zstd": config.COMPRESSION_ZSTD_LEVEL,
+        "gzip": config.COMPRESSION_GZIP_LEVEL,
+    }
+
+
+def negotiate(headers: Headers, codings: Any = CODECS) -> str | None:
+    """The preferred installed encoding the request's ``Accept-Encoding`` allows, if any."""
+    allowed = allowed_encodings(headers, codings)
+    return allowed[0] if allowed else None
+
+
+def compressible(status: int, headers: Headers, minimum_size: int) -> bool:
+    """Whether a response with this status and these headers is worth compressing."""
+    if status < 200 or status in UNCOMPRESSED_STATUSES or "content-encoding" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in COMPRESSIBLE_TYPES:
+        return False
+    length = headers.get("content-length")
+    return length is None or not length.isdigit() or int(length) >= minimum_size
+
+
+class CompressionMiddleware:
+    """Compress response bodies in the best encoding the client accepts."""
+
+    def __init__(
+        self,
+        app: Any,
+        minimum_size: int | None = None,
+        levels: dict[str, int] | None = None,
+    ) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size: Bodies smaller than this are sent as they are,
+                ``COMPRESSION_MIN_SIZE`` by default.
+            levels: The level of each codec, the configured levels by default.
+        """
+        self.app = app
+        self.minimum_size = config.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.levels = {**default_levels(), **(levels or {})}
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Serve the request, compressing the response body."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        coding = negotiate(request_headers)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: dict[str, Any] | None = None
+        compressor: Compressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Any) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = {**message, "headers": list(message.get("headers", []))}
+                headers = MutableHeaders(raw=start["headers"])
+                if not compressible(start["status"], headers, self.minimum_size):
+                    passthrough = True
+                    if "content-encoding" not in headers:
+                        headers.add_vary_header("Accept-Encoding")
+                    if start["status"] == 304 and "etag" in headers:
+                        etag = encoded_etag(headers["etag"], coding)
+                        if etag in request_headers.get("if-none-match", ""):
+                            headers["ETag"] = etag
+                    await send(start)
+                # Otherwise hold the start until the first body part shows the size
+                return
+            if start is None or message["type"] != "http.response.body":
+                passthrough = True
+                if start is not None:
+                    await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None and more_body and not body:
+                return
+            first = compressor is None
+            headers = MutableHeaders(raw=start["headers"])
+            if first:
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = CODECS[coding](self.levels[coding])
+            assert compressor is not None
+            data = compressor.compress(body)
+            data += compressor.flush() if more_body else compressor.finish()
+            compressed_bytes.inc(coding, "in", amount=len(body))
+            compressed_bytes.inc(coding, "out", amount=len(data))
+            if first:
+                headers["Content-Encoding"] = coding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], coding)
+                del headers["Content-Length"]
+                if not more_body:
+                    headers["Content-Length"] = str(len(data))
+                await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,169 @@
+"""Runtime configuration read from the environment."""
+import os
+
+from dotenv import load_dotenv
+
+# Load the .env file
+load_dotenv()
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment.
+
+    Args:
+        name: The environment variable name.
+        default: The value used when the variable is unset.
+
+    Returns:
+        bool: True for "1", "true", "yes" or "on" (case insensitive).
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float from the environment.
+
+    Args:
+        name: The environment variable name.
+        default: The value used when the variable is unset or empty.
+
+    Returns:
+        float: The parsed value.
+    """
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer from the environment.
+
+    Args:
+        name: The environment variable name.
+        default: The value used when the variable is unset or empty.
+
+    Returns:
+        int: The parsed value.
+    """
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+# Where the services keep their data: "prisma" (Postgres) or "memory" (in-process, no database)
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "prisma")
+# Serve the get_* reads and belief views from an in-process snapshot of every table
+READ_SNAPSHOT_ENABLED = _env_flag("READ_SNAPSHOT_ENABLED")
+# Seconds between snapshot reloads, which pick up other workers' writes; 0 never reloads
+READ_SNAPSHOT_RELOAD_SECONDS = _env_float("READ_SNAPSHOT_RELOAD_SECONDS", 30.0)
+
+# Serve the hot read queries from a direct asyncpg pool instead of the Prisma engine
+USE_ASYNCPG_READS = _env_flag("USE_ASYNCPG_READS")
+ASYNCPG_POOL_MIN_SIZE = _env_int("ASYNCPG_POOL_MIN_SIZE", 2)
+ASYNCPG_POOL_MAX_SIZE = _env_int("ASYNCPG_POOL_MAX_SIZE", 10)
+
+# Optional read replica: get_* service reads go here, writes stay on DATABASE_URL
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL", "")
+# Seconds a client keeps reading from the primary after it writes (read-your-writes)
+REPLICA_STICKY_SECONDS = _env_float("REPLICA_STICKY_SECONDS", 5.0)
+# Replica lag above which reads fall back to the primary
+REPLICA_MAX_LAG_SECONDS = _env_float("REPLICA_MAX_LAG_SECONDS", 1.0)
+REPLICA_LAG_CHECK_INTERVAL = _env_float("REPLICA_LAG_CHECK_INTERVAL", 1.0)
+
+# Prisma query engine connection pool, passed as DATABASE_URL parameters.
+# Defaults to Prisma's own default of (2 * CPU cores) + 1 connections.
+PRISMA_CONNECTION_LIMIT = _env_int("PRISMA_CONNECTION_LIMIT", 2 * (os.cpu_count() or 1) + 1)
+# Seconds a query waits for a free pool connection before failing
+PRISMA_POOL_TIMEOUT = _env_int("PRISMA_POOL_TIMEOUT", 10)
+# Seconds to wait for the query engine to start on connect
+PRISMA_CONNECT_TIMEOUT = _env_int("PRISMA_CONNECT_TIMEOUT", 10)
+# Seconds before an HTTP request to the query engine times out
+PRISMA_HTTP_TIMEOUT = _env_float("PRISMA_HTTP_TIMEOUT", 30.0)
+# Open pool connections and run the hot queries before reporting ready
+WARMUP_ON_STARTUP = _env_flag("WARMUP_ON_STARTUP", True)
+
+# Admission control in front of the database-bound routes
+ADMISSION_ENABLED = _env_flag("ADMISSION_ENABLED", True)
+# Concurrent database-bound requests per worker, defaults to the Prisma pool size
+ADMISSION_MAX_IN_FLIGHT = _env_int("ADMISSION_MAX_IN_FLIGHT", PRISMA_CONNECTION_LIMIT)
+# Requests allowed to wait for a slot before new ones are rejected outright
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 64)
+# Seconds a request may wait for a slot before it is rejected
+ADMISSION_QUEUE_TIMEOUT = _env_float("ADMISSION_QUEUE_TIMEOUT", 2.0)
+# Value of the Retry-After header sent with 503 responses
+ADMISSION_RETRY_AFTER = _env_int("ADMISSION_RETRY_AFTER", 1)
+
+# Default time budget of a request; service database calls fail once it is spent
+REQUEST_TIMEOUT_SECONDS = _env_float("REQUEST_TIMEOUT_SECONDS", 10.0)
+# Upper bound for budgets requested through the X-Request-Timeout header
+REQUEST_TIMEOUT_MAX_SECONDS = _env_float("REQUEST_TIMEOUT_MAX_SECONDS", 60.0)
+
+# Operations accepted in one POST /api/v1/batch request
+BATCH_MAX_OPERATIONS = _env_int("BATCH_MAX_OPERATIONS", 100)
+# Seconds a database transaction may stay open, e.g. for an atomic batch
+TRANSACTION_TIMEOUT_SECONDS = _env_float("TRANSACTION_TIMEOUT_SECONDS", 10.0)
+
+# `python -m attributions_wiki serve`: address and number of worker processes
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = _env_int("SERVER_PORT", 8000)
+SERVER_WORKERS = _env_int("SERVER_WORKERS", os.cpu_count() or 1)
+# Seconds an idle keep-alive connection stays open; above the load balancer's idle timeout
+SERVER_KEEPALIVE = _env_int("SERVER_KEEPALIVE", 75)
+# Connections the kernel queues before they are accepted, capped by net.core.somaxconn
+SERVER_BACKLOG = _env_int("SERVER_BACKLOG", 2048)
+# Requests a worker serves before it is replaced, plus up to the jitter; 0 never replaces it
+SERVER_MAX_REQUESTS = _env_int("SERVER_MAX_REQUESTS", 10_000)
+SERVER_MAX_REQUESTS_JITTER = _env_int("SERVER_MAX_REQUESTS_JITTER", 1_000)
+# Seconds a stopping worker gets to finish its requests, by default the longest request budget
+SERVER_GRACEFUL_TIMEOUT = _env_int("SERVER_GRACEFUL_TIMEOUT", int(REQUEST_TIMEOUT_MAX_SECONDS))
+
+# Database calls slower than this are logged with their request id
+SLOW_QUERY_THRESHOLD_MS = _env_float("SLOW_QUERY_THRESHOLD_MS", 200.0)
+# Where per-request span trees go: "" (nowhere), "file" or "collector"
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "").strip().lower()
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+
+# Let admins profile single requests with the X-Profile header or ?profile= flag
+PROFILING_ENABLED = _env_flag("PROFILING_ENABLED", True)
+# Where stored profiles are written
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Stored profiles kept, the oldest are deleted beyond it; 0 keeps them all
+PROFILE_KEEP = _env_int("PROFILE_KEEP", 100)
+
+# Measure event loop lag and report handlers that block the loop
+LOOP_MONITOR_ENABLED = _env_flag("LOOP_MONITOR_ENABLED", True)
+# Seconds between event loop heartbeats
+LOOP_MONITOR_INTERVAL = _env_float("LOOP_MONITOR_INTERVAL", 0.1)
+# Heartbeat silence beyond the interval that is reported as a blocking call
+LOOP_BLOCK_THRESHOLD_MS = _env_float("LOOP_BLOCK_THRESHOLD_MS", 100.0)
+
+# Where compiled templates are cached between worker starts; "" compiles on every start
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", ".jinja_cache")
+# Rendered belief cards kept in memory, by belief id and updated_at; 0 disables the cache
+FRAGMENT_CACHE_SIZE = _env_int("FRAGMENT_CACHE_SIZE", 10_000)
+
+# Beliefs sent per request of the streamed belief list, before the next page is loaded
+BELIEF_LIST_PAGE_SIZE = _env_int("BELIEF_LIST_PAGE_SIZE", 100)
+# Beliefs fetched per query while a page streams
+BELIEF_LIST_CHUNK_SIZE = _env_int("BELIEF_LIST_CHUNK_SIZE", 25)
+
+# Compress JSON and HTML responses in the best encoding the client accepts
+COMPRESSION_ENABLED = _env_flag("COMPRESSION_ENABLED", True)
+# Response bodies smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = _env_int("COMPRESSION_MIN_SIZE", 1024)
+# zlib level of gzip responses, 1 (fastest) to 9
+COMPRESSION_GZIP_LEVEL = _env_int("COMPRESSION_GZIP_LEVEL", 6)
+# Quality of brotli responses, 0 (fastest) to 11
+COMPRESSION_BROTLI_QUALITY = _env_int("COMPRESSION_BROTLI_QUALITY", 4)
+# Level of zstd responses, 1 (fastest) to 22
+COMPRESSION_ZSTD_LEVEL = _env_int("COMPRESSION_ZSTD_LEVEL", 3)
+
+# Trace Python allocations from startup; admins can also start it at /debug/memory/start
+TRACEMALLOC_ENABLED = _env_flag("TRACEMALLOC_ENABLED", False)
+# Stack frames kept per traced allocation
+TRACEMALLOC_FRAMES = _env_int("TRACEMALLOC_FRAMES", 10)
+# Fraction of requests whose peak allocation is measured while tracemalloc runs
+MEMORY_SAMPLE_RATE = _env_float("MEMORY_SAMPLE_RATE", 0.05)
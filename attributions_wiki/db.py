@@ -1,14 +1,230 @@
-from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from fastapi import FastAPI
 
 from prisma import Prisma
 
-db = Prisma()
+from . import config
+
+try:
+    import asyncpg  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    asyncpg = None
+
+
+def prisma_url(url: str) -> str:
+    """Add the configured query engine pool settings to a connection string.
+
+    Args:
+        url: A PostgreSQL connection string.
+
+    Returns:
+        str: The connection string with ``connection_limit`` and ``pool_timeout`` set,
+            unless the string already sets them.
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.setdefault("connection_limit", str(config.PRISMA_CONNECTION_LIMIT))
+    query.setdefault("pool_timeout", str(config.PRISMA_POOL_TIMEOUT))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _create_client(url: str) -> Prisma:
+    return Prisma(
+        datasource={"url": prisma_url(url)} if url else None,
+        connect_timeout=timedelta(seconds=config.PRISMA_CONNECT_TIMEOUT),
+        http={"timeout": config.PRISMA_HTTP_TIMEOUT},
+    )
+
+
+db = _create_client(config.DATABASE_URL)
+
+# Optional read replica, reads are routed to it by routing.py
+replica_db: Prisma | None = (
+    _create_client(config.READ_REPLICA_URL) if config.READ_REPLICA_URL else None
+)
+
+# Optional direct asyncpg pools for the hot read queries, see services/sql_reads.py
+read_pool: Any = None
+replica_read_pool: Any = None
+
+# The transaction open in the current task, see transaction()
+_transaction: ContextVar[Prisma | None] = ContextVar("transaction", default=None)
+
+
+def open_transaction() -> Prisma | None:
+    """Return the client of the transaction open in the current task, if any."""
+    return _transaction.get()
+
+
+class WriteRecord:
+    """Whether the code run under record_writes() has asked for the write client."""
+
+    def __init__(self) -> None:
+        """Initialize a WriteRecord for a block that has not written yet."""
+        self.wrote = False
+
+
+# The record of the block being run, see record_writes()
+_write_record: ContextVar[WriteRecord | None] = ContextVar("write_record", default=None)
+
+
+@contextmanager
+def record_writes() -> Iterator[WriteRecord]:
+    """Record whether the enclosed block writes to the primary.
+
+    Tasks started inside the block share the record, so their writes count too.
+
+    Yields:
+        WriteRecord: Its ``wrote`` turns True once the block calls writer().
+    """
+    record = WriteRecord()
+    token = _write_record.set(record)
+    try:
+        yield record
+    finally:
+        _write_record.reset(token)
+
+
+def writer() -> Prisma:
+    """Return the client writes should use: the open transaction, or the primary."""
+    record = _write_record.get()
+    if record is not None:
+        record.wrote = True
+    return _transaction.get() or db
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[None]:
+    """Run every query of the enclosed block in one transaction on the primary.
+
+    Reads go to the transaction too, so they see its uncommitted writes. It
+    commits when the block exits and rolls back if it raises. A block opened
+    inside another joins the outer transaction.
+    """
+    if _transaction.get() is not None:
+        yield
+        return
+    async with db.tx(timeout=timedelta(seconds=config.TRANSACTION_TIMEOUT_SECONDS)) as tx:
+        token = _transaction.set(tx)
+        try:
+            yield
+        finally:
+            _transaction.reset(token)
+
+# Connection string parameters understood by Prisma but rejected by asyncpg
+_PRISMA_ONLY_PARAMS = {
+    "schema",
+    "connection_limit",
+    "pool_timeout",
+    "connect_timeout",
+    "socket_timeout",
+    "pgbouncer",
+    "statement_cache_size",
+}
+
+
+def asyncpg_dsn(url: str) -> str:
+    """Strip the Prisma specific query parameters from a connection string.
+
+    Args:
+        url: A Prisma style PostgreSQL connection string.
+
+    Returns:
+        str: A connection string asyncpg accepts.
+    """
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in _PRISMA_ONLY_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def get_read_pool() -> Any:
+    """Return the primary asyncpg read pool, or None when reads go through Prisma."""
+    return read_pool
+
+
+def get_replica_read_pool() -> Any:
+    """Return the replica asyncpg read pool, or None if there is no replica pool."""
+    return replica_read_pool
+
+
+async def _create_read_pool(url: str) -> Any:
+    from .services.sql_reads import prepare_hot_statements
+
+    return await asyncpg.create_pool(  # type: ignore
+        asyncpg_dsn(url),
+        min_size=config.ASYNCPG_POOL_MIN_SIZE,
+        max_size=config.ASYNCPG_POOL_MAX_SIZE,
+        init=prepare_hot_statements,
+    )
+
+
+async def open_read_pool() -> None:
+    """Open the asyncpg read pools if they are enabled and available."""
+    global read_pool, replica_read_pool
+    if not config.USE_ASYNCPG_READS or asyncpg is None or read_pool is not None:
+        return
+
+    read_pool = await _create_read_pool(config.DATABASE_URL)
+    if config.READ_REPLICA_URL:
+        replica_read_pool = await _create_read_pool(config.READ_REPLICA_URL)
+
+
+async def close_read_pool() -> None:
+    """Close the asyncpg read pools if they were opened."""
+    global read_pool, replica_read_pool
+    pools, read_pool, replica_read_pool = (read_pool, replica_read_pool), None, None
+    for pool in pools:
+        if pool is not None:
+            await pool.close()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Connect to the database before running the test, then disconnect afterwards."""
-    await db.connect()
+    from .health import readiness, warmup
+    from .loop_monitor import loop_monitor
+    from .memory import start_tracing
+    from .read_snapshot import read_engine
+    from .routing import replica_lag_monitor
+    from .startup import timings
+    from .tracing import trace_exporter
+
+    # The memory backend keeps everything in-process and never opens a connection
+    uses_database = config.REPOSITORY_BACKEND == "prisma"
+    if uses_database:
+        with timings.phase("connect"):
+            await db.connect()
+            if replica_db is not None:
+                await replica_db.connect()
+            await open_read_pool()
+        replica_lag_monitor.start()
+    trace_exporter.start()
+    if config.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    if config.TRACEMALLOC_ENABLED:
+        start_tracing()
+    if config.READ_SNAPSHOT_ENABLED:
+        with timings.phase("read_snapshot"):
+            await read_engine.start()
+    if config.WARMUP_ON_STARTUP:
+        with timings.phase("warmup"):
+            await warmup()
+    timings.mark_ready()
+    readiness.mark_ready()
     yield
-    await db.disconnect()
+    readiness.mark_not_ready()
+    await loop_monitor.stop()
+    await read_engine.stop()
+    await replica_lag_monitor.stop()
+    await trace_exporter.stop()
+    if uses_database:
+        await close_read_pool()
+        if replica_db is not None:
+            await replica_db.disconnect()
+        await db.disconnect()
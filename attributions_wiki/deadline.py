@@ -0,0 +1,132 @@
+"""Per-request deadlines and cancellation of work for disconnected clients.
+
+Every HTTP request gets a deadline: ``REQUEST_TIMEOUT_SECONDS`` from now, or the
+number of seconds in the ``X-Request-Timeout`` header (capped at
+``REQUEST_TIMEOUT_MAX_SECONDS``). Service database calls run under
+``asyncio.timeout_at`` with that deadline (see services/db_call.py), so a slow
+query fails with DeadlineExceededError, answered as 504, instead of holding a
+pool connection indefinitely. If the client disconnects before the response
+is complete, the request task is cancelled outright so it stops waiting on the
+database.
+"""
+import asyncio
+import contextlib
+from contextvars import ContextVar
+from typing import Any
+
+from . import config
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+# Absolute deadline of the current request in event loop time, None outside requests
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+counters = {"disconnect_cancellations": 0}
+
+
+def current_deadline() -> float | None:
+    """The event loop time by which the current request must finish, if any."""
+    return _deadline.get()
+
+
+def remaining() -> float | None:
+    """Seconds left before the current request's deadline, if it has one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - asyncio.get_running_loop().time()
+
+
+def _request_timeout(headers: list[tuple[bytes, bytes]], default: float, maximum: float) -> float:
+    for name, value in headers:
+        if name == TIMEOUT_HEADER:
+            try:
+                requested = float(value)
+            except ValueError:
+                break
+            if requested > 0:
+                return min(requested, maximum)
+            break
+    return default
+
+
+class DeadlineMiddleware:
+    """Attach a deadline to every request and cancel it when the client goes away."""
+
+    def __init__(
+        self,
+        app: Any,
+        default_timeout: float = config.REQUEST_TIMEOUT_SECONDS,
+        max_timeout: float = config.REQUEST_TIMEOUT_MAX_SECONDS,
+    ) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            default_timeout: Seconds allowed when the request does not ask for a budget.
+            max_timeout: Upper bound for budgets asked for in the header.
+        """
+        self.app = app
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Run the request under its deadline, cancelling it on disconnect."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = _request_timeout(scope["headers"], self.default_timeout, self.max_timeout)
+        token = _deadline.set(asyncio.get_running_loop().time() + timeout)
+        try:
+            await self._run_until_disconnect(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+
+    async def _run_until_disconnect(self, scope: Any, receive: Any, send: Any) -> None:
+        # The app reads its messages from a queue fed by a watcher that also
+        # notices the disconnect, even while the app is busy awaiting the database.
+        # The queue holds one message, so the body is read no faster than the app
+        # consumes it and the server's flow control still applies.
+        messages: asyncio.Queue[Any] = asyncio.Queue(maxsize=1)
+        responded = False
+
+        async def send_tracking(message: Any) -> None:
+            nonlocal responded
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                responded = True
+
+        async def watch() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    # Never waits: an app blocked on an empty queue gets it now,
+                    # and receive_message hands it out once the queue is drained
+                    with contextlib.suppress(asyncio.QueueFull):
+                        messages.put_nowait(message)
+                    return
+                await messages.put(message)
+
+        async def receive_message() -> Any:
+            if watch_task.done() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        watch_task = asyncio.create_task(watch())
+        app_task = asyncio.create_task(self.app(scope, receive_message, send_tracking))
+        try:
+            await asyncio.wait({app_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+            if responded and not app_task.done():
+                # A disconnect after the whole response only says it was delivered;
+                # let the work the app does after responding (background tasks) finish
+                await app_task
+        finally:
+            if not app_task.done():
+                # Either the client disconnected or we are being cancelled ourselves
+                app_task.cancel()
+                if watch_task.done():
+                    counters["disconnect_cancellations"] += 1
+            watch_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await watch_task
+            with contextlib.suppress(asyncio.CancelledError):
+                await app_task
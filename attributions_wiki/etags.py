@@ -0,0 +1,107 @@
+"""Strong ETags and conditional requests for the API routes.
+
+An entity's ETag is its id and version and a collection's is the table version
+plus the page asked for, so both can be worked out from a version query that
+never loads a row. When the client's ``If-None-Match`` already names the
+current ETag the route answers ``304 Not Modified`` without reading or
+serializing anything else.
+
+Updates and deletes accept the entity ETag in ``If-Match`` and only go ahead
+if the row still has that version, see ``services.sql_writes``.
+
+A compressed response is a different representation, so CompressionMiddleware
+gives it its own ETag with the content coding appended (``"3-1700000000000:gzip"``,
+see ``encoded_etag``). Both comparisons here map it back first, so a client
+that only ever saw the compressed body can still revalidate and write.
+"""
+from fastapi import Request, Response, status
+
+from .exceptions import PreconditionFailedError
+from .repositories.base import version_values
+
+# Between an ETag and the content coding of a compressed response; versions are
+# digits and dashes and never contain it
+CODING_SEPARATOR = ":"
+
+
+def entity_etag(id: int | str, version: str) -> str:
+    """The strong ETag of one row."""
+    return f'"{id}-{version}"'
+
+
+def collection_etag(version: str, take: int | None = None, skip: int | None = None) -> str:
+    """The strong ETag of one page of a table."""
+    page = "" if take is None and skip is None else f";{skip or 0}+{'' if take is None else take}"
+    return f'"all-{version}{page}"'
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """The ETag of the representation of ``etag`` compressed with ``coding``."""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}{CODING_SEPARATOR}{coding}"'
+
+
+def unencoded_etag(etag: str) -> str:
+    """The ETag an ``encoded_etag`` was made from; other ETags are returned as they are."""
+    if not etag.endswith('"') or CODING_SEPARATOR not in etag:
+        return etag
+    return f'{etag[: etag.rindex(CODING_SEPARATOR)]}"'
+
+
+def matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an ``If-None-Match`` header names ``etag``.
+
+    The comparison is weak, as RFC 9110 asks for ``If-None-Match``, so a
+    ``W/`` prefix added by a proxy that recompressed the body still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        unencoded_etag(candidate.strip().removeprefix("W/")) == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether a request carries a validator worth checking before any read."""
+    return "if-none-match" in request.headers
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """Return a ``304 Not Modified`` response if the client already has ``etag``."""
+    if matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
+def if_match(request: Request, model: str, id: int) -> str | None:
+    """The version of row ``id`` named by ``If-Match``, or None without a precondition.
+
+    ``If-Match`` compares strongly, so weak ETags never match, and only the
+    first ETag of this row in the header is used. The ETag of a compressed
+    response names the same version as the uncompressed one.
+
+    Raises:
+        PreconditionFailedError: If the header names no version of the row at all.
+    """
+    return matched_version(request.headers.get("if-match"), model, id)
+
+
+def matched_version(header: str | None, model: str, id: int) -> str | None:
+    """The version of row ``id`` named by an ``If-Match`` value, see ``if_match``."""
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"{id}-'
+    for candidate in header.split(","):
+        candidate = unencoded_etag(candidate.strip())
+        if candidate.startswith(prefix) and candidate.endswith('"'):
+            version = candidate[len(prefix) : -1]
+            try:
+                version_values(model, version)
+            except ValueError:
+                continue
+            return version
+    raise PreconditionFailedError(f"If-Match names no version of {model} {id}")
@@ -35,6 +35,12 @@ class DeletionError(Exception):
     pass
 
 
+class PreconditionFailedError(Exception):
+    """Exception raised when a conditional write finds the row changed since it was read."""
+
+    pass
+
+
 class AuthenticationError(Exception):
     """Exception raised when an authentication operation fails."""
 
@@ -60,3 +66,15 @@ class UserNotFoundError(Exception):
     """Exception raised when the user is not found."""
 
     pass
+
+
+class OverloadedError(Exception):
+    """Exception raised when a request cannot be admitted because the server is at capacity."""
+
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """Exception raised when a database call runs past the request deadline."""
+
+    pass
@@ -0,0 +1,79 @@
+"""Sparse fieldsets: ``?fields=`` on the API list and get routes.
+
+``GET /api/v1/belief/get_all?fields=id,description`` returns just those
+fields of every belief. The names are checked against the model's columns
+(``repositories.base.FIELDS``) and the repository reads only those, so the
+other columns are never read, hydrated into models or serialized. ``id`` is
+always included, and the fields come back in table order whatever order they
+were asked for in, so equivalent requests share their queries.
+
+A partial response keeps the ETag of the full one: both describe the same
+version of the same rows, and each URL is cached on its own. A single row is
+read with the columns its version is made of (``with_version``), which are
+dropped again before it is sent, so the ETag costs no second query.
+"""
+from collections.abc import Sequence
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from .etags import entity_etag
+from .exceptions import ValidationError
+from .repositories.base import FIELDS, partial_version, version_fields
+
+FIELDS_DESCRIPTION = (
+    "Comma separated fields to return instead of all of them, e.g. id,description; "
+    "id is always included"
+)
+
+_rows = TypeAdapter(Any)
+
+
+def parse_fields(model: str, value: str | None) -> tuple[str, ...] | None:
+    """Parse a ``fields`` query parameter.
+
+    Args:
+        model: str - The model the fields belong to, e.g. ``"Belief"``.
+        value: str | None - The comma separated field names, as given.
+
+    Returns:
+        tuple[str, ...] | None: The fields in table order, ``id`` included, or
+        None when no fields were asked for and the full rows should be returned.
+
+    Raises:
+        ValidationError: If a name is not a field of the model, or none is given.
+    """
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(",")} - {""}
+    columns = FIELDS[model]
+    unknown = names - set(columns)
+    if unknown:
+        raise ValidationError(
+            f"Unknown {model} fields: {', '.join(sorted(unknown))}; "
+            f"expected some of {', '.join(columns)}"
+        )
+    if not names:
+        raise ValidationError("fields must name at least one field")
+    names.add("id")
+    return tuple(column for column in columns if column in names)
+
+
+def partial_response(rows: dict[str, Any] | Sequence[dict[str, Any]], etag: str) -> Response:
+    """Serialize partial rows straight to JSON, skipping the route's response model."""
+    return Response(
+        _rows.dump_json(rows), media_type="application/json", headers={"ETag": etag}
+    )
+
+
+def with_version(model: str, fields: tuple[str, ...]) -> tuple[str, ...]:
+    """``fields`` plus the columns the row's version is made of, in table order."""
+    wanted = {*fields, *version_fields(model)}
+    return tuple(column for column in FIELDS[model] if column in wanted)
+
+
+def partial_entity_response(model: str, row: dict[str, Any], fields: tuple[str, ...]) -> Response:
+    """Serialize the ``fields`` of a row read ``with_version``, tagged with its ETag."""
+    etag = entity_etag(row["id"], partial_version(model, row))
+    return partial_response({field: row[field] for field in fields}, etag)
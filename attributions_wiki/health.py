@@ -0,0 +1,155 @@
+"""Startup warmup, readiness state and connection pool statistics."""
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Any
+
+from prisma import Prisma
+
+from . import config
+from . import db as database
+from .exceptions import NotFoundError
+
+log = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Whether this worker has finished warming up and may take traffic."""
+
+    def __init__(self) -> None:
+        """Initialize a Readiness."""
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.ready_at: float | None = None
+
+    def mark_ready(self) -> None:
+        """Start reporting ready."""
+        self.ready = True
+        self.ready_at = time.monotonic()
+
+    def mark_not_ready(self) -> None:
+        """Stop reporting ready, e.g. while shutting down."""
+        self.ready = False
+
+    @property
+    def startup_seconds(self) -> float | None:
+        """Seconds from process start to ready, None while still starting."""
+        return None if self.ready_at is None else self.ready_at - self.started_at
+
+
+readiness = Readiness()
+
+
+async def _open_connections(client: Prisma) -> None:
+    # Concurrent queries make the engine open every pool connection up front
+    pings = (client.query_raw("SELECT 1") for _ in range(config.PRISMA_CONNECTION_LIMIT))
+    await asyncio.gather(*pings)
+
+
+async def _run_hot_queries() -> None:
+    from .services.attribution_service import get_attribution_by_id, get_attributions
+    from .services.belief_service import (
+        get_attributions_for_belief,
+        get_belief_by_id,
+        get_beliefs,
+    )
+    from .services.factor_service import get_factor_by_id, get_factors
+    from .templating import get_templates
+
+    await asyncio.gather(get_beliefs(take=1), get_attributions(take=1), get_factors(take=1))
+    with suppress(NotFoundError):
+        await get_belief_by_id({"id": 0})
+    with suppress(NotFoundError):
+        await get_attribution_by_id({"id": 0})
+    with suppress(NotFoundError):
+        await get_factor_by_id({"id": 0})
+    await get_attributions_for_belief({"id": 0})
+    for name in ("Home.html", "belief_list.html", "belief.html", "belief_card.html"):
+        get_templates().get_template(name)
+
+
+async def warmup() -> None:
+    """Open the pool connections and run every hot query once.
+
+    Failures are logged rather than raised: /readyz checks the database itself,
+    so a worker that could not warm up still starts and reports its state.
+    """
+    started = time.perf_counter()
+    try:
+        if config.REPOSITORY_BACKEND == "prisma":
+            await _open_connections(database.db)
+            if database.replica_db is not None:
+                await _open_connections(database.replica_db)
+        await _run_hot_queries()
+    except Exception:
+        log.warning("Warmup failed", exc_info=True)
+    else:
+        log.info("Warmup finished in %.3fs", time.perf_counter() - started)
+
+
+async def ping(client: Prisma) -> bool:
+    """Check that a client can reach its database.
+
+    Callers bound the wait with ``asyncio.timeout``.
+
+    Args:
+        client: The Prisma client to check.
+
+    Returns:
+        bool: True if ``SELECT 1`` succeeded.
+    """
+    try:
+        await client.query_raw("SELECT 1")
+    except Exception:
+        return False
+    return True
+
+
+async def _prisma_pool_stats(client: Prisma) -> dict[str, Any]:
+    limit = config.PRISMA_CONNECTION_LIMIT
+    try:
+        metrics = await client.get_metrics()
+    except Exception:
+        # The engine only exposes metrics with the "metrics" preview feature
+        return {"limit": limit, "available": False}
+    gauges = {gauge.key: gauge.value for gauge in metrics.gauges}
+    busy = gauges.get("prisma_pool_connections_busy", 0)
+    return {
+        "limit": limit,
+        "available": True,
+        "open": gauges.get("prisma_pool_connections_open", 0),
+        "busy": busy,
+        "idle": gauges.get("prisma_pool_connections_idle", 0),
+        "waiting_queries": gauges.get("prisma_client_queries_wait", 0),
+        "saturation": round(busy / limit, 3),
+    }
+
+
+def _asyncpg_pool_stats(pool: Any) -> dict[str, Any]:
+    size, idle, limit = pool.get_size(), pool.get_idle_size(), pool.get_max_size()
+    return {
+        "limit": limit,
+        "open": size,
+        "busy": size - idle,
+        "idle": idle,
+        "saturation": round((size - idle) / limit, 3),
+    }
+
+
+async def pool_stats() -> dict[str, Any]:
+    """Report how busy each connection pool is.
+
+    Returns:
+        dict: Per pool open, busy and idle connections and ``saturation``, the
+            fraction of the pool limit currently in use. Prisma pools also say whether
+            the engine exposes its metrics (``available``).
+    """
+    stats: dict[str, Any] = {"prisma": await _prisma_pool_stats(database.db)}
+    if database.replica_db is not None and database.replica_db.is_connected():
+        stats["prisma_replica"] = await _prisma_pool_stats(database.replica_db)
+    if database.get_read_pool() is not None:
+        stats["asyncpg"] = _asyncpg_pool_stats(database.get_read_pool())
+    if database.get_replica_read_pool() is not None:
+        stats["asyncpg_replica"] = _asyncpg_pool_stats(database.get_replica_read_pool())
+    return stats
@@ -0,0 +1,190 @@
+"""Event loop lag monitor and blocking call detector.
+
+A heartbeat task sleeps for ``LOOP_MONITOR_INTERVAL`` seconds at a time and
+records how late it wakes up as ``event_loop_lag_seconds``. Synchronous work in
+an async handler (password hashing, token decoding, template rendering) keeps
+the heartbeat from running, and every other request waits along with it.
+
+A watchdog thread notices when the heartbeat has been silent for longer than
+``LOOP_BLOCK_THRESHOLD_MS`` and snapshots the event loop thread's stack while it
+is still blocked. The request being served is found in the ASGI ``scope`` of the
+middleware frames on that stack, so the report names the route and the
+innermost application frame that was running. Reports are logged, counted in
+``event_loop_blocked_total`` and the most recent ones are kept for
+``/debug/blocking``.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import suppress
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from . import config
+from .memory import track_size
+from .metrics import Counter, Gauge, Histogram, registry
+
+log = logging.getLogger(__name__)
+
+_PACKAGE_DIR = str(Path(__file__).parent)
+
+loop_lag = registry.register(
+    Histogram(
+        "event_loop_lag_seconds",
+        "How late the event loop heartbeat woke up.",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+)
+loop_lag_max = registry.register(
+    Gauge("event_loop_lag_max_seconds", "Largest event loop lag since the last scrape.")
+)
+loop_blocked = registry.register(
+    Counter(
+        "event_loop_blocked_total",
+        "Times the event loop was blocked past the threshold, by route.",
+        ("route",),
+    )
+)
+
+
+def _request_scope(frame: FrameType | None) -> dict[str, Any] | None:
+    """Find the innermost ASGI HTTP scope among the frames of a stack."""
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            return scope
+        frame = frame.f_back
+    return None
+
+
+def _application_frame(frame: FrameType | None) -> str | None:
+    """Describe the innermost frame that belongs to this package."""
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(_PACKAGE_DIR) and code.co_filename != __file__:
+            return f"{Path(code.co_filename).name}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def describe_stack(frame: FrameType | None) -> dict[str, Any]:
+    """Summarize a stack: the route being served, the app frame and the trace.
+
+    Args:
+        frame: The innermost frame of the stack.
+
+    Returns:
+        dict: ``route`` (template, else path), ``method``, ``handler`` and ``stack``.
+    """
+    scope = _request_scope(frame)
+    route = None
+    if scope is not None:
+        route = getattr(scope.get("route"), "path", None) or scope.get("path")
+    return {
+        "route": route,
+        "method": scope.get("method") if scope is not None else None,
+        "handler": _application_frame(frame),
+        "stack": "".join(traceback.format_stack(frame, limit=30)) if frame else "",
+    }
+
+
+class LoopMonitor:
+    """Measure event loop lag and capture the stack when the loop blocks."""
+
+    def __init__(self, interval: float, threshold_ms: float, keep: int = 20) -> None:
+        """Initialize a LoopMonitor.
+
+        Args:
+            interval: Seconds between heartbeats.
+            threshold_ms: Heartbeat silence, beyond the interval, reported as blocking.
+            keep: How many blocking reports to keep for /debug/blocking.
+        """
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.events: deque[dict[str, Any]] = deque(maxlen=keep)
+        self.max_lag = 0.0
+        self._last_beat = time.perf_counter()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self._last_beat = now
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            silence = time.perf_counter() - beat
+            # One report per stall: the heartbeat moves on once the loop is free
+            if silence < self.interval + self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            self.record(describe_stack(frame), silence)
+
+    def record(self, blocking: dict[str, Any], silence: float) -> None:
+        """Log, count and keep a blocking report.
+
+        Args:
+            blocking: The stack summary from ``describe_stack``.
+            silence: Seconds the heartbeat had been silent when the stack was taken.
+        """
+        blocking = {**blocking, "blocked_ms": round(silence * 1000, 1), "at": time.time()}
+        self.events.append(blocking)
+        loop_blocked.inc(blocking["route"] or "<none>")
+        log.warning(
+            "Event loop blocked for %.0fms serving %s %s at %s\n%s",
+            blocking["blocked_ms"],
+            blocking["method"],
+            blocking["route"],
+            blocking["handler"],
+            blocking["stack"],
+        )
+
+    def collect(self) -> None:
+        """Publish the largest lag since the previous scrape."""
+        loop_lag_max.set(self.max_lag)
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread."""
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watchdog."""
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+
+loop_monitor = LoopMonitor(config.LOOP_MONITOR_INTERVAL, config.LOOP_BLOCK_THRESHOLD_MS)
+registry.add_collector(loop_monitor.collect)
+track_size("blocking_reports", lambda: len(loop_monitor.events))
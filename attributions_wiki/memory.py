@@ -0,0 +1,247 @@
+"""Memory accounting: tracemalloc snapshots, per-route peak allocations and cache sizes.
+
+tracemalloc slows allocations down noticeably, so it only runs when
+``TRACEMALLOC_ENABLED`` is set or an admin starts it from ``/debug/memory``.
+While it runs, admins can take named snapshots, list the biggest allocation
+sites of a snapshot and diff two snapshots to see what grew in between.
+
+MemorySamplingMiddleware measures the peak traced memory of a sample of
+requests (``MEMORY_SAMPLE_RATE``) and records how far above the starting point
+it went in ``http_request_peak_alloc_bytes`` by route template. tracemalloc only
+has one peak for the whole process, so a request is only sampled when it starts
+with no other request in flight. Requests that start while it runs still add to
+its peak, which makes the number an upper bound under load.
+
+Modules that keep data around register a size function with ``track_size``;
+the sizes are published as ``cache_entries`` along with ``process_rss_bytes``.
+"""
+import random
+import resource
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from . import config
+from .metrics import Gauge, Histogram, registry
+
+# Bytes, from 64KiB to 256MiB
+PEAK_BUCKETS = tuple(float(2**power) for power in range(16, 29, 2))
+
+peak_alloc = registry.register(
+    Histogram(
+        "http_request_peak_alloc_bytes",
+        "Peak traced memory above the starting point of sampled requests, by route.",
+        ("route",),
+        buckets=PEAK_BUCKETS,
+    )
+)
+cache_entries = registry.register(
+    Gauge("cache_entries", "Entries held by in-process caches and buffers.", ("cache",))
+)
+process_rss = registry.register(Gauge("process_rss_bytes", "Resident set size of the worker."))
+traced_memory = registry.register(
+    Gauge("tracemalloc_traced_bytes", "Memory traced by tracemalloc.", ("kind",))
+)
+
+_size_functions: dict[str, Callable[[], int]] = {}
+
+
+def track_size(name: str, size: Callable[[], int]) -> None:
+    """Publish the number of entries of a cache as ``cache_entries{cache=name}``.
+
+    Args:
+        name: The cache label.
+        size: Returns the current number of entries; called on every scrape.
+    """
+    _size_functions[name] = size
+
+
+def cache_sizes() -> dict[str, int]:
+    """Current entries of every tracked cache."""
+    return {name: size() for name, size in _size_functions.items()}
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process, falling back to the peak RSS."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # No /proc, e.g. macOS, where ru_maxrss is in bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _collect() -> None:
+    for name, entries in cache_sizes().items():
+        cache_entries.set(entries, name)
+    process_rss.set(rss_bytes())
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        traced_memory.set(current, "current")
+        traced_memory.set(peak, "peak")
+
+
+registry.add_collector(_collect)
+
+
+def start_tracing(frames: int = config.TRACEMALLOC_FRAMES) -> None:
+    """Start tracing allocations, keeping ``frames`` stack frames per allocation."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    """Stop tracing allocations and free the traces, stored snapshots stay."""
+    tracemalloc.stop()
+
+
+class SnapshotStore:
+    """Named tracemalloc snapshots, oldest dropped first."""
+
+    def __init__(self, keep: int = 10) -> None:
+        """Initialize a SnapshotStore.
+
+        Args:
+            keep: How many snapshots to hold on to.
+        """
+        self.keep = keep
+        self.snapshots: dict[str, tuple[float, tracemalloc.Snapshot]] = {}
+        self._counter = 0
+
+    def take(self) -> str:
+        """Take a snapshot and return its name.
+
+        Raises:
+            RuntimeError: If tracemalloc is not tracing.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing")
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        self._counter += 1
+        name = f"s{self._counter}"
+        self.snapshots[name] = (time.time(), snapshot)
+        while len(self.snapshots) > self.keep:
+            del self.snapshots[next(iter(self.snapshots))]
+        return name
+
+    def get(self, name: str) -> tracemalloc.Snapshot:
+        """Return a stored snapshot.
+
+        Raises:
+            KeyError: If there is no snapshot with that name.
+        """
+        return self.snapshots[name][1]
+
+    def list(self) -> list[dict[str, Any]]:
+        """Describe the stored snapshots, oldest first."""
+        return [
+            {
+                "name": name,
+                "taken_at": taken_at,
+                "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+            }
+            for name, (taken_at, snapshot) in self.snapshots.items()
+        ]
+
+
+snapshot_store = SnapshotStore()
+
+
+def top_allocations(
+    snapshot: tracemalloc.Snapshot, group_by: str = "lineno", limit: int = 25
+) -> list[dict[str, Any]]:
+    """The allocation sites holding the most memory in a snapshot.
+
+    Args:
+        snapshot: The snapshot to summarize.
+        group_by: "filename", "lineno" or "traceback".
+        limit: How many sites to return.
+
+    Returns:
+        list: Location, size in bytes and number of blocks per site.
+    """
+    return [
+        {"where": str(stat.traceback), "bytes": stat.size, "blocks": stat.count}
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+
+
+def diff_allocations(
+    base: tracemalloc.Snapshot,
+    target: tracemalloc.Snapshot,
+    group_by: str = "lineno",
+    limit: int = 25,
+) -> list[dict[str, Any]]:
+    """The allocation sites that grew or shrank the most between two snapshots.
+
+    Args:
+        base: The earlier snapshot.
+        target: The later snapshot.
+        group_by: "filename", "lineno" or "traceback".
+        limit: How many sites to return.
+
+    Returns:
+        list: Location, size and size difference in bytes, block count and difference.
+    """
+    return [
+        {
+            "where": str(stat.traceback),
+            "bytes": stat.size,
+            "bytes_diff": stat.size_diff,
+            "blocks": stat.count,
+            "blocks_diff": stat.count_diff,
+        }
+        for stat in target.compare_to(base, group_by)[:limit]
+    ]
+
+
+class MemorySamplingMiddleware:
+    """Record the peak allocation of a sample of requests by route template."""
+
+    def __init__(self, app: Any, sample_rate: float = config.MEMORY_SAMPLE_RATE) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            sample_rate: Fraction of requests to measure while tracemalloc is tracing.
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.in_flight = 0
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Serve the request, measuring its peak allocation if it is sampled."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = (
+            self.in_flight == 0
+            and tracemalloc.is_tracing()
+            and random.random() < self.sample_rate
+        )
+        self.in_flight += 1
+        if not sampled:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.in_flight -= 1
+            return
+
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            # Another request may have started meanwhile; its allocations count
+            # too, so this is an upper bound in that case.
+            _, peak = tracemalloc.get_traced_memory()
+            route = getattr(scope.get("route"), "path", None) or "<unrouted>"
+            peak_alloc.observe(max(0, peak - start), route)
@@ -0,0 +1,263 @@
+"""Prometheus-style metrics: counters, gauges and histograms rendered at /metrics.
+
+The collectors are deliberately minimal so recording stays cheap: a sample is a
+dictionary lookup keyed by the label values plus, for histograms, a bisect into
+the bucket bounds. Everything runs on the event loop thread, so no locking is
+needed.
+"""
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any, ParamSpec, TypeVar
+
+from . import exceptions
+from .startup import timings
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# Seconds, tuned for web requests and database queries
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize a Counter."""
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add ``amount`` to the series with the given label values."""
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def set_total(self, total: float, *labels: str) -> None:
+        """Set the series to a running total kept elsewhere, read when scraped."""
+        self.values[labels] = total
+
+    def samples(self) -> Iterator[str]:
+        """Yield one exposition line per series."""
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, set when it is observed or scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Initialize a Gauge."""
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the series with the given label values."""
+        self.values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        """Yield one exposition line per series."""
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize a Histogram."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # Per series: a count per bucket (plus +Inf), then the sum and the total count
+        self.values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation in the series with the given label values."""
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> Iterator[str]:
+        """Yield the bucket, sum and count lines of every series."""
+        for labels, series in self.values.items():
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, "+Inf"), series, strict=False):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            plain = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{plain} {series[-2]}"
+            yield f"{self.name}_count{plain} {series[-1]}"
+
+
+class Registry:
+    """The set of metrics exposed at /metrics."""
+
+    def __init__(self) -> None:
+        """Initialize a Registry."""
+        self.metrics: dict[str, _Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Any) -> Any:
+        """Add a metric and return it."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run ``collector`` before every render, e.g. to refresh gauges."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        for collector in self.collectors:
+            collector()
+        return "".join(metric.render() for metric in self.metrics.values())
+
+
+registry = Registry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template and status.",
+        ("method", "route", "status"),
+    )
+)
+service_call_duration = registry.register(
+    Histogram(
+        "service_call_duration_seconds",
+        "Latency of service layer functions, including their database calls.",
+        ("function",),
+    )
+)
+service_calls = registry.register(
+    Counter("service_calls_total", "Service layer calls by outcome.", ("function", "outcome"))
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Latency of individual database calls by operation.",
+        ("operation",),
+    )
+)
+exceptions_raised = registry.register(
+    Counter("app_exceptions_total", "Application exceptions raised by type.", ("exception",))
+)
+
+# Expose every exception type from exceptions.py, even before it is first raised
+_APP_EXCEPTIONS = frozenset(
+    name
+    for name, cls in inspect.getmembers(exceptions, inspect.isclass)
+    if issubclass(cls, Exception) and cls.__module__ == exceptions.__name__
+)
+for _name in _APP_EXCEPTIONS:
+    exceptions_raised.inc(_name, amount=0)
+
+
+def count_exception(err: BaseException) -> None:
+    """Count an exception if it is one of the application's own types."""
+    name = type(err).__name__
+    if name in _APP_EXCEPTIONS:
+        exceptions_raised.inc(name)
+
+
+def instrument(fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Record latency, outcome and application exceptions of a service function."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as err:
+            outcome = type(err).__name__
+            count_exception(err)
+            raise
+        finally:
+            service_call_duration.observe(time.perf_counter() - started, name)
+            service_calls.inc(name, outcome)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Record the latency of every HTTP request by route template and status."""
+
+    def __init__(self, app: Any) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Time the request and record it once the response has been sent."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Any) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; label by its template
+            # so /belief/get/1 and /belief/get/2 share one series.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unrouted>"
+            elapsed = time.perf_counter() - started
+            http_request_duration.observe(elapsed, scope["method"], template, status)
+            timings.request_finished(template, elapsed)
@@ -0,0 +1,236 @@
+"""On-demand profiling of single requests, for admins only.
+
+An admin adds ``X-Profile: cprofile`` or ``X-Profile: sample`` (or the
+``?profile=`` query flag) to any request to run it under a profiler:
+
+- ``cprofile`` uses the deterministic cProfile profiler. It sees the whole event
+  loop thread, so work of other requests served at the same time shows up too,
+  and only one such profile can run at a time.
+- ``sample`` uses pyinstrument's sampling profiler in async mode, which only
+  attributes time to the profiled request and renders an HTML flamegraph-style
+  report. It needs the optional ``pyinstrument`` package.
+
+By default the report is stored under ``PROFILE_DIR`` and named in the
+``X-Profile-Id`` response header; admins can download it from
+``/debug/profiles/{name}``. Only the newest ``PROFILE_KEEP`` profiles are
+kept. With ``X-Profile-Output: inline`` (or ``?profile_output=inline``) the
+report is returned instead of the response.
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+import re
+import uuid
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+from . import config
+from .exceptions import InvalidTokenError, UsernameNotFoundError, UserNotFoundError
+from .services.user_service import (
+    get_current_active_user,
+    get_current_admin_user,
+    get_current_user,
+)
+from .tracing import current_request_id
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    SamplingProfiler = None
+
+PROFILE_HEADER = b"x-profile"
+OUTPUT_HEADER = b"x-profile-output"
+MODES = {"cprofile", "sample"}
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# cProfile hooks the whole interpreter thread, so only one request at a time
+_cprofile_lock = asyncio.Lock()
+
+
+class _CProfileRun:
+    suffix = ".prof"
+    media_type = "text/plain; charset=utf-8"
+
+    def __init__(self) -> None:
+        self.profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profiler.enable()
+
+    def stop(self) -> None:
+        self.profiler.disable()
+
+    def report(self) -> bytes:
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        return out.getvalue().encode()
+
+    def save(self, path: Path) -> None:
+        # Binary pstats dump, open with snakeviz or pstats
+        self.profiler.dump_stats(path)
+
+
+class _SampleRun:
+    suffix = ".html"
+    media_type = "text/html; charset=utf-8"
+
+    def __init__(self) -> None:
+        self.profiler = SamplingProfiler(interval=0.001, async_mode="enabled")  # type: ignore
+
+    def start(self) -> None:
+        self.profiler.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+
+    def report(self) -> bytes:
+        return self.profiler.output_html().encode()
+
+    def save(self, path: Path) -> None:
+        path.write_bytes(self.report())
+
+
+def _requested(scope: Any) -> tuple[str | None, bool]:
+    """Return the requested profiler mode and whether the report goes inline."""
+    headers = dict(scope["headers"])
+    mode = headers.get(PROFILE_HEADER, b"").decode("latin-1").lower() or None
+    inline = headers.get(OUTPUT_HEADER, b"").decode("latin-1").lower() == "inline"
+    if scope.get("query_string"):
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        mode = mode or (query.get("profile", [""])[0].lower() or None)
+        inline = inline or query.get("profile_output", [""])[0].lower() == "inline"
+    if mode in {"1", "true"}:
+        mode = "cprofile"
+    return mode, inline
+
+
+async def _authorize(scope: Any) -> tuple[int, str] | None:
+    """Check the bearer token belongs to an active admin; returns an error otherwise."""
+    # Imported on first use, like everywhere else; see startup.py
+    from jose import JWTError
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return 401, "Profiling requires an admin bearer token"
+    try:
+        user = await get_current_user(token)
+        user = await get_current_active_user(user)
+        await get_current_admin_user(user)
+    except HTTPException as err:
+        return err.status_code, str(err.detail)
+    except (InvalidTokenError, UsernameNotFoundError, UserNotFoundError, JWTError):
+        return 401, "Could not validate credentials"
+    return None
+
+
+async def _send_plain(send: Any, status: int, body: bytes, media_type: str, extra: list[Any]) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", media_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+                *extra,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def _prune(directory: Path, keep: int) -> None:
+    profiles = []
+    for path in directory.iterdir():
+        if path.suffix in (_CProfileRun.suffix, _SampleRun.suffix):
+            # Another worker may have pruned it already
+            with suppress(FileNotFoundError):
+                profiles.append((path.stat().st_mtime, path))
+    profiles.sort()
+    for _, path in profiles[: max(len(profiles) - keep, 0)]:
+        path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it, if they come from an admin."""
+
+    def __init__(
+        self, app: Any, profile_dir: str = config.PROFILE_DIR, keep: int = config.PROFILE_KEEP
+    ) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            profile_dir: Directory stored profiles are written to.
+            keep: Stored profiles kept, the oldest are deleted beyond it; 0 keeps them all.
+        """
+        self.app = app
+        self.profile_dir = Path(profile_dir)
+        self.keep = keep
+
+    def _store(self, run: Any, name: str) -> None:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        run.save(self.profile_dir / name)
+        if self.keep > 0:
+            _prune(self.profile_dir, self.keep)
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Serve the request, under a profiler when an admin asked for one."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode, inline = _requested(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        if mode not in MODES:
+            await _send_plain(send, 400, b"Unknown profiler, use cprofile or sample", "text/plain", [])
+            return
+        if mode == "sample" and SamplingProfiler is None:
+            await _send_plain(send, 501, b"Install pyinstrument for sampling profiles", "text/plain", [])
+            return
+        error = await _authorize(scope)
+        if error is not None:
+            await _send_plain(send, error[0], error[1].encode(), "text/plain", [])
+            return
+
+        if mode == "cprofile":
+            if _cprofile_lock.locked():
+                await _send_plain(send, 409, b"Another cProfile run is in progress", "text/plain", [])
+                return
+            async with _cprofile_lock:
+                await self._profile(_CProfileRun(), scope, receive, send, inline)
+        else:
+            await self._profile(_SampleRun(), scope, receive, send, inline)
+
+    async def _profile(self, run: Any, scope: Any, receive: Any, send: Any, inline: bool) -> None:
+        request_id = current_request_id() or ""
+        name = (request_id if _SAFE_NAME.match(request_id) else uuid.uuid4().hex) + run.suffix
+
+        async def send_with_profile_id(message: Any) -> None:
+            if inline:
+                # The report replaces the response, so drop what the app sends
+                return
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (b"x-profile-id", name.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        run.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            run.stop()
+            if not inline:
+                await asyncio.to_thread(self._store, run, name)
+
+        if inline:
+            await _send_plain(
+                send, 200, run.report(), run.media_type, [(b"x-profile-id", name.encode())]
+            )
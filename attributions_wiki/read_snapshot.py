@@ -0,0 +1,563 @@
+"""An in-process snapshot of the wiki that serves every read from memory.
+
+With ``READ_SNAPSHOT_ENABLED`` the repositories are wrapped so that reads of
+beliefs, attributions, factors and their links never reach the backend. The
+snapshot is loaded when the worker starts: each table becomes a dict of rows by
+id plus a sorted ``array`` of ids to slice pages from, links are stored as
+sorted id tuples in both directions and factors are indexed by their unique
+foreign keys. Until the first load finishes, reads fall through to the backend.
+
+Writes go to the backend first and the row it returns is then applied to the
+snapshot, so a worker reads its own writes straight away. Changes made by
+other workers or processes show up when the snapshot is reloaded, every
+``READ_SNAPSHOT_RELOAD_SECONDS``. A reload builds a new snapshot off to the
+side, replays the changes this worker made while it was loading and swaps it
+in; rows are only replaced by rows with the same or a newer ``updated_at``, so
+replaying is safe.
+
+Every applied change and reload bumps the worker's ``version``, which
+SnapshotVersionMiddleware puts in the ``X-Snapshot-Version`` response header.
+Versions only compare within one worker.
+
+Inside a transaction (``Repositories.transaction``) reads go to the backend,
+which sees the transaction's uncommitted writes, and the changes are held
+back until it commits; a rolled back transaction never touches the snapshot.
+
+Rows are the model instances the backend returned and are shared between
+requests; callers must treat them as read-only. Users are not part of the
+snapshot.
+"""
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from typing import Any
+
+from . import config
+from .memory import track_size
+from .metrics import Gauge, registry
+from .repositories.base import (
+    VERSION_COLUMNS,
+    Repositories,
+    partial,
+    row_version,
+    version_string,
+)
+
+log = logging.getLogger(__name__)
+
+VERSION_HEADER = b"x-snapshot-version"
+
+snapshot_version = registry.register(
+    Gauge("read_snapshot_version", "Changes and reloads applied to the read snapshot.")
+)
+snapshot_age = registry.register(
+    Gauge("read_snapshot_age_seconds", "Seconds since the read snapshot was last loaded.")
+)
+
+# The other side of each link and the Factor column pointing at each model
+_OTHER = {"Belief": "Attribution", "Attribution": "Belief"}
+_FACTOR_KEY = {"Belief": "beliefId", "Attribution": "attributionId"}
+
+Change = Callable[["Snapshot"], None]
+
+# Changes made by the transaction open in the current task, applied when it commits
+_uncommitted: ContextVar[list[Change] | None] = ContextVar("snapshot_uncommitted", default=None)
+
+
+class Table:
+    """Rows of one model by id, with the ids kept sorted for paging."""
+
+    __slots__ = ("ids", "newest", "rows")
+
+    def __init__(self, rows: Iterable[Any]) -> None:
+        """Initialize a Table.
+
+        Args:
+            rows: The model instances to hold.
+        """
+        self.rows: dict[int, Any] = {row.id: row for row in rows}
+        self.ids = array("q", sorted(self.rows))
+        # The largest updated_at, for the table version
+        self.newest = max((row.updated_at for row in self.rows.values()), default=None)
+
+    def page(
+        self, take: int | None = None, skip: int | None = None, after: int | None = None
+    ) -> list[Any]:
+        """Rows ordered by id, like ``find_many(take=..., skip=..., after=...)``."""
+        start = (skip or 0) + (0 if after is None else bisect_right(self.ids, after))
+        stop = None if take is None else start + take
+        rows = self.rows
+        return [rows[id] for id in self.ids[start:stop]]
+
+    def put(self, row: Any) -> Any | None:
+        """Insert or replace a row unless the stored one is newer; returns the old row."""
+        current = self.rows.get(row.id)
+        if current is None:
+            insort(self.ids, row.id)
+        elif current.updated_at > row.updated_at:
+            return current
+        self.rows[row.id] = row
+        if self.newest is None or row.updated_at > self.newest:
+            self.newest = row.updated_at
+        return current
+
+    def drop(self, id: int) -> Any | None:
+        """Remove a row and return it, or None if it is not there."""
+        row = self.rows.pop(id, None)
+        if row is not None:
+            del self.ids[bisect_left(self.ids, id)]
+            if row.updated_at == self.newest:
+                self.newest = max((other.updated_at for other in self.rows.values()), default=None)
+        return row
+
+
+class Snapshot:
+    """Beliefs, attributions, factors and links, indexed for the service reads."""
+
+    def __init__(
+        self,
+        beliefs: Iterable[Any],
+        attributions: Iterable[Any],
+        factors: Iterable[Any],
+        links: Iterable[tuple[int, int]],
+    ) -> None:
+        """Build a Snapshot.
+
+        Args:
+            beliefs: Every Belief.
+            attributions: Every Attribution.
+            factors: Every Factor.
+            links: Every (belief id, attribution id) pair.
+        """
+        self.tables = {
+            "Belief": Table(beliefs),
+            "Attribution": Table(attributions),
+            "Factor": Table(factors),
+        }
+        by_belief: dict[int, list[int]] = {}
+        by_attribution: dict[int, list[int]] = {}
+        for belief, attribution in links:
+            by_belief.setdefault(belief, []).append(attribution)
+            by_attribution.setdefault(attribution, []).append(belief)
+        self.links: dict[str, dict[int, tuple[int, ...]]] = {
+            "Belief": {id: tuple(sorted(ids)) for id, ids in by_belief.items()},
+            "Attribution": {id: tuple(sorted(ids)) for id, ids in by_attribution.items()},
+        }
+        # Factor ids by the unique foreign key they hold
+        self.factor_by: dict[str, dict[int, int]] = {"beliefId": {}, "attributionId": {}}
+        for factor in self.tables["Factor"].rows.values():
+            self._index_factor(factor)
+
+    def _index_factor(self, factor: Any) -> None:
+        for key, index in self.factor_by.items():
+            value = getattr(factor, key)
+            if value is not None:
+                index[value] = factor.id
+
+    def _unindex_factor(self, factor: Any) -> None:
+        for key, index in self.factor_by.items():
+            value = getattr(factor, key)
+            if value is not None and index.get(value) == factor.id:
+                del index[value]
+
+    def linked(self, model: str, id: int) -> list[Any]:
+        """The rows linked to a belief or attribution, ordered by id."""
+        rows = self.tables[_OTHER[model]].rows
+        return [rows[other] for other in self.links[model].get(id, ()) if other in rows]
+
+    def factor(self, key: str, value: int) -> Any | None:
+        """The factor whose ``key`` column holds ``value``."""
+        factor_id = self.factor_by[key].get(value)
+        return None if factor_id is None else self.tables["Factor"].rows.get(factor_id)
+
+    def put(self, model: str, row: Any) -> None:
+        """Insert or replace a row."""
+        previous = self.tables[model].put(row)
+        if model == "Factor":
+            if previous is not None:
+                self._unindex_factor(previous)
+            self._index_factor(self.tables[model].rows[row.id])
+
+    def drop(self, model: str, id: int) -> None:
+        """Remove a row along with its links and the foreign keys pointing at it."""
+        row = self.tables[model].drop(id)
+        if row is None:
+            return
+        if model == "Factor":
+            self._unindex_factor(row)
+            return
+        self.set_links(model, id, ())
+        # ON DELETE SET NULL on the factor that pointed at the row
+        factor_id = self.factor_by[_FACTOR_KEY[model]].pop(id, None)
+        if factor_id is not None:
+            factors = self.tables["Factor"].rows
+            factors[factor_id] = factors[factor_id].model_copy(
+                update={_FACTOR_KEY[model]: None}
+            )
+
+    def set_links(self, model: str, id: int, others: Iterable[int]) -> None:
+        """Replace the links of a belief or attribution."""
+        links, back = self.links[model], self.links[_OTHER[model]]
+        current = set(links.get(id, ()))
+        target = set(others)
+        for other in current - target:
+            remaining = tuple(linked for linked in back.get(other, ()) if linked != id)
+            if remaining:
+                back[other] = remaining
+            else:
+                back.pop(other, None)
+        for other in target - current:
+            back[other] = tuple(sorted((*back.get(other, ()), id)))
+        if target:
+            links[id] = tuple(sorted(target))
+        else:
+            links.pop(id, None)
+
+    def collection_version(self, model: str) -> str:
+        """The version of a table, see ``repositories.base``."""
+        table = self.tables[model]
+        counts = (len(self.factor_by[column]) for column in VERSION_COLUMNS.get(model, ()))
+        return version_string(len(table.rows), table.newest, *counts)
+
+    def size(self) -> int:
+        """Rows held across the tables."""
+        return sum(len(table.rows) for table in self.tables.values())
+
+
+class ReadEngine:
+    """Owns the current snapshot, applies changes to it and reloads it."""
+
+    def __init__(self, reload_seconds: float = config.READ_SNAPSHOT_RELOAD_SECONDS) -> None:
+        """Initialize a ReadEngine.
+
+        Args:
+            reload_seconds: How often to reload the snapshot; 0 never reloads.
+        """
+        self.reload_seconds = reload_seconds
+        self.snapshot: Snapshot | None = None
+        self.version = 0
+        self.loaded_at: float | None = None
+        self.inner: Repositories | None = None
+        # Changes applied while a reload is in progress, replayed onto the new snapshot
+        self._pending: list[Change] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def wrap(self, inner: Repositories) -> Repositories:
+        """Serve the reads of ``inner`` from the snapshot once it is loaded."""
+        self.inner = inner
+        return Repositories(
+            backend=inner.backend,
+            belief=SnapshotBeliefRepository(self, inner.belief, "Belief"),
+            attribution=SnapshotAttributionRepository(self, inner.attribution, "Attribution"),
+            factor=SnapshotRepository(self, inner.factor, "Factor"),
+            user=inner.user,
+            transaction=self.transaction,
+        )
+
+    def current(self) -> "Snapshot | None":
+        """The snapshot reads should use, None inside a transaction it does not hold yet."""
+        return self.snapshot if _uncommitted.get() is None else None
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Open a backend transaction and apply its changes once it commits."""
+        if self.inner is None:
+            raise RuntimeError("ReadEngine.wrap must be called before transaction")
+        if _uncommitted.get() is not None:
+            yield
+            return
+        changes: list[Change] = []
+        token = _uncommitted.set(changes)
+        try:
+            async with self.inner.transaction():
+                yield
+        finally:
+            _uncommitted.reset(token)
+        for change in changes:
+            self.apply(change)
+
+    async def load(self) -> None:
+        """Read every table from the backend and swap the new snapshot in."""
+        if self.inner is None:
+            raise RuntimeError("ReadEngine.wrap must be called before load")
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            beliefs, attributions, factors, links = await asyncio.gather(
+                self.inner.belief.find_many(),
+                self.inner.attribution.find_many(),
+                self.inner.factor.find_many(),
+                self.inner.belief.links(),
+            )
+            snapshot = Snapshot(beliefs, attributions, factors, links)
+            for change in self._pending:
+                change(snapshot)
+        finally:
+            self._pending = None
+        self.snapshot = snapshot
+        self.loaded_at = time.time()
+        self.version += 1
+        log.info(
+            "Loaded read snapshot of %d rows in %.3fs",
+            snapshot.size(),
+            time.perf_counter() - started,
+        )
+
+    def apply(self, change: Change) -> None:
+        """Apply a change made through the backend to the snapshot."""
+        uncommitted = _uncommitted.get()
+        if uncommitted is not None:
+            uncommitted.append(change)
+            return
+        # Before the check below, so a first load, or one retried after it
+        # failed, replays the writes made while it was reading
+        if self._pending is not None:
+            self._pending.append(change)
+        if self.snapshot is None:
+            return
+        change(self.snapshot)
+        self.version += 1
+
+    def size(self) -> int:
+        """Rows in the current snapshot."""
+        return 0 if self.snapshot is None else self.snapshot.size()
+
+    def collect(self) -> None:
+        """Publish the version and age of the snapshot."""
+        snapshot_version.set(self.version)
+        if self.loaded_at is not None:
+            snapshot_age.set(round(time.time() - self.loaded_at, 3))
+
+    async def _reload(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            try:
+                await self.load()
+            except Exception:
+                log.warning("Reloading the read snapshot failed", exc_info=True)
+
+    async def start(self) -> None:
+        """Load the snapshot and start reloading it in the background.
+
+        A failed first load is logged; reads then go to the backend until a
+        reload succeeds.
+        """
+        try:
+            await self.load()
+        except Exception:
+            log.warning("Loading the read snapshot failed", exc_info=True)
+        if self.reload_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._reload())
+
+    async def stop(self) -> None:
+        """Stop reloading."""
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+class SnapshotRepository:
+    """Reads one model from the snapshot and writes through to the backend."""
+
+    def __init__(self, engine: ReadEngine, inner: Any, model: str) -> None:
+        """Initialize a SnapshotRepository.
+
+        Args:
+            engine: The engine holding the snapshot.
+            inner: The backend repository of the model.
+            model: The model name, e.g. "Belief".
+        """
+        self.engine = engine
+        self.inner = inner
+        self.model = model
+        self._model = inner._model
+
+    async def find_many(
+        self, take: int | None = None, skip: int | None = None, after: int | None = None
+    ) -> list[Any]:
+        """Read a page of rows ordered by id, starting past id ``after`` if given."""
+        snapshot = self.engine.current()
+        if snapshot is None:
+            return await self.inner.find_many(take=take, skip=skip, after=after)
+        return snapshot.tables[self.model].page(take, skip, after)
+
+    async def find_unique(self, where: Mapping[str, Any]) -> Any | None:
+        """Read the row matching a unique field."""
+        snapshot = self.engine.current()
+        if snapshot is None or len(where) != 1:
+            return await self.inner.find_unique(where)
+        ((key, value),) = where.items()
+        if key == "id":
+            return snapshot.tables[self.model].rows.get(value)
+        if self.model == "Factor" and key in snapshot.factor_by:
+            return snapshot.factor(key, value)
+        return await self.inner.find_unique(where)
+
+    async def find_many_partial(
+        self,
+        fields: tuple[str, ...],
+        take: int | None = None,
+        skip: int | None = None,
+        after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Read ``fields`` of a page of rows."""
+        snapshot = self.engine.current()
+        if snapshot is None:
+            return await self.inner.find_many_partial(fields, take=take, skip=skip, after=after)
+        return [partial(row, fields) for row in snapshot.tables[self.model].page(take, skip, after)]
+
+    async def find_unique_partial(
+        self, where: Mapping[str, Any], fields: tuple[str, ...]
+    ) -> dict[str, Any] | None:
+        """Read ``fields`` of the row matching a unique field."""
+        if self.engine.current() is None:
+            return await self.inner.find_unique_partial(where, fields)
+        row = await self.find_unique(where)
+        return None if row is None else partial(row, fields)
+
+    async def version(self, where: Mapping[str, Any]) -> str | None:
+        """The version of a row."""
+        snapshot = self.engine.current()
+        if snapshot is None or set(where) != {"id"}:
+            return await self.inner.version(where)
+        row = snapshot.tables[self.model].rows.get(where["id"])
+        return None if row is None else row_version(row)
+
+    async def collection_version(self) -> str:
+        """The version of the table."""
+        snapshot = self.engine.current()
+        if snapshot is None:
+            return await self.inner.collection_version()
+        return snapshot.collection_version(self.model)
+
+    async def _written(self, row: Any, data: Mapping[str, Any]) -> None:
+        self.engine.apply(lambda snapshot: snapshot.put(self.model, row))
+
+    async def create(self, data: Mapping[str, Any]) -> Any:
+        """Insert a row in the backend and the snapshot."""
+        row = await self.inner.create(data)
+        await self._written(row, data)
+        return row
+
+    async def update(
+        self, where: Mapping[str, Any], data: Mapping[str, Any], version: str | None = None
+    ) -> Any | None:
+        """Update a row in the backend and the snapshot."""
+        row = await self.inner.update(where, data, version)
+        if row is not None:
+            await self._written(row, data)
+        return row
+
+    async def delete(self, where: Mapping[str, Any], version: str | None = None) -> Any | None:
+        """Delete a row from the backend and the snapshot."""
+        row = await self.inner.delete(where, version)
+        if row is not None:
+            self.engine.apply(lambda snapshot: snapshot.drop(self.model, row.id))
+        return row
+
+
+class SnapshotLinkedRepository(SnapshotRepository):
+    """Beliefs or attributions, whose links are read from the snapshot too."""
+
+    # The relation field holding the links and the one holding factors
+    link_field: str
+    factor_field: str
+
+    async def _backend_links(self, where: Mapping[str, Any]) -> list[Any]:
+        raise NotImplementedError
+
+    async def _linked(self, where: Mapping[str, Any]) -> list[Any]:
+        snapshot = self.engine.current()
+        if snapshot is None or "id" not in where:
+            return await self._backend_links(where)
+        return snapshot.linked(self.model, where["id"])
+
+    async def _written(self, row: Any, data: Mapping[str, Any]) -> None:
+        await super()._written(row, data)
+        # The returned row carries no relations, read back the ones the write touched
+        if self.link_field in data:
+            others = [other.id for other in await self._backend_links({"id": row.id})]
+            self.engine.apply(lambda snapshot: snapshot.set_links(self.model, row.id, others))
+        if self.factor_field in data and self.engine.inner is not None:
+            key = _FACTOR_KEY[self.model]
+            snapshot = self.engine.snapshot
+            previous = snapshot.factor(key, row.id) if snapshot is not None else None
+            factors = [await self.engine.inner.factor.find_unique({key: row.id})]
+            if previous is not None:
+                factors.append(await self.engine.inner.factor.find_unique({"id": previous.id}))
+            for factor in factors:
+                if factor is not None:
+                    self.engine.apply(lambda snapshot, factor=factor: snapshot.put("Factor", factor))
+
+
+class SnapshotBeliefRepository(SnapshotLinkedRepository):
+    """Beliefs and their linked attributions."""
+
+    link_field = "attribution"
+    factor_field = "Factor"
+
+    async def _backend_links(self, where: Mapping[str, Any]) -> list[Any]:
+        return await self.inner.attributions_of(where)
+
+    async def attributions_of(self, where: Mapping[str, Any]) -> list[Any]:
+        """Read the attributions linked to a belief."""
+        return await self._linked(where)
+
+    async def links(self) -> list[tuple[int, int]]:
+        """Read every belief/attribution link from the backend."""
+        return await self.inner.links()
+
+
+class SnapshotAttributionRepository(SnapshotLinkedRepository):
+    """Attributions and their linked beliefs."""
+
+    link_field = "belief"
+    factor_field = "factor"
+
+    async def _backend_links(self, where: Mapping[str, Any]) -> list[Any]:
+        return await self.inner.beliefs_of(where)
+
+    async def beliefs_of(self, where: Mapping[str, Any]) -> list[Any]:
+        """Read the beliefs linked to an attribution."""
+        return await self._linked(where)
+
+
+class SnapshotVersionMiddleware:
+    """Tag responses with the version of the snapshot they were read from."""
+
+    def __init__(self, app: Any, engine: "ReadEngine | None" = None) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            engine: The engine whose version to report, ``read_engine`` by default.
+        """
+        self.app = app
+        self.engine = engine or read_engine
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Serve the request and add the version header."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_version(message: Any) -> None:
+            if message["type"] == "http.response.start" and self.engine.snapshot is not None:
+                headers = list(message.get("headers", []))
+                headers.append((VERSION_HEADER, str(self.engine.version).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
+
+
+read_engine = ReadEngine()
+registry.add_collector(read_engine.collect)
+track_size("read_snapshot_rows", read_engine.size)
@@ -0,0 +1,42 @@
+"""Storage backends behind the service layer.
+
+``REPOSITORY_BACKEND`` picks the backend when the app starts: ``prisma`` keeps
+the data in Postgres, ``memory`` keeps it in the worker (see
+``memory_repository``). With ``READ_SNAPSHOT_ENABLED`` the reads are served
+from an in-process snapshot instead (see ``read_snapshot``). Services reach the
+data through ``repositories``.
+"""
+from .. import config
+from .base import Repositories
+
+BACKENDS = ("prisma", "memory")
+
+
+def create_repositories(backend: str) -> Repositories:
+    """Create the repositories of a backend.
+
+    Args:
+        backend: "prisma" or "memory".
+
+    Returns:
+        Repositories: One repository per model.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "prisma":
+        from .prisma_repository import create_prisma_repositories
+
+        return create_prisma_repositories()
+    if backend == "memory":
+        from .memory_repository import create_memory_repositories
+
+        return create_memory_repositories()
+    raise ValueError(f"Unknown repository backend {backend!r}, expected one of {BACKENDS}")
+
+
+repositories = create_repositories(config.REPOSITORY_BACKEND)
+if config.READ_SNAPSHOT_ENABLED:
+    from ..read_snapshot import read_engine
+
+    repositories = read_engine.wrap(repositories)
@@ -0,0 +1,204 @@
+"""The interface the services use to read and write data.
+
+Each repository covers one model and mirrors the Prisma actions the services
+need. Lookups that find nothing return None instead of raising, and failures
+raise the ``prisma.errors`` exception a Prisma query would have raised, so the
+services map errors the same way whatever the backend.
+
+Repositories also report versions, cheap strings that change whenever a row
+or a table does, for conditional requests. A row's version is its
+``updated_at``; a table's is its row count and largest ``updated_at``. Factor
+foreign keys are cleared by ``ON DELETE SET NULL`` without touching
+``updated_at``, so factor versions include them (and the number of factors
+holding each) as well. Every backend formats versions with ``version_string``
+so they agree with each other.
+
+List and get routes can ask for some of a model's ``FIELDS`` only. The
+``*_partial`` reads return those fields as plain dicts; the Postgres backend
+selects just those columns, so the rest are never read or hydrated.
+"""
+from collections.abc import Callable, Mapping
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Protocol, TypeVar
+
+from prisma.models import Attribution, Belief, Factor, User
+
+ModelT = TypeVar("ModelT")
+
+# Scalar columns of each model, in table order; what a partial read can select
+FIELDS: dict[str, tuple[str, ...]] = {
+    "Belief": ("id", "created_at", "updated_at", "description"),
+    "Attribution": (
+        "id",
+        "created_at",
+        "updated_at",
+        "locus",
+        "stability",
+        "controllability",
+        "reason",
+    ),
+    "Factor": ("id", "created_at", "updated_at", "description", "attributionId", "beliefId"),
+}
+# Columns that can change without bumping updated_at, part of the versions
+VERSION_COLUMNS: dict[str, tuple[str, ...]] = {"Factor": ("beliefId", "attributionId")}
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def version_string(*values: Any) -> str:
+    """Join timestamps (as epoch milliseconds), numbers and nulls into a version."""
+    parts = []
+    for value in values:
+        if isinstance(value, str) and "T" in value:
+            # Prisma raw queries may return timestamps as ISO strings
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime):
+            # Postgres returns TIMESTAMP(3) columns without a time zone, in UTC
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=UTC)
+            value = round(value.timestamp() * 1000)
+        parts.append("" if value is None else str(value))
+    return "-".join(parts)
+
+
+def row_version(row: Any) -> str:
+    """The version of a row already in hand."""
+    columns = VERSION_COLUMNS.get(type(row).__name__, ())
+    return version_string(row.updated_at, *(getattr(row, column) for column in columns))
+
+
+def version_fields(model: str) -> tuple[str, ...]:
+    """The columns the version of a ``model`` row is made of."""
+    return ("updated_at", *VERSION_COLUMNS.get(model, ()))
+
+
+def partial_version(model: str, row: Mapping[str, Any]) -> str:
+    """The version of a partial row read with its ``version_fields``."""
+    return version_string(*(row[column] for column in version_fields(model)))
+
+
+def partial(row: Any, fields: tuple[str, ...]) -> dict[str, Any]:
+    """The given fields of a row already in hand."""
+    return {field: getattr(row, field) for field in fields}
+
+
+def version_values(model: str, version: str) -> tuple[Any, ...]:
+    """Split a row version back into ``updated_at`` and its other columns.
+
+    Raises:
+        ValueError: If ``version`` is not a version of a ``model`` row.
+    """
+    updated_at, *rest = version.split("-")
+    if len(rest) != len(VERSION_COLUMNS.get(model, ())):
+        raise ValueError(f"Not a {model} version: {version!r}")
+    timestamp = _EPOCH + timedelta(milliseconds=int(updated_at))
+    return (timestamp, *(int(value) if value else None for value in rest))
+
+
+class Repository(Protocol[ModelT]):
+    """Create, read, update and delete rows of one model."""
+
+    _model: type
+
+    async def create(self, data: Mapping[str, Any]) -> ModelT:
+        """Insert a row and return it."""
+        ...
+
+    async def find_many(
+        self, take: int | None = None, skip: int | None = None, after: int | None = None
+    ) -> list[ModelT]:
+        """Return a page of rows ordered by id, starting past id ``after`` if given."""
+        ...
+
+    async def find_unique(self, where: Mapping[str, Any]) -> ModelT | None:
+        """Return the row matching a unique field, or None."""
+        ...
+
+    async def find_many_partial(
+        self,
+        fields: tuple[str, ...],
+        take: int | None = None,
+        skip: int | None = None,
+        after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return ``fields`` of a page of rows, like ``find_many``."""
+        ...
+
+    async def find_unique_partial(
+        self, where: Mapping[str, Any], fields: tuple[str, ...]
+    ) -> dict[str, Any] | None:
+        """Return ``fields`` of the row matching a unique field, or None."""
+        ...
+
+    async def update(
+        self, where: Mapping[str, Any], data: Mapping[str, Any], version: str | None = None
+    ) -> ModelT | None:
+        """Update a row and return it, or None if it does not exist.
+
+        With a ``version`` the row is only updated if it still has that version,
+        checked by the update itself; None is returned otherwise.
+        """
+        ...
+
+    async def delete(self, where: Mapping[str, Any], version: str | None = None) -> ModelT | None:
+        """Delete a row and return it, or None if it does not exist.
+
+        With a ``version`` the row is only deleted if it still has that version.
+        """
+        ...
+
+    async def version(self, where: Mapping[str, Any]) -> str | None:
+        """Return the version of a row without loading it, or None if it does not exist."""
+        ...
+
+    async def collection_version(self) -> str:
+        """Return the version of the whole table."""
+        ...
+
+
+class BeliefRepository(Repository[Belief], Protocol):
+    """Beliefs, plus the attributions linked to them."""
+
+    async def attributions_of(self, where: Mapping[str, Any]) -> list[Attribution]:
+        """Return the attributions linked to a belief, ordered by id."""
+        ...
+
+    async def links(self) -> list[tuple[int, int]]:
+        """Return every (belief id, attribution id) link."""
+        ...
+
+
+class AttributionRepository(Repository[Attribution], Protocol):
+    """Attributions, plus the beliefs linked to them."""
+
+    async def beliefs_of(self, where: Mapping[str, Any]) -> list[Belief]:
+        """Return the beliefs linked to an attribution, ordered by id."""
+        ...
+
+
+class UserRepository(Protocol):
+    """Users, looked up by id or email."""
+
+    _model: type
+
+    async def create(self, data: Mapping[str, Any]) -> User:
+        """Insert a user and return it."""
+        ...
+
+    async def find_unique(self, where: Mapping[str, Any]) -> User | None:
+        """Return the user with that id or email, or None."""
+        ...
+
+
+@dataclass
+class Repositories:
+    """One repository per model, all from the same backend."""
+
+    backend: str
+    belief: BeliefRepository
+    attribution: AttributionRepository
+    factor: Repository[Factor]
+    user: UserRepository
+    # Opens a block whose writes all apply or, if it raises, none do
+    transaction: Callable[[], AbstractAsyncContextManager[None]]
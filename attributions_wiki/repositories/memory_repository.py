@@ -0,0 +1,577 @@
+"""Repositories that keep every row in the worker's memory.
+
+They follow the Prisma repositories for everything the services do: ids count
+up from 1, pages are ordered by id, timestamps are UTC with millisecond
+precision, unique and foreign keys are enforced, and failures raise the
+``prisma.errors`` exception Postgres would have caused. That lets the app and
+the HTTP benchmarks run with no database, and shows how much of a request's
+time is spent outside the database.
+
+Rows are held per model in dicts keyed by id. Ids are never reused, so insertion
+order is id order and a page is a slice of the dict. Unique fields have their
+own indexes (``User.email``, ``Factor.beliefId`` and ``Factor.attributionId``)
+and belief/attribution links are indexed in both directions. Deleting a belief
+or an attribution drops its links and clears the foreign key of the factor that
+pointed at it, like ``ON DELETE SET NULL`` does.
+
+Nested writes are limited to ``connect``, ``disconnect`` and ``set`` of
+existing rows; anything else raises ``DataError``. Every operation runs without
+awaiting, so concurrent requests cannot see it half done. The data belongs to
+one worker and is gone when it exits.
+
+``MemoryStore.transaction`` copies the store and puts the copy back if the
+block raises. That also undoes whatever other requests wrote in the meantime,
+which is fine for tests and benchmarks but one more reason not to serve real
+traffic from this backend.
+"""
+import copy
+import uuid
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from itertools import dropwhile, islice
+from typing import Any, ClassVar, Generic, TypeVar
+
+import pydantic
+from prisma.enums import Role
+from prisma.errors import (
+    DataError,
+    FieldNotFoundError,
+    ForeignKeyViolationError,
+    MissingRequiredValueError,
+    RecordNotFoundError,
+    UniqueViolationError,
+)
+from prisma.models import Attribution, Belief, Factor, User
+
+from ..memory import track_size
+from .base import VERSION_COLUMNS, Repositories, partial, row_version, version_string
+
+ModelT = TypeVar("ModelT", Attribution, Belief, Factor)
+ErrorT = TypeVar("ErrorT", bound=DataError)
+
+# Whether the current task is inside MemoryStore.transaction
+_in_transaction: ContextVar[bool] = ContextVar("memory_transaction", default=False)
+# MemoryStore attributes put back on rollback; ids are not, like Postgres sequences
+_TRANSACTIONAL = ("rows", "links", "factor_by", "user_by_email", "newest")
+
+
+def _now() -> datetime:
+    # Postgres keeps TIMESTAMP(3) values to the millisecond
+    now = datetime.now(UTC)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def _error(error: type[ErrorT], code: str, message: str) -> ErrorT:
+    """Build a Prisma error the way the query engine reports it."""
+    return error({"user_facing_error": {"error_code": code, "message": message}})
+
+
+def _unsupported(what: str) -> DataError:
+    return _error(DataError, "P2009", f"{what} is not supported by the memory backend")
+
+
+class MemoryStore:
+    """Rows and indexes shared by the in-memory repositories."""
+
+    def __init__(self) -> None:
+        """Initialize an empty MemoryStore."""
+        self.rows: dict[str, dict[Any, Any]] = {}
+        self.last_id: dict[str, int] = {}
+        # Linked ids in both directions, keyed by model name then row id
+        self.links: dict[str, dict[int, set[int]]] = {"Belief": {}, "Attribution": {}}
+        # Factor ids by the unique foreign key they hold
+        self.factor_by: dict[str, dict[int, int]] = {"beliefId": {}, "attributionId": {}}
+        self.user_by_email: dict[str, str] = {}
+        # Largest updated_at of each model, for the table versions
+        self.newest: dict[str, datetime] = {}
+
+    def table(self, model: str) -> dict[Any, Any]:
+        """The rows of one model by id."""
+        return self.rows.setdefault(model, {})
+
+    def next_id(self, model: str) -> int:
+        """The next autoincrement id of a model; ids of failed inserts are skipped too."""
+        self.last_id[model] = self.last_id.get(model, 0) + 1
+        return self.last_id[model]
+
+    def size(self) -> int:
+        """Rows held across every model."""
+        return sum(len(rows) for rows in self.rows.values())
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Undo every change made in the enclosed block if it raises."""
+        if _in_transaction.get():
+            yield
+            return
+        saved = copy.deepcopy({name: getattr(self, name) for name in _TRANSACTIONAL})
+        token = _in_transaction.set(True)
+        try:
+            yield
+        except BaseException:
+            for name, values in saved.items():
+                self._restore(getattr(self, name), values)
+            raise
+        finally:
+            _in_transaction.reset(token)
+
+    @staticmethod
+    def _restore(current: dict[Any, Any], saved: dict[Any, Any]) -> None:
+        # In place, since the repositories hold on to the per-model dicts
+        for key in list(current):
+            if key not in saved:
+                if isinstance(current[key], dict):
+                    current[key].clear()
+                else:
+                    del current[key]
+        for key, value in saved.items():
+            if isinstance(value, dict) and isinstance(current.get(key), dict):
+                current[key].clear()
+                current[key].update(value)
+            else:
+                current[key] = value
+
+
+class MemoryRepository(Generic[ModelT]):
+    """One model's rows in a MemoryStore."""
+
+    _model: type[ModelT]
+    # Columns that must be given on create and cannot be set to null
+    required: tuple[str, ...] = ()
+    # Columns the caller may write, with their value when not given on create
+    columns: ClassVar[dict[str, Any]] = {}
+    # Relation fields handled by _check_relations
+    relations: tuple[str, ...] = ()
+
+    def __init__(self, store: MemoryStore) -> None:
+        """Initialize a MemoryRepository.
+
+        Args:
+            store: Where the rows and indexes live.
+        """
+        self.store = store
+        self.name = self._model.__name__
+        self.rows: dict[int, ModelT] = store.table(self.name)
+
+    def _find(self, where: Mapping[str, Any]) -> ModelT | None:
+        if set(where) != {"id"}:
+            raise _unsupported(f"Looking up {self.name} by {sorted(where)}")
+        return self.rows.get(where["id"])
+
+    def _values(self, data: Mapping[str, Any]) -> dict[str, Any]:
+        values = {}
+        for field, value in data.items():
+            if field in self.relations:
+                continue
+            if field not in self.columns:
+                raise _error(
+                    FieldNotFoundError, "P2009", f"Unknown field `{field}` for {self.name}"
+                )
+            if isinstance(value, Mapping):
+                # Atomic updates; only {"set": ...} applies to these columns
+                if set(value) != {"set"}:
+                    raise _unsupported(f"Updating {self.name}.{field} with {sorted(value)}")
+                value = value["set"]
+            if value is None and field in self.required:
+                raise _error(
+                    MissingRequiredValueError,
+                    "P2011",
+                    f"Null constraint violation on the field `{self.name}.{field}`",
+                )
+            values[field] = value
+        return values
+
+    def _build(self, fields: dict[str, Any]) -> ModelT:
+        try:
+            return self._model(**fields)
+        except pydantic.ValidationError as err:
+            raise _error(DataError, "P2007", f"Invalid {self.name}: {err}") from err
+
+    def _check_relations(self, row: ModelT, data: Mapping[str, Any]) -> Any:
+        """Validate nested writes and return what _apply_relations needs; must not mutate."""
+        return None
+
+    def _apply_relations(self, row: ModelT, plan: Any) -> ModelT:
+        """Apply the checked nested writes and return the row to store."""
+        return row
+
+    def _on_delete(self, row: ModelT) -> None:
+        """Drop the links and foreign keys pointing at a deleted row."""
+
+    def _touch(self, row: ModelT) -> None:
+        newest = self.store.newest.get(self.name)
+        if newest is None or row.updated_at > newest:
+            self.store.newest[self.name] = row.updated_at
+
+    def _foreign_key_counts(self) -> tuple[int, ...]:
+        return ()
+
+    async def create(self, data: Mapping[str, Any]) -> ModelT:
+        """Insert a row.
+
+        Raises:
+            MissingRequiredValueError: If a required column is missing or null.
+            UniqueViolationError: If a unique column already holds the value.
+            ForeignKeyViolationError: If a foreign key points at no row.
+            RecordNotFoundError: If a row to connect does not exist.
+        """
+        values = self._values(data)
+        for field in self.required:
+            if field not in values:
+                raise _error(
+                    MissingRequiredValueError,
+                    "P2012",
+                    f"Missing a required value at `{self.name}.{field}`",
+                )
+        now = _now()
+        row = self._build(
+            {
+                **self.columns,
+                **values,
+                "id": self.store.next_id(self.name),
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        row = self._apply_relations(row, self._check_relations(row, data))
+        self.rows[row.id] = row
+        self._touch(row)
+        return row.model_copy()
+
+    def _page(self, take: int | None, skip: int | None, after: int | None) -> Iterable[ModelT]:
+        start = skip or 0
+        stop = None if take is None else start + take
+        rows: Iterable[ModelT] = self.rows.values()
+        if after is not None:
+            rows = dropwhile(lambda row: row.id <= after, rows)
+        return islice(rows, start, stop)
+
+    async def find_many(
+        self, take: int | None = None, skip: int | None = None, after: int | None = None
+    ) -> list[ModelT]:
+        """Read a page of rows ordered by id, starting past id ``after`` if given."""
+        return [row.model_copy() for row in self._page(take, skip, after)]
+
+    async def find_unique(self, where: Mapping[str, Any]) -> ModelT | None:
+        """Read the row with that id."""
+        row = self._find(where)
+        return None if row is None else row.model_copy()
+
+    async def find_many_partial(
+        self,
+        fields: tuple[str, ...],
+        take: int | None = None,
+        skip: int | None = None,
+        after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Read ``fields`` of a page of rows, without copying the rows."""
+        return [partial(row, fields) for row in self._page(take, skip, after)]
+
+    async def find_unique_partial(
+        self, where: Mapping[str, Any], fields: tuple[str, ...]
+    ) -> dict[str, Any] | None:
+        """Read ``fields`` of the row with that id."""
+        row = self._find(where)
+        return None if row is None else partial(row, fields)
+
+    def _find_version(self, where: Mapping[str, Any], version: str | None) -> ModelT | None:
+        row = self._find(where)
+        if row is None or (version is not None and row_version(row) != version):
+            return None
+        return row
+
+    async def update(
+        self, where: Mapping[str, Any], data: Mapping[str, Any], version: str | None = None
+    ) -> ModelT | None:
+        """Update a row, or return None if it does not exist or has another version."""
+        row = self._find_version(where, version)
+        if row is None:
+            return None
+        values = self._values(data)
+        updated = self._build({**dict(row), **values, "updated_at": _now()})
+        updated = self._apply_relations(updated, self._check_relations(updated, data))
+        self.rows[row.id] = updated
+        self._touch(updated)
+        return updated.model_copy()
+
+    async def delete(self, where: Mapping[str, Any], version: str | None = None) -> ModelT | None:
+        """Delete a row, or return None if it does not exist or has another version."""
+        row = self._find_version(where, version)
+        if row is None:
+            return None
+        del self.rows[row.id]
+        self._on_delete(row)
+        if row.updated_at == self.store.newest.get(self.name):
+            self.store.newest.pop(self.name)
+            for remaining in self.rows.values():
+                self._touch(remaining)
+        return row
+
+    async def version(self, where: Mapping[str, Any]) -> str | None:
+        """The version of the row with that id."""
+        row = self._find(where)
+        return None if row is None else row_version(row)
+
+    async def collection_version(self) -> str:
+        """The row count, largest updated_at and foreign key counts of the table."""
+        return version_string(
+            len(self.rows), self.store.newest.get(self.name), *self._foreign_key_counts()
+        )
+
+    def _linked(self, ids: Iterable[int], model: str) -> list[Any]:
+        rows = self.store.table(model)
+        return [rows[id].model_copy() for id in sorted(ids)]
+
+
+def _ids(value: Any, relation: str) -> list[int]:
+    items = value if isinstance(value, list) else [value]
+    if not all(isinstance(item, Mapping) and set(item) == {"id"} for item in items):
+        raise _unsupported(f"Referencing {relation} by anything but id")
+    return [item["id"] for item in items]
+
+
+class _LinkedRepository(MemoryRepository[ModelT]):
+    """A side of the many-to-many link between beliefs and attributions."""
+
+    # The link relation field, the model on the other side and the Factor
+    # column that points at this model
+    relation: str
+    other: str
+    factor_key: str
+
+    def _check_relations(self, row: ModelT, data: Mapping[str, Any]) -> set[int] | None:
+        for field in self.relations:
+            if field != self.relation and data.get(field) is not None:
+                raise _unsupported(f"Nested writes to {self.name}.{field}")
+        nested = data.get(self.relation)
+        if nested is None:
+            return None
+        unknown = set(nested) - {"connect", "disconnect", "set"}
+        if unknown:
+            raise _unsupported(f"Nested {sorted(unknown)} on {self.name}.{self.relation}")
+
+        others = self.store.table(self.other)
+        current = self.store.links[self.name].get(row.id, set())
+        target = set(_ids(nested["set"], self.relation)) if "set" in nested else set(current)
+        target.update(_ids(nested.get("connect", []), self.relation))
+        missing = target - current - others.keys()
+        if missing:
+            raise _error(
+                RecordNotFoundError,
+                "P2025",
+                f"No {self.other} record(s) with id {sorted(missing)} to connect",
+            )
+        target.difference_update(_ids(nested.get("disconnect", []), self.relation))
+        return target
+
+    def _apply_relations(self, row: ModelT, plan: set[int] | None) -> ModelT:
+        if plan is None:
+            return row
+        links, back = self.store.links[self.name], self.store.links[self.other]
+        current = links.get(row.id, set())
+        for other in current - plan:
+            back[other].discard(row.id)
+        for other in plan - current:
+            back.setdefault(other, set()).add(row.id)
+        if plan:
+            links[row.id] = plan
+        else:
+            links.pop(row.id, None)
+        return row
+
+    def _on_delete(self, row: ModelT) -> None:
+        back = self.store.links[self.other]
+        for other in self.store.links[self.name].pop(row.id, set()):
+            back[other].discard(row.id)
+        factor_id = self.store.factor_by[self.factor_key].pop(row.id, None)
+        if factor_id is not None:
+            factors = self.store.table("Factor")
+            factors[factor_id] = factors[factor_id].model_copy(update={self.factor_key: None})
+
+
+class MemoryBeliefRepository(_LinkedRepository[Belief]):
+    """Beliefs and their linked attributions."""
+
+    _model = Belief
+    required = ("description",)
+    columns: ClassVar[dict[str, Any]] = {"description": None}
+    relations = ("attribution", "Factor")
+    relation = "attribution"
+    other = "Attribution"
+    factor_key = "beliefId"
+
+    async def attributions_of(self, where: Mapping[str, Any]) -> list[Attribution]:
+        """Read the attributions linked to a belief."""
+        return self._linked(self.store.links["Belief"].get(where["id"], ()), "Attribution")
+
+    async def links(self) -> list[tuple[int, int]]:
+        """Read every belief/attribution link."""
+        return [
+            (belief, attribution)
+            for belief, attributions in self.store.links["Belief"].items()
+            for attribution in attributions
+        ]
+
+
+class MemoryAttributionRepository(_LinkedRepository[Attribution]):
+    """Attributions and their linked beliefs."""
+
+    _model = Attribution
+    required = ("locus", "stability", "controllability")
+    columns: ClassVar[dict[str, Any]] = {"locus": None, "stability": None, "controllability": None, "reason": None}
+    relations = ("belief", "factor")
+    relation = "belief"
+    other = "Belief"
+    factor_key = "attributionId"
+
+    async def beliefs_of(self, where: Mapping[str, Any]) -> list[Belief]:
+        """Read the beliefs linked to an attribution."""
+        return self._linked(self.store.links["Attribution"].get(where["id"], ()), "Belief")
+
+
+class MemoryFactorRepository(MemoryRepository[Factor]):
+    """Factors, each pointing at no more than one belief and one attribution."""
+
+    _model = Factor
+    required = ("description",)
+    columns: ClassVar[dict[str, Any]] = {"description": None, "attributionId": None, "beliefId": None}
+    # Relation field, foreign key column and referenced model
+    foreign_keys = (
+        ("Attribution", "attributionId", "Attribution"),
+        ("Belief", "beliefId", "Belief"),
+    )
+    relations = ("Attribution", "Belief")
+
+    def _find(self, where: Mapping[str, Any]) -> Factor | None:
+        if len(where) == 1 and set(where) <= self.store.factor_by.keys():
+            ((column, value),) = where.items()
+            factor_id = self.store.factor_by[column].get(value)
+            return None if factor_id is None else self.rows.get(factor_id)
+        return super()._find(where)
+
+    def _check_relations(self, row: Factor, data: Mapping[str, Any]) -> dict[str, int | None]:
+        previous = self.rows.get(row.id)
+        changes: dict[str, int | None] = {}
+        for relation, column, model in self.foreign_keys:
+            nested = data.get(relation)
+            if nested is not None:
+                if set(nested) == {"connect"}:
+                    (value,) = _ids(nested["connect"], relation)
+                    if value not in self.store.table(model):
+                        raise _error(
+                            RecordNotFoundError,
+                            "P2025",
+                            f"No {model} record with id {value} to connect",
+                        )
+                elif nested == {"disconnect": True}:
+                    value = None
+                else:
+                    raise _unsupported(f"Nested {sorted(nested)} on Factor.{relation}")
+            elif column in data:
+                value = getattr(row, column)
+                if value is not None and value not in self.store.table(model):
+                    raise _error(
+                        ForeignKeyViolationError,
+                        "P2003",
+                        f"Foreign key constraint failed on the field: `Factor_{column}_fkey`",
+                    )
+            else:
+                continue
+            if value is not None and self.store.factor_by[column].get(value, row.id) != row.id:
+                raise _error(
+                    UniqueViolationError,
+                    "P2002",
+                    f"Unique constraint failed on the fields: (`{column}`)",
+                )
+            if previous is None or getattr(previous, column) != value:
+                changes[column] = value
+        return changes
+
+    def _apply_relations(self, row: Factor, plan: dict[str, int | None]) -> Factor:
+        previous = self.rows.get(row.id)
+        for column, value in plan.items():
+            old = getattr(previous, column) if previous is not None else None
+            if old is not None:
+                self.store.factor_by[column].pop(old, None)
+            if value is not None:
+                self.store.factor_by[column][value] = row.id
+        return row.model_copy(update=plan) if plan else row
+
+    def _foreign_key_counts(self) -> tuple[int, ...]:
+        return tuple(len(self.store.factor_by[column]) for column in VERSION_COLUMNS["Factor"])
+
+    def _on_delete(self, row: Factor) -> None:
+        for _, column, _ in self.foreign_keys:
+            value = getattr(row, column)
+            if value is not None:
+                self.store.factor_by[column].pop(value, None)
+
+
+class MemoryUserRepository:
+    """Users by id, with a unique index on email."""
+
+    _model = User
+
+    def __init__(self, store: MemoryStore) -> None:
+        """Initialize a MemoryUserRepository.
+
+        Args:
+            store: Where the rows and indexes live.
+        """
+        self.store = store
+        self.rows: dict[str, User] = store.table("User")
+
+    async def create(self, data: Mapping[str, Any]) -> User:
+        """Insert a user.
+
+        Raises:
+            MissingRequiredValueError: If the email or password is missing.
+            UniqueViolationError: If another user has the email.
+        """
+        for field in ("email", "password"):
+            if data.get(field) is None:
+                raise _error(
+                    MissingRequiredValueError,
+                    "P2012",
+                    f"Missing a required value at `User.{field}`",
+                )
+        if data["email"] in self.store.user_by_email:
+            raise _error(
+                UniqueViolationError, "P2002", "Unique constraint failed on the fields: (`email`)"
+            )
+        fields = {"name": None, "role": Role.USER, "disabled": False, **data}
+        fields.setdefault("id", str(uuid.uuid4()))
+        try:
+            user = User(**fields)
+        except pydantic.ValidationError as err:
+            raise _error(DataError, "P2007", f"Invalid User: {err}") from err
+        self.rows[user.id] = user
+        self.store.user_by_email[user.email] = user.id
+        return user.model_copy()
+
+    async def find_unique(self, where: Mapping[str, Any]) -> User | None:
+        """Read the user with that id or email."""
+        if set(where) == {"email"}:
+            user_id = self.store.user_by_email.get(where["email"])
+        elif set(where) == {"id"}:
+            user_id = where["id"]
+        else:
+            raise _unsupported(f"Looking up User by {sorted(where)}")
+        user = self.rows.get(user_id)  # type: ignore[arg-type]
+        return None if user is None else user.model_copy()
+
+
+def create_memory_repositories(store: MemoryStore | None = None) -> Repositories:
+    """Repositories keeping their rows in ``store``, a new one by default."""
+    store = store or MemoryStore()
+    track_size("memory_repository_rows", store.size)
+    return Repositories(
+        backend="memory",
+        belief=MemoryBeliefRepository(store),
+        attribution=MemoryAttributionRepository(store),
+        factor=MemoryFactorRepository(store),
+        user=MemoryUserRepository(store),
+        transaction=store.transaction,
+    )
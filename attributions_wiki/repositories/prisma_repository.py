@@ -0,0 +1,238 @@
+"""Repositories backed by Postgres through Prisma.
+
+Writes go to the primary client, or to the transaction open in the current
+task (see ``db.transaction``). Reads go to the replica when the request may
+use it (see ``routing``) and skip the query engine through the asyncpg read
+pool when one is open.
+"""
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import UTC, datetime
+from typing import Any, Generic, TypeVar
+
+from prisma.models import Attribution, Belief, Factor, User
+
+from .. import db as database
+from ..routing import reader, reader_pool
+from ..services import sql_reads, sql_writes
+from .base import VERSION_COLUMNS, Repositories, partial, version_string, version_values
+
+ModelT = TypeVar("ModelT", Attribution, Belief, Factor)
+
+
+class PrismaRepository(Generic[ModelT]):
+    """One model's rows, read and written through Prisma or the asyncpg read pool."""
+
+    def __init__(
+        self,
+        model: type[ModelT],
+        accessor: str,
+        fetch_page: Callable[..., Awaitable[list[ModelT]]],
+        fetch_by_id: Callable[[Any, int], Awaitable[ModelT | None]],
+    ) -> None:
+        """Initialize a PrismaRepository.
+
+        Args:
+            model: The Prisma model, e.g. ``Belief``.
+            accessor: The client attribute of the model, e.g. ``"belief"``.
+            fetch_page: The ``sql_reads`` query for a page of rows.
+            fetch_by_id: The ``sql_reads`` query for one row by id.
+        """
+        self._model = model
+        self.accessor = accessor
+        self.fetch_page = fetch_page
+        self.fetch_by_id = fetch_by_id
+
+    def _writer(self) -> Any:
+        return getattr(database.writer(), self.accessor)
+
+    def _reader(self) -> Any:
+        return getattr(reader(), self.accessor)
+
+    async def create(self, data: Mapping[str, Any]) -> ModelT:
+        """Insert a row on the primary."""
+        return await self._writer().create(data)
+
+    async def find_many(
+        self, take: int | None = None, skip: int | None = None, after: int | None = None
+    ) -> list[ModelT]:
+        """Read a page of rows ordered by id, starting past id ``after`` if given."""
+        pool = reader_pool()
+        if pool is not None:
+            return await self.fetch_page(pool, take=take, skip=skip, after=after)
+        where = {} if after is None else {"id": {"gt": after}}
+        return await self._reader().find_many(
+            take=take, skip=skip, where=where, order={"id": "asc"}
+        )
+
+    async def find_unique(self, where: Mapping[str, Any]) -> ModelT | None:
+        """Read the row matching a unique field."""
+        pool = reader_pool()
+        if pool is not None and "id" in where:
+            return await self.fetch_by_id(pool, where["id"])
+        return await self._reader().find_unique(where)
+
+    async def find_many_partial(
+        self,
+        fields: tuple[str, ...],
+        take: int | None = None,
+        skip: int | None = None,
+        after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Read only ``fields`` of a page of rows, selecting just those columns."""
+        name = self._model.__name__
+        pool = reader_pool()
+        if pool is not None:
+            return await sql_reads.fetch_partial_page(pool, name, fields, take, skip, after)
+        return await reader().query_raw(
+            sql_reads.partial_page(name, fields), take, skip or 0, after or 0
+        )
+
+    async def find_unique_partial(
+        self, where: Mapping[str, Any], fields: tuple[str, ...]
+    ) -> dict[str, Any] | None:
+        """Read only ``fields`` of the row matching a unique field."""
+        name = self._model.__name__
+        if set(where) != {"id"}:
+            row = await self.find_unique(where)
+            return None if row is None else partial(row, fields)
+        pool = reader_pool()
+        if pool is not None:
+            return await sql_reads.fetch_partial_by_id(pool, name, fields, where["id"])
+        return await reader().query_first(sql_reads.partial_by_id(name, fields), where["id"])
+
+    async def update(
+        self, where: Mapping[str, Any], data: Mapping[str, Any], version: str | None = None
+    ) -> ModelT | None:
+        """Update a row on the primary, if it still has ``version`` when one is given.
+
+        Updates that only set columns run as a single conditional ``UPDATE``.
+        Ones that also change relations update the row conditionally first and
+        then apply the relation writes, in one transaction.
+        """
+        if version is None:
+            return await self._writer().update(where=where, data=data)
+        name = self._model.__name__
+        matches = (where["id"], *version_values(name, version))
+        values = sql_writes.scalar_values(name, data)
+        if values is not None:
+            return await database.writer().query_first(
+                sql_writes.conditional_update(name, list(values)),
+                *values.values(),
+                *matches,
+                model=self._model,
+            )
+        columns = ("id", "updated_at", *VERSION_COLUMNS.get(name, ()))
+        scalars = {key: value for key, value in data.items() if key in sql_writes.COLUMNS[name]}
+        relations = {key: value for key, value in data.items() if key not in scalars}
+        async with database.transaction():
+            changed = await self._writer().update_many(
+                where=dict(zip(columns, matches, strict=True)),
+                data={**scalars, "updated_at": datetime.now(UTC)},
+            )
+            if not changed:
+                return None
+            return await self._writer().update(where=where, data=relations)
+
+    async def delete(self, where: Mapping[str, Any], version: str | None = None) -> ModelT | None:
+        """Delete a row on the primary, if it still has ``version`` when one is given."""
+        if version is None:
+            return await self._writer().delete(where)
+        name = self._model.__name__
+        return await database.writer().query_first(
+            sql_writes.conditional_delete(name),
+            where["id"],
+            *version_values(name, version),
+            model=self._model,
+        )
+
+    async def version(self, where: Mapping[str, Any]) -> str | None:
+        """Read the version columns of a row."""
+        pool = reader_pool()
+        name = self._model.__name__
+        if pool is not None:
+            values = await sql_reads.fetch_row_version(pool, name, where["id"])
+        else:
+            row = await reader().query_first(sql_reads.ROW_VERSION[name], where["id"])
+            values = tuple(row.values()) if row else None
+        return None if values is None else version_string(*values)
+
+    async def collection_version(self) -> str:
+        """Read the row count, largest updated_at and foreign key counts of the table."""
+        pool = reader_pool()
+        name = self._model.__name__
+        if pool is not None:
+            values = await sql_reads.fetch_table_version(pool, name)
+        else:
+            values = tuple((await reader().query_first(sql_reads.TABLE_VERSION[name])).values())
+        return version_string(*values)
+
+
+class PrismaBeliefRepository(PrismaRepository[Belief]):
+    """Beliefs and their linked attributions."""
+
+    async def attributions_of(self, where: Mapping[str, Any]) -> list[Attribution]:
+        """Read the attributions linked to a belief."""
+        pool = reader_pool()
+        if pool is not None and "id" in where:
+            return await sql_reads.fetch_attributions_for_belief(pool, where["id"])
+        return await reader().attribution.find_many(
+            where={"belief": {"some": where}},  # type: ignore
+            order={"id": "asc"},
+        )
+
+    async def links(self) -> list[tuple[int, int]]:
+        """Read every belief/attribution link."""
+        pool = reader_pool()
+        if pool is not None:
+            return await sql_reads.fetch_links(pool)
+        rows = await reader().query_raw(sql_reads.LINKS)
+        return [(row["B"], row["A"]) for row in rows]
+
+
+class PrismaAttributionRepository(PrismaRepository[Attribution]):
+    """Attributions and their linked beliefs."""
+
+    async def beliefs_of(self, where: Mapping[str, Any]) -> list[Belief]:
+        """Read the beliefs linked to an attribution."""
+        pool = reader_pool()
+        if pool is not None and "id" in where:
+            return await sql_reads.fetch_beliefs_for_attribution(pool, where["id"])
+        return await reader().belief.find_many(
+            where={"attribution": {"some": where}},  # type: ignore
+            order={"id": "asc"},
+        )
+
+
+class PrismaUserRepository:
+    """Users, read from the replica when allowed and written on the primary."""
+
+    _model = User
+
+    async def create(self, data: Mapping[str, Any]) -> User:
+        """Insert a user on the primary."""
+        return await database.writer().user.create(data)  # type: ignore
+
+    async def find_unique(self, where: Mapping[str, Any]) -> User | None:
+        """Read the user with that id or email."""
+        return await reader().user.find_unique(where)  # type: ignore
+
+
+def create_prisma_repositories() -> Repositories:
+    """Repositories reading and writing Postgres."""
+    return Repositories(
+        backend="prisma",
+        belief=PrismaBeliefRepository(
+            Belief, "belief", sql_reads.fetch_beliefs, sql_reads.fetch_belief_by_id
+        ),
+        attribution=PrismaAttributionRepository(
+            Attribution,
+            "attribution",
+            sql_reads.fetch_attributions,
+            sql_reads.fetch_attribution_by_id,
+        ),
+        factor=PrismaRepository(
+            Factor, "factor", sql_reads.fetch_factors, sql_reads.fetch_factor_by_id
+        ),
+        user=PrismaUserRepository(),
+        transaction=database.transaction,
+    )
@@ -1,27 +1,48 @@
 """Attribution router."""
-from typing import List
+from typing import Annotated, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from prisma.models import Attribution
+from prisma.models import Attribution, Belief
 from prisma.types import (
     AttributionCreateInput,
     AttributionUpdateInput,
     AttributionWhereUniqueInput,
 )
 
+from ...etags import (
+    collection_etag,
+    entity_etag,
+    if_match,
+    is_conditional,
+    not_modified,
+)
 from ...exceptions import (
     DatabaseError,
     DeletionError,
     NotFoundError,
+    PreconditionFailedError,
     UpdateError,
     ValidationError,
 )
+from ...fieldsets import (
+    FIELDS_DESCRIPTION,
+    parse_fields,
+    partial_entity_response,
+    partial_response,
+    with_version,
+)
+from ...repositories.base import row_version
 from ...services.attribution_service import (
     create_attribution,
     delete_attribution_by_id,
     get_attribution_by_id,
+    get_attribution_version,
     get_attributions,
+    get_attributions_version,
+    get_beliefs_for_attribution,
+    get_partial_attribution_by_id,
+    get_partial_attributions,
     update_attribution,
 )
 
@@ -53,84 +74,184 @@ async def create_attribution_route(attribution_data: AttributionCreateInput) ->
         raise HTTPException(status_code=500, detail=str(err)) from err
 
 
-@router.get("/get_all")
-async def get_attributions_route() -> List[Attribution]:
-    """Get all attributions.
+@router.get("/get_all", response_model=List[Attribution])
+async def get_attributions_route(
+    request: Request,
+    response: Response,
+    take: Annotated[int | None, Query(ge=0)] = None,
+    skip: Annotated[int | None, Query(ge=0)] = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> List[Attribution] | Response:
+    """Get all attributions, optionally one page at a time.
+
+    The ETag comes from the table's version, read before the rows so a write
+    landing in between only makes the ETag older than the body, never newer.
+
+    Args:
+        request: Request - The request, checked for ``If-None-Match``.
+        response: Response - The response the ETag is set on.
+        take: int | None - The maximum number of attributions to return.
+        skip: int | None - The number of attributions to skip.
+        fields: str | None - Comma separated attribution fields to return instead of all of them.
 
     Returns:
-        List[Attribution]: A list of all attributions.
+        List[Attribution] | Response: A list of attributions ordered by id, just the
+        ``fields`` asked for of each, or an empty ``304 Not Modified`` if the
+        client's copy is current.
 
     Raises:
-        HTTPException: For database errors.
+        HTTPException: For unknown fields or database errors.
     """
     try:
-        return await get_attributions()
+        selected = parse_fields("Attribution", fields)
+        etag = collection_etag(await get_attributions_version(), take=take, skip=skip)
+        if unchanged := not_modified(request, etag):
+            return unchanged
+        if selected is not None:
+            return partial_response(
+                await get_partial_attributions(selected, take=take, skip=skip), etag
+            )
+        attributions = await get_attributions(take=take, skip=skip)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = etag
+    return attributions
 
 
-@router.get("/get/{id}")
-async def get_attribution_by_id_route(id: int) -> Attribution:
+async def _partial_attribution(
+    id_obj: AttributionWhereUniqueInput, fields: tuple[str, ...]
+) -> Response:
+    # Read the version columns too, so the ETag comes from the same row
+    attribution = await get_partial_attribution_by_id(id_obj, with_version("Attribution", fields))
+    return partial_entity_response("Attribution", attribution, fields)
+
+
+@router.get("/get/{id}", response_model=Attribution)
+async def get_attribution_by_id_route(
+    id: int,
+    request: Request,
+    response: Response,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> Attribution | Response:
     """Get a attribution by id.
 
+    Conditional requests check the attribution's version first and skip loading it
+    when the client's copy is current.
+
     Args:
         id: int - The unique identifier for the attribution.
+        request: Request - The request, checked for ``If-None-Match``.
+        response: Response - The response the ETag is set on.
+        fields: str | None - Comma separated attribution fields to return instead of all of them.
 
     Returns:
-        Attribution: The requested attribution.
+        Attribution | Response: The requested attribution, just the ``fields`` asked for,
+        or an empty ``304 Not Modified`` if the client's copy is current.
 
     Raises:
-        HTTPException: For not found or database errors.
+        HTTPException: For unknown fields, not found or database errors.
     """
     try:
+        selected = parse_fields("Attribution", fields)
         id_obj: AttributionWhereUniqueInput = {"id": id}
-        return await get_attribution_by_id(id_obj)
+        if is_conditional(request):
+            version = await get_attribution_version(id_obj)
+            if version is not None and (
+                unchanged := not_modified(request, entity_etag(id, version))
+            ):
+                return unchanged
+        if selected is not None:
+            return await _partial_attribution(id_obj, selected)
+        attribution = await get_attribution_by_id(id_obj)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
     except NotFoundError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = entity_etag(id, row_version(attribution))
+    return attribution
+
+
+@router.get("/get/{id}/beliefs")
+async def get_beliefs_for_attribution_route(id: int) -> List[Belief]:
+    """Get every belief linked to an attribution.
+
+    Args:
+        id: int - The unique identifier for the attribution.
+
+    Returns:
+        List[Belief]: The linked beliefs.
+
+    Raises:
+        HTTPException: For database errors.
+    """
+    try:
+        id_obj: AttributionWhereUniqueInput = {"id": id}
+        return await get_beliefs_for_attribution(id_obj)
+    except DatabaseError as err:
+        raise HTTPException(status_code=500, detail=str(err)) from err
 
 
 @router.delete("/delete/{id}")
-async def delete_attribution_by_id_route(id: int) -> Attribution | None:
+async def delete_attribution_by_id_route(id: int, request: Request) -> Attribution | None:
     """Delete a attribution by id.
 
+    With an ``If-Match`` ETag the attribution is only deleted if it hasn't changed.
+
     Args:
         id: int - The unique identifier for the attribution to delete.
+        request: Request - The request, checked for ``If-Match``.
 
     Returns:
         Attribution | None: The deleted attribution, or None if it wasn't found.
 
     Raises:
-        HTTPException: For deletion or database errors.
+        HTTPException: For deletion, precondition or database errors.
     """
     try:
         id_obj: AttributionWhereUniqueInput = {"id": id}
-        return await delete_attribution_by_id(id_obj)
+        return await delete_attribution_by_id(id_obj, version=if_match(request, "Attribution", id))
     except DeletionError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
+    except PreconditionFailedError as err:
+        raise HTTPException(status_code=412, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
 
 
 @router.put("/update/{id}")
-async def update_attribution_route(data: AttributionUpdateInput, id: int) -> Attribution | None:
+async def update_attribution_route(
+    data: AttributionUpdateInput, id: int, request: Request, response: Response
+) -> Attribution | None:
     """Update a attribution by id.
 
+    With an ``If-Match`` ETag the attribution is only updated if it hasn't changed;
+    the response carries the ETag of the updated attribution either way.
+
     Args:
         id: int - The unique identifier for the attribution to update.
         data: AttributionUpdateInput - The data to update the attribution with.
+        request: Request - The request, checked for ``If-Match``.
+        response: Response - The response the new ETag is set on.
 
     Returns:
         Attribution | None: The updated attribution, or None if it wasn't found.
 
     Raises:
-        HTTPException: For update or database errors.
+        HTTPException: For update, precondition or database errors.
     """
     try:
         id_obj: AttributionWhereUniqueInput = {"id": id}
-        return await update_attribution(id_obj=id_obj, attribution_data=data)
+        version = if_match(request, "Attribution", id)
+        attribution = await update_attribution(id_obj=id_obj, attribution_data=data, version=version)
     except UpdateError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
+    except PreconditionFailedError as err:
+        raise HTTPException(status_code=412, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = entity_etag(id, row_version(attribution))
+    return attribution
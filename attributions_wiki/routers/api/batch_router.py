@@ -0,0 +1,34 @@
+"""Batch router."""
+from fastapi import APIRouter, HTTPException
+
+from ...exceptions import DatabaseError, ValidationError
+from ...services.batch_service import BatchRequest, BatchResult, run_batch
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["batch"],
+)
+
+
+@router.post("", response_model=list[BatchResult])
+async def run_batch_route(batch: BatchRequest) -> list[BatchResult]:
+    """Run many belief, attribution and factor operations in one request.
+
+    See ``services.batch_service`` for the operations, references between
+    them and atomic batches.
+
+    Args:
+        batch: BatchRequest - The operations and whether to run them in one transaction.
+
+    Returns:
+        list[BatchResult]: The status and body or error of each operation, in order.
+
+    Raises:
+        HTTPException: For malformed batches, or atomic batches that could not be committed.
+    """
+    try:
+        return await run_batch(batch.operations, atomic=batch.atomic)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
+    except DatabaseError as err:
+        raise HTTPException(status_code=500, detail=str(err)) from err
@@ -1,23 +1,44 @@
 """Belief router."""
-from typing import List
+from typing import Annotated, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from prisma.models import Belief
+from prisma.models import Attribution, Belief
 from prisma.types import BeliefCreateInput, BeliefUpdateInput, BeliefWhereUniqueInput
 
+from ...etags import (
+    collection_etag,
+    entity_etag,
+    if_match,
+    is_conditional,
+    not_modified,
+)
 from ...exceptions import (
     DatabaseError,
     DeletionError,
     NotFoundError,
+    PreconditionFailedError,
     UpdateError,
     ValidationError,
 )
+from ...fieldsets import (
+    FIELDS_DESCRIPTION,
+    parse_fields,
+    partial_entity_response,
+    partial_response,
+    with_version,
+)
+from ...repositories.base import row_version
 from ...services.belief_service import (
     create_belief,
     delete_belief_by_id,
+    get_attributions_for_belief,
     get_belief_by_id,
+    get_belief_version,
     get_beliefs,
+    get_beliefs_version,
+    get_partial_belief_by_id,
+    get_partial_beliefs,
     update_belief,
 )
 
@@ -49,84 +70,184 @@ async def create_belief_route(belief_data: BeliefCreateInput) -> Belief:
         raise HTTPException(status_code=500, detail=str(err)) from err
 
 
-@router.get("/get_all")
-async def get_beliefs_route() -> List[Belief]:
-    """Get all beliefs.
+@router.get("/get_all", response_model=List[Belief])
+async def get_beliefs_route(
+    request: Request,
+    response: Response,
+    take: Annotated[int | None, Query(ge=0)] = None,
+    skip: Annotated[int | None, Query(ge=0)] = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> List[Belief] | Response:
+    """Get all beliefs, optionally one page at a time.
+
+    The ETag comes from the table's version, read before the rows so a write
+    landing in between only makes the ETag older than the body, never newer.
+
+    Args:
+        request: Request - The request, checked for ``If-None-Match``.
+        response: Response - The response the ETag is set on.
+        take: int | None - The maximum number of beliefs to return.
+        skip: int | None - The number of beliefs to skip.
+        fields: str | None - Comma separated belief fields to return instead of all of them.
 
     Returns:
-        List[Belief]: A list of all beliefs.
+        List[Belief] | Response: A list of beliefs ordered by id, just the
+        ``fields`` asked for of each, or an empty ``304 Not Modified`` if the
+        client's copy is current.
 
     Raises:
-        HTTPException: For database errors.
+        HTTPException: For unknown fields or database errors.
     """
     try:
-        return await get_beliefs()
+        selected = parse_fields("Belief", fields)
+        etag = collection_etag(await get_beliefs_version(), take=take, skip=skip)
+        if unchanged := not_modified(request, etag):
+            return unchanged
+        if selected is not None:
+            return partial_response(
+                await get_partial_beliefs(selected, take=take, skip=skip), etag
+            )
+        beliefs = await get_beliefs(take=take, skip=skip)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = etag
+    return beliefs
 
 
-@router.get("/get/{id}")
-async def get_belief_by_id_route(id: int) -> Belief:
+async def _partial_belief(
+    id_obj: BeliefWhereUniqueInput, fields: tuple[str, ...]
+) -> Response:
+    # Read the version columns too, so the ETag comes from the same row
+    belief = await get_partial_belief_by_id(id_obj, with_version("Belief", fields))
+    return partial_entity_response("Belief", belief, fields)
+
+
+@router.get("/get/{id}", response_model=Belief)
+async def get_belief_by_id_route(
+    id: int,
+    request: Request,
+    response: Response,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> Belief | Response:
     """Get a belief by id.
 
+    Conditional requests check the belief's version first and skip loading it
+    when the client's copy is current.
+
     Args:
         id: int - The unique identifier for the belief.
+        request: Request - The request, checked for ``If-None-Match``.
+        response: Response - The response the ETag is set on.
+        fields: str | None - Comma separated belief fields to return instead of all of them.
 
     Returns:
-        Belief: The requested belief.
+        Belief | Response: The requested belief, just the ``fields`` asked for,
+        or an empty ``304 Not Modified`` if the client's copy is current.
 
     Raises:
-        HTTPException: For not found or database errors.
+        HTTPException: For unknown fields, not found or database errors.
     """
     try:
+        selected = parse_fields("Belief", fields)
         id_obj: BeliefWhereUniqueInput = {"id": id}
-        return await get_belief_by_id(id_obj)
+        if is_conditional(request):
+            version = await get_belief_version(id_obj)
+            if version is not None and (
+                unchanged := not_modified(request, entity_etag(id, version))
+            ):
+                return unchanged
+        if selected is not None:
+            return await _partial_belief(id_obj, selected)
+        belief = await get_belief_by_id(id_obj)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
     except NotFoundError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = entity_etag(id, row_version(belief))
+    return belief
+
+
+@router.get("/get/{id}/attributions")
+async def get_attributions_for_belief_route(id: int) -> List[Attribution]:
+    """Get every attribution linked to a belief.
+
+    Args:
+        id: int - The unique identifier for the belief.
+
+    Returns:
+        List[Attribution]: The linked attributions.
+
+    Raises:
+        HTTPException: For database errors.
+    """
+    try:
+        id_obj: BeliefWhereUniqueInput = {"id": id}
+        return await get_attributions_for_belief(id_obj)
+    except DatabaseError as err:
+        raise HTTPException(status_code=500, detail=str(err)) from err
 
 
 @router.delete("/delete/{id}")
-async def delete_belief_by_id_route(id: int) -> Belief | None:
+async def delete_belief_by_id_route(id: int, request: Request) -> Belief | None:
     """Delete a belief by id.
 
+    With an ``If-Match`` ETag the belief is only deleted if it hasn't changed.
+
     Args:
         id: int - The unique identifier for the belief to delete.
+        request: Request - The request, checked for ``If-Match``.
 
     Returns:
         Belief | None: The deleted belief, or None if it wasn't found.
 
     Raises:
-        HTTPException: For deletion or database errors.
+        HTTPException: For deletion, precondition or database errors.
     """
     try:
         id_obj: BeliefWhereUniqueInput = {"id": id}
-        return await delete_belief_by_id(id_obj)
+        return await delete_belief_by_id(id_obj, version=if_match(request, "Belief", id))
     except DeletionError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
+    except PreconditionFailedError as err:
+        raise HTTPException(status_code=412, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
 
 
 @router.put("/update/{id}")
-async def update_belief_route(data: BeliefUpdateInput, id: int) -> Belief | None:
+async def update_belief_route(
+    data: BeliefUpdateInput, id: int, request: Request, response: Response
+) -> Belief | None:
     """Update a belief by id.
 
+    With an ``If-Match`` ETag the belief is only updated if it hasn't changed;
+    the response carries the ETag of the updated belief either way.
+
     Args:
         id: int - The unique identifier for the belief to update.
         data: BeliefUpdateInput - The data to update the belief with.
+        request: Request - The request, checked for ``If-Match``.
+        response: Response - The response the new ETag is set on.
 
     Returns:
         Belief | None: The updated belief, or None if it wasn't found.
 
     Raises:
-        HTTPException: For update or database errors.
+        HTTPException: For update, precondition or database errors.
     """
     try:
         id_obj: BeliefWhereUniqueInput = {"id": id}
-        return await update_belief(id_obj=id_obj, belief_data=data)
+        version = if_match(request, "Belief", id)
+        belief = await update_belief(id_obj=id_obj, belief_data=data, version=version)
     except UpdateError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
+    except PreconditionFailedError as err:
+        raise HTTPException(status_code=412, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = entity_etag(id, row_version(belief))
+    return belief
@@ -1,23 +1,43 @@
 """Factor router."""
-from typing import List
+from typing import Annotated, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
 from prisma.models import Factor
 from prisma.types import FactorCreateInput, FactorUpdateInput, FactorWhereUniqueInput
 
+from ...etags import (
+    collection_etag,
+    entity_etag,
+    if_match,
+    is_conditional,
+    not_modified,
+)
 from ...exceptions import (
     DatabaseError,
     DeletionError,
     NotFoundError,
+    PreconditionFailedError,
     UpdateError,
     ValidationError,
 )
+from ...fieldsets import (
+    FIELDS_DESCRIPTION,
+    parse_fields,
+    partial_entity_response,
+    partial_response,
+    with_version,
+)
+from ...repositories.base import row_version
 from ...services.factor_service import (
     create_factor,
     delete_factor_by_id,
     get_factor_by_id,
+    get_factor_version,
     get_factors,
+    get_factors_version,
+    get_partial_factor_by_id,
+    get_partial_factors,
     update_factor,
 )
 
@@ -50,84 +70,164 @@ async def create_factor_route(factor_data: FactorCreateInput) -> Factor:
         raise HTTPException(status_code=500, detail=str(err)) from err
 
 
-@router.get("/get_all")
-async def get_factors_route() -> List[Factor]:
-    """Get all factors.
+@router.get("/get_all", response_model=List[Factor])
+async def get_factors_route(
+    request: Request,
+    response: Response,
+    take: Annotated[int | None, Query(ge=0)] = None,
+    skip: Annotated[int | None, Query(ge=0)] = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> List[Factor] | Response:
+    """Get all factors, optionally one page at a time.
+
+    The ETag comes from the table's version, read before the rows so a write
+    landing in between only makes the ETag older than the body, never newer.
+
+    Args:
+        request: Request - The request, checked for ``If-None-Match``.
+        response: Response - The response the ETag is set on.
+        take: int | None - The maximum number of factors to return.
+        skip: int | None - The number of factors to skip.
+        fields: str | None - Comma separated factor fields to return instead of all of them.
 
     Returns:
-        List[Factor]: A list of all factors.
+        List[Factor] | Response: A list of factors ordered by id, just the
+        ``fields`` asked for of each, or an empty ``304 Not Modified`` if the
+        client's copy is current.
 
     Raises:
-        HTTPException: For database errors.
+        HTTPException: For unknown fields or database errors.
     """
     try:
-        return await get_factors()
+        selected = parse_fields("Factor", fields)
+        etag = collection_etag(await get_factors_version(), take=take, skip=skip)
+        if unchanged := not_modified(request, etag):
+            return unchanged
+        if selected is not None:
+            return partial_response(
+                await get_partial_factors(selected, take=take, skip=skip), etag
+            )
+        factors = await get_factors(take=take, skip=skip)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = etag
+    return factors
 
 
-@router.get("/get/{id}")
-async def get_factor_by_id_route(id: int) -> Factor:
+async def _partial_factor(
+    id_obj: FactorWhereUniqueInput, fields: tuple[str, ...]
+) -> Response:
+    # Read the version columns too, so the ETag comes from the same row
+    factor = await get_partial_factor_by_id(id_obj, with_version("Factor", fields))
+    return partial_entity_response("Factor", factor, fields)
+
+
+@router.get("/get/{id}", response_model=Factor)
+async def get_factor_by_id_route(
+    id: int,
+    request: Request,
+    response: Response,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> Factor | Response:
     """Get a factor by id.
 
+    Conditional requests check the factor's version first and skip loading it
+    when the client's copy is current.
+
     Args:
         id: int - The unique identifier for the factor.
+        request: Request - The request, checked for ``If-None-Match``.
+        response: Response - The response the ETag is set on.
+        fields: str | None - Comma separated factor fields to return instead of all of them.
 
     Returns:
-        Factor: The requested factor.
+        Factor | Response: The requested factor, just the ``fields`` asked for,
+        or an empty ``304 Not Modified`` if the client's copy is current.
 
     Raises:
-        HTTPException: For not found or database errors.
+        HTTPException: For unknown fields, not found or database errors.
     """
     try:
+        selected = parse_fields("Factor", fields)
         id_obj: FactorWhereUniqueInput = {"id": id}
-        return await get_factor_by_id(id_obj)
+        if is_conditional(request):
+            version = await get_factor_version(id_obj)
+            if version is not None and (
+                unchanged := not_modified(request, entity_etag(id, version))
+            ):
+                return unchanged
+        if selected is not None:
+            return await _partial_factor(id_obj, selected)
+        factor = await get_factor_by_id(id_obj)
+    except ValidationError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
     except NotFoundError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = entity_etag(id, row_version(factor))
+    return factor
 
 
 @router.delete("/delete/{id}")
-async def delete_factor_by_id_route(id: int) -> Factor | None:
+async def delete_factor_by_id_route(id: int, request: Request) -> Factor | None:
     """Delete a factor by id.
 
+    With an ``If-Match`` ETag the factor is only deleted if it hasn't changed.
+
     Args:
         id: int - The unique identifier for the factor to delete.
+        request: Request - The request, checked for ``If-Match``.
 
     Returns:
         Factor | None: The deleted factor, or None if it wasn't found.
 
     Raises:
-        HTTPException: For deletion or database errors.
+        HTTPException: For deletion, precondition or database errors.
     """
     try:
         id_obj: FactorWhereUniqueInput = {"id": id}
-        return await delete_factor_by_id(id_obj)
+        return await delete_factor_by_id(id_obj, version=if_match(request, "Factor", id))
     except DeletionError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
+    except PreconditionFailedError as err:
+        raise HTTPException(status_code=412, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
 
 
 @router.put("/update/{id}")
-async def update_factor_route(data: FactorUpdateInput, id: int) -> Factor | None:
+async def update_factor_route(
+    data: FactorUpdateInput, id: int, request: Request, response: Response
+) -> Factor | None:
     """Update a factor by id.
 
+    With an ``If-Match`` ETag the factor is only updated if it hasn't changed;
+    the response carries the ETag of the updated factor either way.
+
     Args:
         id: int - The unique identifier for the factor to update.
         data: FactorUpdateInput - The data to update the factor with.
+        request: Request - The request, checked for ``If-Match``.
+        response: Response - The response the new ETag is set on.
 
     Returns:
         Factor | None: The updated factor, or None if it wasn't found.
 
     Raises:
-        HTTPException: For update or database errors.
+        HTTPException: For update, precondition or database errors.
     """
     try:
         id_obj: FactorWhereUniqueInput = {"id": id}
-        return await update_factor(id_obj=id_obj, factor_data=data)
+        version = if_match(request, "Factor", id)
+        factor = await update_factor(id_obj=id_obj, factor_data=data, version=version)
     except UpdateError as err:
         raise HTTPException(status_code=404, detail=str(err)) from err
+    except PreconditionFailedError as err:
+        raise HTTPException(status_code=412, detail=str(err)) from err
     except DatabaseError as err:
         raise HTTPException(status_code=500, detail=str(err)) from err
+    response.headers["ETag"] = entity_etag(id, row_version(factor))
+    return factor
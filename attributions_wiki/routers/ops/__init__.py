@@ -0,0 +1 @@
+"""Operational routes: health probes, metrics and debugging."""
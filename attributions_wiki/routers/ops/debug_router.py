@@ -0,0 +1,205 @@
+"""Admin-only debugging endpoints: request profiles, blocking calls and memory."""
+import re
+import tracemalloc
+from pathlib import Path
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ... import config, memory
+from ...loop_monitor import loop_monitor
+from ...services.user_service import get_current_admin_user
+from ...startup import timings
+
+router = APIRouter(
+    prefix="/debug", tags=["ops"], dependencies=[Depends(get_current_admin_user)]
+)
+
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}\.(prof|html)$")
+
+GroupBy = Literal["filename", "lineno", "traceback"]
+
+
+@router.get("/profiles")
+def list_profiles() -> list[dict[str, Any]]:
+    """List the stored request profiles, newest first.
+
+    Returns:
+        list: Name, size in bytes and modification time of each profile.
+    """
+    directory = Path(config.PROFILE_DIR)
+    if not directory.is_dir():
+        return []
+    files = [path for path in directory.iterdir() if _PROFILE_NAME.match(path.name)]
+    files.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    return [
+        {"name": path.name, "bytes": path.stat().st_size, "modified": path.stat().st_mtime}
+        for path in files
+    ]
+
+
+@router.get("/profiles/{name}")
+def get_profile(name: str) -> FileResponse:
+    """Download a stored request profile.
+
+    Args:
+        name: The profile name from the ``X-Profile-Id`` header.
+
+    Returns:
+        FileResponse: The pstats dump or the HTML report.
+
+    Raises:
+        HTTPException: If there is no profile with that name.
+    """
+    path = Path(config.PROFILE_DIR) / name
+    if not _PROFILE_NAME.match(name) or not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/html" if name.endswith(".html") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+
+@router.get("/blocking")
+async def blocking_calls() -> list[dict[str, Any]]:
+    """List the most recent times a handler blocked the event loop, newest first.
+
+    Returns:
+        list: Route, method, application frame, stack and how long the loop was blocked.
+    """
+    return list(reversed(loop_monitor.events))
+
+
+@router.get("/startup")
+def startup_report() -> dict[str, Any]:
+    """Report how long this worker took to import the app, start up and serve its first request.
+
+    Returns:
+        dict: ``import_seconds``, lifespan ``phases``, ``ready_seconds``, ``first_request``
+            and the ``deferred_imports_loaded`` so far, all in seconds since the worker started.
+    """
+    return timings.report()
+
+
+@router.get("/memory")
+def memory_summary() -> dict[str, Any]:
+    """Report RSS, traced memory and the size of every tracked cache.
+
+    Returns:
+        dict: ``rss_bytes``, ``tracing``, ``traced_bytes``/``peak_bytes`` while tracing,
+            ``caches`` and the stored ``snapshots``.
+    """
+    summary: dict[str, Any] = {
+        "rss_bytes": memory.rss_bytes(),
+        "tracing": tracemalloc.is_tracing(),
+        "caches": memory.cache_sizes(),
+        "snapshots": memory.snapshot_store.list(),
+    }
+    if tracemalloc.is_tracing():
+        summary["traced_bytes"], summary["peak_bytes"] = tracemalloc.get_traced_memory()
+    return summary
+
+
+@router.post("/memory/start")
+def start_memory_tracing(frames: int = Query(config.TRACEMALLOC_FRAMES, ge=1, le=100)) -> dict[str, Any]:
+    """Start tracing allocations.
+
+    Args:
+        frames: Stack frames kept per allocation.
+
+    Returns:
+        dict: Whether tracemalloc is tracing.
+    """
+    memory.start_tracing(frames)
+    return {"tracing": True}
+
+
+@router.post("/memory/stop")
+def stop_memory_tracing() -> dict[str, Any]:
+    """Stop tracing allocations; stored snapshots are kept.
+
+    Returns:
+        dict: Whether tracemalloc is tracing.
+    """
+    memory.stop_tracing()
+    return {"tracing": False}
+
+
+@router.post("/memory/snapshots")
+def take_memory_snapshot(
+    group_by: GroupBy = "lineno", limit: int = Query(25, ge=1, le=500)
+) -> dict[str, Any]:
+    """Take a tracemalloc snapshot and summarize it.
+
+    Args:
+        group_by: Group allocations by "filename", "lineno" or "traceback".
+        limit: How many allocation sites to return.
+
+    Returns:
+        dict: The snapshot ``name`` and its ``top`` allocation sites.
+
+    Raises:
+        HTTPException: If tracemalloc is not tracing.
+    """
+    try:
+        name = memory.snapshot_store.take()
+    except RuntimeError as err:
+        raise HTTPException(status_code=409, detail=f"{err}, POST /debug/memory/start first") from err
+    snapshot = memory.snapshot_store.get(name)
+    return {"name": name, "top": memory.top_allocations(snapshot, group_by, limit)}
+
+
+@router.get("/memory/snapshots/{name}")
+def get_memory_snapshot(
+    name: str, group_by: GroupBy = "lineno", limit: int = Query(25, ge=1, le=500)
+) -> list[dict[str, Any]]:
+    """List the top allocation sites of a stored snapshot.
+
+    Args:
+        name: The snapshot name.
+        group_by: Group allocations by "filename", "lineno" or "traceback".
+        limit: How many allocation sites to return.
+
+    Returns:
+        list: Location, size and block count per allocation site.
+
+    Raises:
+        HTTPException: If there is no snapshot with that name.
+    """
+    try:
+        snapshot = memory.snapshot_store.get(name)
+    except KeyError as err:
+        raise HTTPException(status_code=404, detail="Snapshot not found") from err
+    return memory.top_allocations(snapshot, group_by, limit)
+
+
+@router.get("/memory/diff")
+def diff_memory_snapshots(
+    base: str,
+    target: str | None = None,
+    group_by: GroupBy = "lineno",
+    limit: int = Query(25, ge=1, le=500),
+) -> list[dict[str, Any]]:
+    """Compare two snapshots, or a snapshot with the memory traced right now.
+
+    Args:
+        base: The earlier snapshot.
+        target: The later snapshot; a new snapshot is taken when omitted.
+        group_by: Group allocations by "filename", "lineno" or "traceback".
+        limit: How many allocation sites to return.
+
+    Returns:
+        list: The allocation sites that changed the most, with their size differences.
+
+    Raises:
+        HTTPException: If a snapshot does not exist or a new one cannot be taken.
+    """
+    try:
+        if target is None:
+            target = memory.snapshot_store.take()
+        return memory.diff_allocations(
+            memory.snapshot_store.get(base), memory.snapshot_store.get(target), group_by, limit
+        )
+    except KeyError as err:
+        raise HTTPException(status_code=404, detail="Snapshot not found") from err
+    except RuntimeError as err:
+        raise HTTPException(status_code=409, detail=str(err)) from err
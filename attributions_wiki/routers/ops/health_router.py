@@ -0,0 +1,57 @@
+"""Liveness and readiness probes."""
+import asyncio
+from contextlib import suppress
+from typing import Any
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from ... import config
+from ... import db as database
+from ...admission import admission_controller
+from ...health import ping, pool_stats, readiness
+
+router = APIRouter(tags=["ops"])
+
+# Seconds the readiness probe waits for the database to answer
+PING_TIMEOUT = 2.0
+
+
+@router.get("/healthz")
+async def healthz() -> dict[str, Any]:
+    """Liveness probe, answers as long as the event loop is running.
+
+    Returns:
+        dict: The process status; never touches the database.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz() -> JSONResponse:
+    """Readiness probe, answers 200 once the worker is warm and the database is reachable.
+
+    Returns:
+        JSONResponse: The readiness state and the saturation of every connection pool,
+            with status 503 while warming up, shutting down or unable to reach the database.
+    """
+    uses_database = config.REPOSITORY_BACKEND == "prisma"
+    # The memory backend has no database to reach
+    database_ok = not uses_database
+    if uses_database:
+        # A database that doesn't answer in time counts as unreachable
+        with suppress(TimeoutError):
+            async with asyncio.timeout(PING_TIMEOUT):
+                database_ok = await ping(database.db)
+    ready = readiness.ready and database_ok
+    body: dict[str, Any] = {
+        "status": "ready" if ready else "not ready",
+        "warmed_up": readiness.ready,
+        "database": database_ok,
+        "startup_seconds": readiness.startup_seconds,
+        "pools": await pool_stats() if uses_database and database_ok else {},
+        "admission": admission_controller.stats(),
+    }
+    return JSONResponse(
+        body, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
@@ -0,0 +1,78 @@
+"""Prometheus metrics endpoint."""
+from contextlib import suppress
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ... import db as database
+from ...admission import admission_controller
+from ...deadline import counters as deadline_counters
+from ...metrics import Counter, Gauge, registry
+
+router = APIRouter(tags=["ops"])
+
+admission_requests = registry.register(
+    Counter(
+        "admission_requests_total",
+        "Requests through admission control by outcome.",
+        ("outcome",),
+    )
+)
+admission_queue_seconds = registry.register(
+    Counter("admission_queue_seconds_total", "Seconds requests spent queued for admission.")
+)
+admission_gauge = registry.register(
+    Gauge("admission_requests", "Requests running or queued in admission control.", ("state",))
+)
+admission_queue_seconds_max = registry.register(
+    Gauge("admission_queue_seconds_max", "Longest time a request has waited for admission.")
+)
+admission_limit = registry.register(
+    Gauge("admission_limit", "Configured admission control limits.", ("limit",))
+)
+deadline_events = registry.register(
+    Counter(
+        "deadline_events_total", "Requests cut short by deadlines or disconnects.", ("event",)
+    )
+)
+read_pool_gauge = registry.register(
+    Gauge("asyncpg_pool_connections", "asyncpg read pool connections.", ("pool", "state"))
+)
+
+
+def _collect() -> None:
+    stats = admission_controller.stats()
+    for outcome in ("admitted", "rejected_queue_full", "rejected_timeout"):
+        admission_requests.set_total(stats[f"{outcome}_total"], outcome)
+    admission_queue_seconds.set_total(stats["queue_seconds_total"])
+    for state in ("in_flight", "queued"):
+        admission_gauge.set(stats[state], state)
+    admission_queue_seconds_max.set(stats["queue_seconds_max"])
+    for limit in ("max_in_flight", "max_queue"):
+        admission_limit.set(stats[limit], limit)
+    for event, total in deadline_counters.items():
+        deadline_events.set_total(total, event)
+    for name, pool in (
+        ("primary", database.get_read_pool()),
+        ("replica", database.get_replica_read_pool()),
+    ):
+        if pool is not None:
+            read_pool_gauge.set(pool.get_size() - pool.get_idle_size(), name, "busy")
+            read_pool_gauge.set(pool.get_idle_size(), name, "idle")
+
+
+registry.add_collector(_collect)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Expose the application metrics, followed by the Prisma engine's own metrics.
+
+    Returns:
+        PlainTextResponse: Metrics in the Prometheus text exposition format.
+    """
+    body = registry.render()
+    # Needs a connected engine with the "metrics" preview feature
+    with suppress(Exception):
+        body += await database.db.get_metrics(format="prometheus")
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,17 +1,19 @@
 """This file contains all the views."""
 # TODO: Break this up into more view files ... this will do for now though
-from typing import List
+from collections.abc import AsyncIterator
+from typing import Annotated, Any, List
 
-from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, Response
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 
 from prisma.models import Belief
 from prisma.types import BeliefWhereUniqueInput
 
-from ...db import db
+from ... import config
+from ...repositories import repositories
+from ...services.db_call import db_call
+from ...templating import render, stream
 
-templates = Jinja2Templates(directory="static/templates")
 router = APIRouter(
     tags=["views"],
     responses={404: {"description": "Not found"}},
@@ -21,32 +23,56 @@ router = APIRouter(
 @router.get("/", response_class=HTMLResponse)
 async def home(request: Request) -> Response:
     """Home testing."""
-    template: Response = templates.TemplateResponse(  # type: ignore
-        name="Home.html", context={"request": request}, status_code=200
-    )
-    return template
+    return render(request, "Home.html", {})
+
+
+async def _belief_pages(
+    first: List[Belief], after: int, chunk_size: int, page_size: int
+) -> AsyncIterator[dict[str, Any]]:
+    """Template contexts of one page of beliefs, fetched ``chunk_size`` rows at a time."""
+    beliefs, take, sent = first, chunk_size, 0
+    while True:
+        sent += len(beliefs)
+        # A full chunk means the table may go on past it
+        more = len(beliefs) == take
+        if beliefs:
+            after = beliefs[-1].id
+        if not more or sent >= page_size:
+            yield {"beliefs": beliefs, "next_after": after if more else None}
+            return
+        yield {"beliefs": beliefs, "next_after": None}
+        take = min(chunk_size, page_size - sent)
+        beliefs = await db_call(repositories.belief.find_many, take=take, after=after)
 
 
 @router.get("/templates/belief/get_all", response_class=HTMLResponse)
-async def get_all_beliefs_template(request: Request) -> Response:
-    """Get HTMX for all beliefs."""
-    beliefs: List[Belief] = await db.belief.find_many()
-    template: Response = templates.TemplateResponse(  # type: ignore
-        name="belief_list.html",
-        context={"request": request, "beliefs": beliefs},
-        status_code=200,
-    )  # type: ignore
-    return template
+async def get_all_beliefs_template(
+    after: Annotated[int, Query(ge=0)] = 0,
+) -> Response:
+    """Stream HTMX for a page of beliefs past ``after``, ending in a sentinel for the next one.
+
+    Only the first chunk is fetched before the response starts, so the first
+    cards arrive just as fast however many beliefs there are; database errors
+    in it still turn into a proper error response. The sentinel loads the next
+    page when it scrolls into view (``hx-trigger="revealed"``).
+    """
+    chunk_size = max(1, min(config.BELIEF_LIST_CHUNK_SIZE, config.BELIEF_LIST_PAGE_SIZE))
+    first: List[Belief] = await db_call(
+        repositories.belief.find_many, take=chunk_size, after=after
+    )
+    pages = _belief_pages(
+        first, after, chunk_size, max(config.BELIEF_LIST_PAGE_SIZE, chunk_size)
+    )
+    return StreamingResponse(
+        stream("belief_list.html", pages), media_type="text/html; charset=utf-8"
+    )
 
 
 @router.get("/templates/belief/get/{id}", response_class=HTMLResponse)
 async def get_belief_by_id_template(request: Request, id: int) -> Response:
     """Get HTMX for single belief by id."""
     id_obj: BeliefWhereUniqueInput = BeliefWhereUniqueInput(id=id)
-    belief: Belief = await db.belief.find_unique_or_raise(id_obj)
-    template: Response = templates.TemplateResponse(  # type: ignore
-        name="belief.html",
-        context={"request": request, "belief": belief},
-        status_code=200,
-    )
-    return template
+    belief: Belief | None = await db_call(repositories.belief.find_unique, id_obj)
+    if belief is None:
+        raise HTTPException(status_code=404, detail=f"Belief with ID: {id} not found")
+    return render(request, "belief.html", {"belief": belief})
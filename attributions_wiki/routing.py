@@ -0,0 +1,203 @@
+"""Read-replica routing for the service layer.
+
+Reads (the ``get_*`` service functions) go to the replica when one is configured,
+healthy and caught up; writes always go to the primary ``db``. A client that
+has just written successfully is pinned to the primary for ``REPLICA_STICKY_SECONDS``
+through a cookie, so it always reads its own writes even while the replica catches up.
+Inside a transaction (``db.transaction``) reads go to the transaction too.
+"""
+import asyncio
+import logging
+import math
+import time
+from contextlib import suppress
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Any
+
+from prisma import Prisma
+
+from . import config
+from . import db as database
+
+log = logging.getLogger(__name__)
+
+STICKY_COOKIE = "aw_primary_until"
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# True while serving a request that must read from the primary
+_use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+
+# Seconds the replica is behind the primary. Zero when both have replayed the same
+# WAL position, NULL (treated as zero) when the server is not a standby at all.
+_LAG_QUERY = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END AS lag
+"""
+
+
+class ReplicaLagMonitor:
+    """Periodically measure replica lag so reads can fall back to the primary."""
+
+    def __init__(self, max_lag: float, interval: float) -> None:
+        """Initialize a ReplicaLagMonitor.
+
+        Args:
+            max_lag: Lag in seconds above which the replica is considered stale.
+            interval: Seconds between two lag checks.
+        """
+        self.max_lag = max_lag
+        self.interval = interval
+        # Unknown until the first check succeeds, so reads start on the primary
+        self.lag_seconds = math.inf
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the replica is reachable and within the lag budget."""
+        return self.lag_seconds <= self.max_lag
+
+    async def check(self) -> float:
+        """Measure the replica lag once and store it.
+
+        Returns:
+            float: The lag in seconds, ``inf`` if the replica could not be queried.
+        """
+        replica = database.replica_db
+        if replica is None or not replica.is_connected():
+            self.lag_seconds = math.inf
+            return self.lag_seconds
+        try:
+            row = await replica.query_first(_LAG_QUERY)
+        except Exception:
+            log.warning("Replica lag check failed, routing reads to the primary", exc_info=True)
+            self.lag_seconds = math.inf
+        else:
+            lag = row.get("lag") if row else None
+            self.lag_seconds = float(lag) if lag is not None else 0.0
+        return self.lag_seconds
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start checking in the background if a replica is configured."""
+        if database.replica_db is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background checks."""
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+replica_lag_monitor = ReplicaLagMonitor(
+    max_lag=config.REPLICA_MAX_LAG_SECONDS, interval=config.REPLICA_LAG_CHECK_INTERVAL
+)
+
+
+def use_replica() -> bool:
+    """Whether reads for the current request may be served by the replica."""
+    replica = database.replica_db
+    return (
+        replica is not None
+        and not _use_primary.get()
+        and replica_lag_monitor.healthy
+        and replica.is_connected()
+    )
+
+
+def reader() -> Prisma:
+    """Return the Prisma client reads for the current request should use."""
+    transaction = database.open_transaction()
+    if transaction is not None:
+        return transaction
+    if use_replica():
+        return database.replica_db  # type: ignore
+    return database.db
+
+
+def reader_pool() -> Any:
+    """Return the asyncpg pool reads should use, or None to read through Prisma."""
+    if database.open_transaction() is not None:
+        return None
+    if use_replica() and database.get_replica_read_pool() is not None:
+        return database.get_replica_read_pool()
+    return database.get_read_pool()
+
+
+def _sticky_until(headers: list[tuple[bytes, bytes]]) -> float:
+    for name, value in headers:
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(STICKY_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class ReplicaRoutingMiddleware:
+    """Pin clients to the primary for a short window after they write.
+
+    Successful responses to requests that wrote to the primary set a cookie
+    holding the time until which the client must read from the primary; reads
+    carrying an unexpired cookie skip the replica. Requests that only read, such
+    as signing in or a batch of reads, and failed writes leave the client alone.
+    The cookie is used instead of per-worker state so stickiness holds no matter
+    which worker serves the next request.
+    """
+
+    def __init__(self, app: Any, sticky_seconds: float = config.REPLICA_STICKY_SECONDS) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            sticky_seconds: How long a client reads from the primary after a write.
+        """
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Route the request and tag successful write responses with the sticky cookie."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] in _WRITE_METHODS
+        sticky = is_write or _sticky_until(scope["headers"]) > time.time()
+        token = _use_primary.set(sticky)
+        try:
+            if not is_write:
+                await self.app(scope, receive, send)
+                return
+
+            cookie = (
+                f"{STICKY_COOKIE}={time.time() + self.sticky_seconds:.3f}; "
+                f"Max-Age={math.ceil(self.sticky_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+            )
+
+            with database.record_writes() as writes:
+
+                async def send_with_cookie(message: Any) -> None:
+                    if (
+                        message["type"] == "http.response.start"
+                        and writes.wrote
+                        and 200 <= message["status"] < 300
+                    ):
+                        headers = list(message.get("headers", []))
+                        headers.append((b"set-cookie", cookie.encode("latin-1")))
+                        message = {**message, "headers": headers}
+                    await send(message)
+
+                await self.app(scope, receive, send_with_cookie)
+        finally:
+            _use_primary.reset(token)
@@ -0,0 +1,157 @@
+"""The production server: a pool of uvicorn workers under gunicorn.
+
+Usage::
+
+    python -m attributions_wiki serve --workers 4
+
+The master process imports the app once (``--preload``, on by default) and
+forks ``SERVER_WORKERS`` workers from it, so the modules, the compiled
+templates and everything else built at import time are shared copy-on-write
+instead of loaded by every worker. Database connections, the read snapshot and
+the background tasks are only started by each worker's lifespan, after the
+fork. Workers run on uvloop and parse HTTP with httptools when the ``server``
+extra is installed, and fall back to asyncio and h11 otherwise.
+
+A worker is replaced after ``SERVER_MAX_REQUESTS`` requests (plus a random
+jitter, so they do not all restart at once): it stops accepting connections,
+gets ``SERVER_GRACEFUL_TIMEOUT`` seconds to finish what it is serving, and a
+fresh worker forked from the preloaded master takes its place. That bounds the
+damage of slow leaks without dropping requests.
+
+When preloading, the master also loads what the app otherwise defers to first
+use (passlib, jose and the compiled templates, see ``startup.py``), so no
+worker pays for them on its first request.
+"""
+import argparse
+import sys
+from typing import Any, ClassVar
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from . import config
+from .startup import timings
+
+try:
+    import uvloop  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    uvloop = None
+
+try:
+    import httptools  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    httptools = None
+
+
+class Worker(UvicornWorker):
+    """A uvicorn worker on uvloop and httptools when they are installed."""
+
+    CONFIG_KWARGS: ClassVar[dict[str, Any]] = {
+        "loop": "uvloop" if uvloop is not None else "asyncio",
+        "http": "httptools" if httptools is not None else "h11",
+        "lifespan": "on",
+    }
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the worker, draining requests for up to the graceful timeout."""
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = self.cfg.graceful_timeout
+
+
+class Server(BaseApplication):
+    """gunicorn configured from a dict instead of a config file."""
+
+    def __init__(self, options: dict[str, Any]) -> None:
+        """Initialize the server.
+
+        Args:
+            options: gunicorn settings by name, see ``gunicorn_options``.
+        """
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        """Apply the settings."""
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        """Import the app, in the master when preloading and in each worker otherwise."""
+        from .app import app
+
+        if self.cfg.preload_app:
+            load_deferred()
+        return app
+
+
+def load_deferred() -> None:
+    """Load what the app imports on first use: password hashing, tokens and templates."""
+    from jose import jwt
+
+    from .services.auth import password_context
+    from .templating import get_templates
+
+    password_context()
+    templates = get_templates()
+    for name in templates.env.list_templates():
+        templates.get_template(name)
+
+
+def _post_fork(server: Any, worker: Any) -> None:
+    timings.forked()
+
+
+def gunicorn_options(args: argparse.Namespace) -> dict[str, Any]:
+    """The gunicorn settings for the parsed command line."""
+    return {
+        "bind": [f"{args.host}:{args.port}"],
+        "workers": args.workers,
+        "worker_class": Worker,
+        "preload_app": args.preload,
+        "post_fork": _post_fork,
+        "keepalive": args.keepalive,
+        "backlog": args.backlog,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "graceful_timeout": args.graceful_timeout,
+        # A draining worker stops heartbeating, so the master must not kill it sooner
+        "timeout": max(args.graceful_timeout, 30),
+        "accesslog": "-" if args.access_log else None,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line, with defaults from the ``SERVER_*`` settings."""
+    parser = argparse.ArgumentParser(
+        prog="python -m attributions_wiki", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("command", choices=("serve",))
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS)
+    parser.add_argument("--keepalive", type=int, default=config.SERVER_KEEPALIVE)
+    parser.add_argument("--backlog", type=int, default=config.SERVER_BACKLOG)
+    parser.add_argument("--max-requests", type=int, default=config.SERVER_MAX_REQUESTS)
+    parser.add_argument(
+        "--max-requests-jitter", type=int, default=config.SERVER_MAX_REQUESTS_JITTER
+    )
+    parser.add_argument("--graceful-timeout", type=int, default=config.SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument(
+        "--preload",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Import the app in the master before forking the workers",
+    )
+    parser.add_argument("--access-log", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the server from the command line until it is stopped."""
+    args = parse_args(argv)
+    Server(gunicorn_options(args)).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
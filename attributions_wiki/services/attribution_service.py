@@ -1,24 +1,28 @@
 """Attribution service."""
-from typing import List
+from typing import Any, List
 
-from prisma.errors import MissingRequiredValueError, PrismaError, RecordNotFoundError
-from prisma.models import Attribution
+from prisma.errors import MissingRequiredValueError, PrismaError
+from prisma.models import Attribution, Belief
 from prisma.types import (
     AttributionCreateInput,
     AttributionUpdateInput,
     AttributionWhereUniqueInput,
 )
 
-from ..db import db
 from ..exceptions import (
     DatabaseError,
     DeletionError,
     NotFoundError,
+    PreconditionFailedError,
     UpdateError,
     ValidationError,
 )
+from ..metrics import instrument
+from ..repositories import repositories
+from .db_call import db_call
 
 
+@instrument
 async def create_attribution(attribution_data: AttributionCreateInput) -> Attribution:
     """Create a new attribution.
 
@@ -33,7 +37,7 @@ async def create_attribution(attribution_data: AttributionCreateInput) -> Attrib
         DatabaseError: If there is a more general database issue during attribution creation.
     """
     try:
-        new_attribution: Attribution = await db.attribution.create(attribution_data)
+        new_attribution: Attribution = await db_call(repositories.attribution.create, attribution_data)
     except MissingRequiredValueError as err:
         raise ValidationError("Missing required value") from err
     except PrismaError as err:
@@ -42,23 +46,29 @@ async def create_attribution(attribution_data: AttributionCreateInput) -> Attrib
         return new_attribution
 
 
-async def get_attributions() -> List[Attribution]:
-    """Get all attributions.
+@instrument
+async def get_attributions(take: int | None = None, skip: int | None = None) -> List[Attribution]:
+    """Get all attributions, optionally one page at a time.
+
+    Args:
+        take: int | None - The maximum number of attributions to return.
+        skip: int | None - The number of attributions to skip before returning results.
 
     Returns:
-        List[Attribution]: A list of all attributions.
+        List[Attribution]: A list of attributions ordered by id.
 
     Raises:
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        attributions: List[Attribution] = await db.attribution.find_many()
+        attributions: List[Attribution] = await db_call(repositories.attribution.find_many, take=take, skip=skip)
     except PrismaError as err:
         raise DatabaseError("Issue retrieving all attributions") from err
     else:
         return attributions
 
 
+@instrument
 async def get_attribution_by_id(id_obj: AttributionWhereUniqueInput) -> Attribution:
     """Get a attribution by its unique ID.
 
@@ -73,31 +83,146 @@ async def get_attribution_by_id(id_obj: AttributionWhereUniqueInput) -> Attribut
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        attribution: Attribution = await db.attribution.find_unique_or_raise(id_obj)  # type: ignore
-    except RecordNotFoundError as err:
-        raise NotFoundError(f"Attribution with ID: {id_obj} not found") from err
+        attribution: Attribution | None = await db_call(repositories.attribution.find_unique, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving attribution by ID") from err
+    if attribution is None:
+        raise NotFoundError(f"Attribution with ID: {id_obj} not found")
+    return attribution
+
+
+@instrument
+async def get_partial_attributions(
+    fields: tuple[str, ...], take: int | None = None, skip: int | None = None
+) -> List[dict[str, Any]]:
+    """Get some fields of all attributions, optionally one page at a time.
+
+    Args:
+        fields: tuple[str, ...] - The Attribution fields to read, see ``fieldsets.parse_fields``.
+        take: int | None - The maximum number of attributions to return.
+        skip: int | None - The number of attributions to skip before returning results.
+
+    Returns:
+        List[dict[str, Any]]: The fields of each attribution, ordered by id.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(
+            repositories.attribution.find_many_partial, fields, take=take, skip=skip
+        )
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving all attributions") from err
+
+
+@instrument
+async def get_partial_attribution_by_id(
+    id_obj: AttributionWhereUniqueInput, fields: tuple[str, ...]
+) -> dict[str, Any]:
+    """Get some fields of an attribution by its unique ID.
+
+    Args:
+        id_obj: AttributionWhereUniqueInput - The unique identifier for the attribution.
+        fields: tuple[str, ...] - The Attribution fields to read, see ``fieldsets.parse_fields``.
+
+    Returns:
+        dict[str, Any]: The fields of the requested attribution.
+
+    Raises:
+        NotFoundError: If no attribution with the given ID is found.
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        attribution: dict[str, Any] | None = await db_call(
+            repositories.attribution.find_unique_partial, id_obj, fields
+        )
     except PrismaError as err:
         raise DatabaseError("Issue retrieving attribution by ID") from err
+    if attribution is None:
+        raise NotFoundError(f"Attribution with ID: {id_obj} not found")
+    return attribution
+
+
+@instrument
+async def get_attribution_version(id_obj: AttributionWhereUniqueInput) -> str | None:
+    """Get the version of a attribution without loading it, for conditional requests.
+
+    Args:
+        id_obj: AttributionWhereUniqueInput - The unique identifier for the attribution.
+
+    Returns:
+        str | None: The attribution's version, or None if it does not exist.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(repositories.attribution.version, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving attribution version") from err
+
+
+@instrument
+async def get_attributions_version() -> str:
+    """Get a version of all attributions that changes whenever any of them does.
+
+    Returns:
+        str: The row count and latest update of the attributions.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(repositories.attribution.collection_version)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving attributions version") from err
+
+
+@instrument
+async def get_beliefs_for_attribution(id_obj: AttributionWhereUniqueInput) -> List[Belief]:
+    """Get every belief linked to an attribution.
+
+    Args:
+        id_obj: AttributionWhereUniqueInput - The unique identifier for the attribution.
+
+    Returns:
+        List[Belief]: The linked beliefs ordered by id.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        beliefs: List[Belief] = await db_call(repositories.attribution.beliefs_of, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving beliefs for attribution") from err
     else:
-        return attribution
+        return beliefs
 
 
-async def delete_attribution_by_id(id_obj: AttributionWhereUniqueInput) -> Attribution | None:
+@instrument
+async def delete_attribution_by_id(
+    id_obj: AttributionWhereUniqueInput, version: str | None = None
+) -> Attribution | None:
     """Delete a attribution by its unique ID.
 
     Args:
         id_obj: AttributionWhereUniqueInput - The unique identifier for the attribution.
+        version: str | None - Only delete the attribution if it still has this version.
 
     Returns:
         Attribution | None: The deleted attribution, or None if it wasn't found.
 
     Raises:
         DeletionError: If the attribution is not found and Deletion Fails
+        PreconditionFailedError: If a version was given and the attribution no longer has it.
         ValidationError: If the attribution deletion fails due to missing required values.
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        attribution: Attribution | None = await db.attribution.delete(id_obj)  # type: ignore
+        attribution: Attribution | None = await db_call(repositories.attribution.delete, id_obj, version)
+        if attribution is None and version is not None:
+            raise PreconditionFailedError("Attribution has changed or was deleted since it was read")
         if attribution is None:
             raise DeletionError("Attribution Not Found - Deletion Failed")
     except MissingRequiredValueError as err:
@@ -108,20 +233,23 @@ async def delete_attribution_by_id(id_obj: AttributionWhereUniqueInput) -> Attri
         return attribution
 
 
+@instrument
 async def update_attribution(
-    id_obj: AttributionWhereUniqueInput, attribution_data: AttributionUpdateInput
+    id_obj: AttributionWhereUniqueInput, attribution_data: AttributionUpdateInput, version: str | None = None
 ) -> Attribution:
     """Update a attribution by its unique ID.
 
     Args:
         id_obj: AttributionWhereUniqueInput - The unique identifier for the attribution.
         attribution_data: AttributionUpdateInput - The data to update the attribution with.
+        version: str | None - Only update the attribution if it still has this version.
 
     Returns:
         Attribution: The updated attribution.
 
     Raises:
         UpdateError: If the attribution cannot be updated or is not found.
+        PreconditionFailedError: If a version was given and the attribution no longer has it.
         DatabaseError: If there is an issue communicating with the database.
     """
     if not attribution_data:
@@ -130,7 +258,11 @@ async def update_attribution(
         raise MissingRequiredValueError("No ID provided for attribution update")
 
     try:
-        attribution: Attribution | None = await db.attribution.update(where=id_obj, data=attribution_data)  
+        attribution: Attribution | None = await db_call(
+            repositories.attribution.update, id_obj, attribution_data, version
+        )
+        if attribution is None and version is not None:
+            raise PreconditionFailedError("Attribution has changed or was deleted since it was read")
         if attribution is None:
             raise UpdateError("Attribution update failed or attribution not found")
     except PrismaError as err:
@@ -1,15 +1,19 @@
 """Authentication module for the API."""
 from datetime import datetime, timedelta
-from typing import Annotated
+from functools import cache
+from typing import TYPE_CHECKING, Annotated
 
 from dotenv import load_dotenv
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from ..exceptions import InvalidTokenError, UsernameNotFoundError
 
+# jose and passlib are slow to import and only needed to sign in or check a token,
+# so they are imported on first use; see startup.py
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
 # Load the .env file
 load_dotenv()
 
@@ -20,7 +24,14 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/user/sign-in")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@cache
+def password_context() -> "CryptContext":
+    """The bcrypt password hashing context, created on first use."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class Token(BaseModel):
@@ -48,6 +59,8 @@ def create_access_token(
     Returns:
         str: Encoded JWT token.
     """
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
@@ -66,6 +79,8 @@ async def validate_token(token: str) -> bool:
     Raises:
         InvalidTokenError: If the token is invalid.
     """
+    from jose import JWTError, jwt
+
     try:
         jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return True
@@ -85,6 +100,8 @@ async def extract_username_from_token(token: str) -> str:
     Raises:
         UsernameNotFoundError: If the username is not present in the token payload.
     """
+    from jose import jwt
+
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     username: str = payload.get("sub")
     if not username:
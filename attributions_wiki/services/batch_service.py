@@ -0,0 +1,389 @@
+"""Batch service: many API operations in one request.
+
+A batch is a list of operations on the belief, attribution and factor
+services, e.g. ``{"id": "b", "op": "belief.create", "args": {"data": {...}}}``.
+Arguments may refer to the result of an earlier operation with
+``{"$ref": "<id>.<path>"}``, e.g. ``{"$ref": "b.id"}`` for the id of the belief
+created above, which is how one batch creates a belief, its factors and the
+links between them.
+
+Operations run in order, except that consecutive reads run concurrently unless
+one refers to another. Each one gets its own result: a status like the one the
+matching route would answer with, and the body or the error. An operation
+referring to one that failed is not run and fails with ``424``.
+
+An ``atomic`` batch runs every operation in one transaction
+(``Repositories.transaction``), reads included so they see the batch's own
+writes. The first failure rolls the whole batch back: the operations before it
+answer ``424`` with no body, as do the ones after it, which never run.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+import pydantic
+from prisma.errors import MissingRequiredValueError, PrismaError
+from prisma.types import (
+    AttributionCreateInput,
+    AttributionUpdateInput,
+    BeliefCreateInput,
+    BeliefUpdateInput,
+    FactorCreateInput,
+    FactorUpdateInput,
+)
+from pydantic import BaseModel, Field, TypeAdapter
+
+from .. import config
+from ..etags import entity_etag, matched_version
+from ..exceptions import (
+    DatabaseError,
+    DeletionError,
+    NotFoundError,
+    PreconditionFailedError,
+    UpdateError,
+    ValidationError,
+)
+from ..fieldsets import parse_fields
+from ..metrics import instrument
+from ..repositories import repositories
+from ..repositories.base import row_version
+from . import attribution_service, belief_service, factor_service
+
+REFERENCE = "$ref"
+# Exceptions of the services and the status their routes answer them with
+STATUSES: tuple[tuple[type[Exception], int], ...] = (
+    (ValidationError, 400),
+    (MissingRequiredValueError, 400),
+    (NotFoundError, 404),
+    (UpdateError, 404),
+    (DeletionError, 404),
+    (PreconditionFailedError, 412),
+    (DatabaseError, 500),
+)
+FAILED_DEPENDENCY = 424
+
+
+class BatchOperation(BaseModel):
+    """One operation of a batch."""
+
+    id: str | None = Field(None, description="Name later operations refer to the result by")
+    op: str = Field(description='What to do, one of OPERATIONS, e.g. "belief.create"')
+    args: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    """The body of ``POST /api/v1/batch``."""
+
+    operations: list[BatchOperation]
+    atomic: bool = Field(False, description="Run every operation in one transaction")
+
+
+class BatchResult(BaseModel):
+    """The outcome of one operation."""
+
+    id: str | None = None
+    op: str
+    status: int
+    body: Any = None
+    etag: str | None = None
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class Operation:
+    """A kind of batch operation: a service call and the arguments it takes."""
+
+    run: Callable[[dict[str, Any]], Awaitable[Any]]
+    args: frozenset[str]
+    required: frozenset[str] = frozenset()
+    write: bool = False
+
+
+def _int(args: dict[str, Any], name: str) -> int | None:
+    value = args.get(name)
+    if value is not None and (type(value) is not int or value < 0):
+        raise ValidationError(f"{name} must be a non-negative integer")
+    return value
+
+
+def _id(args: dict[str, Any]) -> dict[str, int]:
+    id = _int(args, "id")
+    if id is None:
+        raise ValidationError("id must be given")
+    return {"id": id}
+
+
+def _data(adapter: TypeAdapter[Any], args: dict[str, Any]) -> Any:
+    try:
+        return adapter.validate_python(args["data"])
+    except pydantic.ValidationError as err:
+        raise ValidationError(str(err)) from err
+
+
+def _entity_operations(
+    name: str, model: str, service: Any, create: Any, update: Any, plural: str
+) -> dict[str, Operation]:
+    """The get, get_all, create, update and delete operations of one model."""
+    create_adapter: TypeAdapter[Any] = TypeAdapter(create)
+    update_adapter: TypeAdapter[Any] = TypeAdapter(update)
+
+    def version(args: dict[str, Any]) -> str | None:
+        return matched_version(args.get("if_match"), model, _id(args)["id"])
+
+    async def get_all(args: dict[str, Any]) -> Any:
+        take, skip = _int(args, "take"), _int(args, "skip")
+        fields = parse_fields(model, args.get("fields"))
+        if fields is not None:
+            partial = getattr(service, f"get_partial_{plural}")
+            return await partial(fields, take=take, skip=skip)
+        return await getattr(service, f"get_{plural}")(take=take, skip=skip)
+
+    async def get(args: dict[str, Any]) -> Any:
+        fields = parse_fields(model, args.get("fields"))
+        if fields is not None:
+            return await getattr(service, f"get_partial_{name}_by_id")(_id(args), fields)
+        return await getattr(service, f"get_{name}_by_id")(_id(args))
+
+    async def create_one(args: dict[str, Any]) -> Any:
+        return await getattr(service, f"create_{name}")(_data(create_adapter, args))
+
+    async def update_one(args: dict[str, Any]) -> Any:
+        data = _data(update_adapter, args)
+        return await getattr(service, f"update_{name}")(_id(args), data, version(args))
+
+    async def delete_one(args: dict[str, Any]) -> Any:
+        return await getattr(service, f"delete_{name}_by_id")(_id(args), version(args))
+
+    by_id = frozenset({"id"})
+    return {
+        f"{name}.get_all": Operation(get_all, frozenset({"take", "skip", "fields"})),
+        f"{name}.get": Operation(get, frozenset({"id", "fields"}), by_id),
+        f"{name}.create": Operation(create_one, frozenset({"data"}), frozenset({"data"}), True),
+        f"{name}.update": Operation(
+            update_one, frozenset({"id", "data", "if_match"}), frozenset({"id", "data"}), True
+        ),
+        f"{name}.delete": Operation(delete_one, frozenset({"id", "if_match"}), by_id, True),
+    }
+
+
+async def _attributions_of_belief(args: dict[str, Any]) -> Any:
+    return await belief_service.get_attributions_for_belief(_id(args))
+
+
+async def _beliefs_of_attribution(args: dict[str, Any]) -> Any:
+    return await attribution_service.get_beliefs_for_attribution(_id(args))
+
+
+OPERATIONS: dict[str, Operation] = {
+    **_entity_operations(
+        "belief", "Belief", belief_service, BeliefCreateInput, BeliefUpdateInput, "beliefs"
+    ),
+    **_entity_operations(
+        "attribution",
+        "Attribution",
+        attribution_service,
+        AttributionCreateInput,
+        AttributionUpdateInput,
+        "attributions",
+    ),
+    **_entity_operations(
+        "factor", "Factor", factor_service, FactorCreateInput, FactorUpdateInput, "factors"
+    ),
+    "belief.attributions": Operation(
+        _attributions_of_belief, frozenset({"id"}), frozenset({"id"})
+    ),
+    "attribution.beliefs": Operation(
+        _beliefs_of_attribution, frozenset({"id"}), frozenset({"id"})
+    ),
+}
+
+
+def references(value: Any) -> Iterator[str]:
+    """The ids of the operations an argument value refers to."""
+    if isinstance(value, dict):
+        if set(value) == {REFERENCE} and isinstance(value[REFERENCE], str):
+            yield value[REFERENCE].split(".")[0]
+            return
+        for item in value.values():
+            yield from references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from references(item)
+
+
+def _lookup(result: Any, path: list[str], reference: str) -> Any:
+    for step in path:
+        if isinstance(result, dict) and step in result:
+            result = result[step]
+        elif isinstance(result, list) and step.isdigit() and int(step) < len(result):
+            result = result[int(step)]
+        elif isinstance(result, BaseModel) and step in type(result).model_fields:
+            result = getattr(result, step)
+        else:
+            raise ValidationError(f"{reference!r} does not name a value of that result")
+    return result
+
+
+def resolve(value: Any, outputs: dict[str, Any]) -> Any:
+    """Replace the references in an argument value with what they refer to."""
+    if isinstance(value, dict):
+        if set(value) == {REFERENCE} and isinstance(value[REFERENCE], str):
+            id, *path = value[REFERENCE].split(".")
+            return _lookup(outputs[id], path, value[REFERENCE])
+        return {key: resolve(item, outputs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, outputs) for item in value]
+    return value
+
+
+def check(operations: list[BatchOperation]) -> None:
+    """Check a batch before running any of it.
+
+    Raises:
+        ValidationError: If the batch is too long, uses an unknown operation or
+            argument, misses a required one, reuses an id or refers to an
+            operation that does not come earlier in the batch.
+    """
+    if len(operations) > config.BATCH_MAX_OPERATIONS:
+        raise ValidationError(f"A batch holds at most {config.BATCH_MAX_OPERATIONS} operations")
+    seen: set[str] = set()
+    for index, operation in enumerate(operations):
+        kind = OPERATIONS.get(operation.op)
+        if kind is None:
+            raise ValidationError(f"Operation {index}: unknown operation {operation.op!r}")
+        unknown = set(operation.args) - kind.args
+        missing = kind.required - set(operation.args)
+        if unknown or missing:
+            raise ValidationError(
+                f"Operation {index}: {operation.op} takes {', '.join(sorted(kind.args))}"
+                f" and needs {', '.join(sorted(kind.required)) or 'none of them'}"
+            )
+        for id in references(operation.args):
+            if id not in seen:
+                raise ValidationError(
+                    f"Operation {index}: {id!r} is not the id of an earlier operation"
+                )
+        if operation.id is not None:
+            if operation.id in seen:
+                raise ValidationError(f"Operation {index}: id {operation.id!r} is used twice")
+            seen.add(operation.id)
+
+
+def stages(operations: list[BatchOperation]) -> list[list[int]]:
+    """Group the operations into stages run one after the other.
+
+    A write is a stage of its own. Consecutive reads share one, unless a read
+    refers to another read of the stage.
+
+    Returns:
+        list[list[int]]: The indexes of the operations of each stage.
+    """
+    grouped: list[list[int]] = []
+    current: list[int] = []
+    current_ids: set[str] = set()
+    for index, operation in enumerate(operations):
+        write = OPERATIONS[operation.op].write
+        if write or current_ids.intersection(references(operation.args)):
+            if current:
+                grouped.append(current)
+            current, current_ids = [], set()
+        if write:
+            grouped.append([index])
+            continue
+        current.append(index)
+        if operation.id is not None:
+            current_ids.add(operation.id)
+    if current:
+        grouped.append(current)
+    return grouped
+
+
+def _failure(operation: BatchOperation, status: int, error: str) -> BatchResult:
+    return BatchResult(id=operation.id, op=operation.op, status=status, error=error)
+
+
+def _etag(body: Any) -> str | None:
+    if isinstance(body, BaseModel) and hasattr(body, "updated_at"):
+        return entity_etag(body.id, row_version(body))  # type: ignore[attr-defined]
+    return None
+
+
+async def _run(
+    operation: BatchOperation, outputs: dict[str, Any], failed: set[str]
+) -> BatchResult:
+    """Run one operation, recording its output under its id."""
+    broken = sorted(failed.intersection(references(operation.args)))
+    if broken:
+        return _failure(
+            operation, FAILED_DEPENDENCY, f"Refers to failed operation {', '.join(broken)}"
+        )
+    try:
+        body = await OPERATIONS[operation.op].run(resolve(operation.args, outputs))
+    except Exception as err:
+        if operation.id is not None:
+            failed.add(operation.id)
+        status = next((code for error, code in STATUSES if isinstance(err, error)), None)
+        if status is None:
+            raise
+        return _failure(operation, status, str(err))
+    if operation.id is not None:
+        outputs[operation.id] = body
+    return BatchResult(id=operation.id, op=operation.op, status=200, body=body, etag=_etag(body))
+
+
+class _BatchFailedError(Exception):
+    """Raised inside the transaction of an atomic batch to roll it back."""
+
+
+async def _run_atomic(operations: list[BatchOperation]) -> list[BatchResult]:
+    outputs: dict[str, Any] = {}
+    results: list[BatchResult] = []
+    try:
+        async with repositories.transaction():
+            for operation in operations:
+                results.append(await _run(operation, outputs, set()))
+                if results[-1].status >= 400:
+                    raise _BatchFailedError
+    except _BatchFailedError:
+        failed = len(results) - 1
+        reason = f"Rolled back, operation {failed} failed"
+        return [
+            *(_failure(operation, FAILED_DEPENDENCY, reason) for operation in operations[:failed]),
+            results[failed],
+            *(
+                _failure(operation, FAILED_DEPENDENCY, f"Not run, operation {failed} failed")
+                for operation in operations[failed + 1 :]
+            ),
+        ]
+    except PrismaError as err:
+        raise DatabaseError("Issue committing the batch") from err
+    return results
+
+
+@instrument
+async def run_batch(operations: list[BatchOperation], atomic: bool = False) -> list[BatchResult]:
+    """Run a batch of operations.
+
+    Args:
+        operations: list[BatchOperation] - The operations, in order.
+        atomic: bool - Run them all in one transaction, rolled back if any fails.
+
+    Returns:
+        list[BatchResult]: One result per operation, in the same order.
+
+    Raises:
+        ValidationError: If the batch is malformed, see ``check``.
+        DatabaseError: If an atomic batch could not be committed.
+    """
+    check(operations)
+    if atomic:
+        return await _run_atomic(operations)
+    outputs: dict[str, Any] = {}
+    failed: set[str] = set()
+    results: list[BatchResult | None] = [None] * len(operations)
+    for stage in stages(operations):
+        done = await asyncio.gather(*(_run(operations[i], outputs, failed) for i in stage))
+        for index, result in zip(stage, done, strict=True):
+            results[index] = result
+    return results  # type: ignore[return-value]
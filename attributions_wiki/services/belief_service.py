@@ -1,20 +1,24 @@
 """Belief service."""
-from typing import List
+from typing import Any, List
 
-from prisma.errors import MissingRequiredValueError, PrismaError, RecordNotFoundError
-from prisma.models import Belief
+from prisma.errors import MissingRequiredValueError, PrismaError
+from prisma.models import Attribution, Belief
 from prisma.types import BeliefCreateInput, BeliefUpdateInput, BeliefWhereUniqueInput
 
-from ..db import db
 from ..exceptions import (
     DatabaseError,
     DeletionError,
     NotFoundError,
+    PreconditionFailedError,
     UpdateError,
     ValidationError,
 )
+from ..metrics import instrument
+from ..repositories import repositories
+from .db_call import db_call
 
 
+@instrument
 async def create_belief(belief_data: BeliefCreateInput) -> Belief:
     """Create a new belief.
 
@@ -29,7 +33,7 @@ async def create_belief(belief_data: BeliefCreateInput) -> Belief:
         DatabaseError: If there is a more general database issue during belief creation.
     """
     try:
-        new_belief: Belief = await db.belief.create(belief_data)
+        new_belief: Belief = await db_call(repositories.belief.create, belief_data)
     except MissingRequiredValueError as err:
         raise ValidationError("Missing required value") from err
     except PrismaError as err:
@@ -38,23 +42,29 @@ async def create_belief(belief_data: BeliefCreateInput) -> Belief:
         return new_belief
 
 
-async def get_beliefs() -> List[Belief]:
-    """Get all beliefs.
+@instrument
+async def get_beliefs(take: int | None = None, skip: int | None = None) -> List[Belief]:
+    """Get all beliefs, optionally one page at a time.
+
+    Args:
+        take: int | None - The maximum number of beliefs to return.
+        skip: int | None - The number of beliefs to skip before returning results.
 
     Returns:
-        List[Belief]: A list of all beliefs.
+        List[Belief]: A list of beliefs ordered by id.
 
     Raises:
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        beliefs: List[Belief] = await db.belief.find_many()
+        beliefs: List[Belief] = await db_call(repositories.belief.find_many, take=take, skip=skip)
     except PrismaError as err:
         raise DatabaseError("Issue retrieving all beliefs") from err
     else:
         return beliefs
 
 
+@instrument
 async def get_belief_by_id(id_obj: BeliefWhereUniqueInput) -> Belief:
     """Get a belief by its unique ID.
 
@@ -69,31 +79,146 @@ async def get_belief_by_id(id_obj: BeliefWhereUniqueInput) -> Belief:
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        belief: Belief = await db.belief.find_unique_or_raise(id_obj)  # type: ignore
-    except RecordNotFoundError as err:
-        raise NotFoundError(f"Belief with ID: {id_obj} not found") from err
+        belief: Belief | None = await db_call(repositories.belief.find_unique, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving belief by ID") from err
+    if belief is None:
+        raise NotFoundError(f"Belief with ID: {id_obj} not found")
+    return belief
+
+
+@instrument
+async def get_partial_beliefs(
+    fields: tuple[str, ...], take: int | None = None, skip: int | None = None
+) -> List[dict[str, Any]]:
+    """Get some fields of all beliefs, optionally one page at a time.
+
+    Args:
+        fields: tuple[str, ...] - The Belief fields to read, see ``fieldsets.parse_fields``.
+        take: int | None - The maximum number of beliefs to return.
+        skip: int | None - The number of beliefs to skip before returning results.
+
+    Returns:
+        List[dict[str, Any]]: The fields of each belief, ordered by id.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(
+            repositories.belief.find_many_partial, fields, take=take, skip=skip
+        )
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving all beliefs") from err
+
+
+@instrument
+async def get_partial_belief_by_id(
+    id_obj: BeliefWhereUniqueInput, fields: tuple[str, ...]
+) -> dict[str, Any]:
+    """Get some fields of a belief by its unique ID.
+
+    Args:
+        id_obj: BeliefWhereUniqueInput - The unique identifier for the belief.
+        fields: tuple[str, ...] - The Belief fields to read, see ``fieldsets.parse_fields``.
+
+    Returns:
+        dict[str, Any]: The fields of the requested belief.
+
+    Raises:
+        NotFoundError: If no belief with the given ID is found.
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        belief: dict[str, Any] | None = await db_call(
+            repositories.belief.find_unique_partial, id_obj, fields
+        )
     except PrismaError as err:
         raise DatabaseError("Issue retrieving belief by ID") from err
+    if belief is None:
+        raise NotFoundError(f"Belief with ID: {id_obj} not found")
+    return belief
+
+
+@instrument
+async def get_belief_version(id_obj: BeliefWhereUniqueInput) -> str | None:
+    """Get the version of a belief without loading it, for conditional requests.
+
+    Args:
+        id_obj: BeliefWhereUniqueInput - The unique identifier for the belief.
+
+    Returns:
+        str | None: The belief's version, or None if it does not exist.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(repositories.belief.version, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving belief version") from err
+
+
+@instrument
+async def get_beliefs_version() -> str:
+    """Get a version of all beliefs that changes whenever any of them does.
+
+    Returns:
+        str: The row count and latest update of the beliefs.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(repositories.belief.collection_version)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving beliefs version") from err
+
+
+@instrument
+async def get_attributions_for_belief(id_obj: BeliefWhereUniqueInput) -> List[Attribution]:
+    """Get every attribution linked to a belief.
+
+    Args:
+        id_obj: BeliefWhereUniqueInput - The unique identifier for the belief.
+
+    Returns:
+        List[Attribution]: The linked attributions ordered by id.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        attributions: List[Attribution] = await db_call(repositories.belief.attributions_of, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving attributions for belief") from err
     else:
-        return belief
+        return attributions
 
 
-async def delete_belief_by_id(id_obj: BeliefWhereUniqueInput) -> Belief | None:
+@instrument
+async def delete_belief_by_id(
+    id_obj: BeliefWhereUniqueInput, version: str | None = None
+) -> Belief | None:
     """Delete a belief by its unique ID.
 
     Args:
         id_obj: BeliefWhereUniqueInput - The unique identifier for the belief.
+        version: str | None - Only delete the belief if it still has this version.
 
     Returns:
         Belief | None: The deleted belief, or None if it wasn't found.
 
     Raises:
         DeletionError: If the belief is not found and Deletion Fails
+        PreconditionFailedError: If a version was given and the belief no longer has it.
         ValidationError: If the belief deletion fails due to missing required values.
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        belief: Belief | None = await db.belief.delete(id_obj)  # type: ignore
+        belief: Belief | None = await db_call(repositories.belief.delete, id_obj, version)
+        if belief is None and version is not None:
+            raise PreconditionFailedError("Belief has changed or was deleted since it was read")
         if belief is None:
             raise DeletionError("Belief Not Found - Deletion Failed")
     except MissingRequiredValueError as err:
@@ -104,20 +229,23 @@ async def delete_belief_by_id(id_obj: BeliefWhereUniqueInput) -> Belief | None:
         return belief
 
 
+@instrument
 async def update_belief(
-    id_obj: BeliefWhereUniqueInput, belief_data: BeliefUpdateInput
+    id_obj: BeliefWhereUniqueInput, belief_data: BeliefUpdateInput, version: str | None = None
 ) -> Belief:
     """Update a belief by its unique ID.
 
     Args:
         id_obj: BeliefWhereUniqueInput - The unique identifier for the belief.
         belief_data: BeliefUpdateInput - The data to update the belief with.
+        version: str | None - Only update the belief if it still has this version.
 
     Returns:
         Belief: The updated belief.
 
     Raises:
         UpdateError: If the belief cannot be updated or is not found.
+        PreconditionFailedError: If a version was given and the belief no longer has it.
         DatabaseError: If there is an issue communicating with the database.
     """
     if not belief_data:
@@ -126,7 +254,11 @@ async def update_belief(
         raise MissingRequiredValueError("No ID provided for belief update")
 
     try:
-        belief: Belief | None = await db.belief.update(where=id_obj, data=belief_data)  
+        belief: Belief | None = await db_call(
+            repositories.belief.update, id_obj, belief_data, version
+        )
+        if belief is None and version is not None:
+            raise PreconditionFailedError("Belief has changed or was deleted since it was read")
         if belief is None:
             raise UpdateError("Belief update failed or belief not found")
     except PrismaError as err:
@@ -0,0 +1,74 @@
+"""Single entry point for every database call made by the service layer."""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, ParamSpec, TypeVar
+
+from ..deadline import current_deadline
+from ..exceptions import DeadlineExceededError
+from ..metrics import db_query_duration
+from ..tracing import argument_shape, log_if_slow, row_count, span
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def operation_name(action: Callable[..., Any]) -> str:
+    """Name a database call for metrics, e.g. ``Belief.find_many`` or ``fetch_beliefs``."""
+    model = getattr(getattr(action, "__self__", None), "_model", None)
+    if model is not None:
+        return f"{model.__name__}.{action.__name__}"
+    return getattr(action, "__name__", type(action).__name__)
+
+
+async def _run(action: Callable[P, Awaitable[T]], *args: P.args, **kwargs: P.kwargs) -> T:
+    deadline = current_deadline()
+    if deadline is None:
+        return await action(*args, **kwargs)
+
+    timeout = asyncio.timeout_at(deadline)
+    try:
+        async with timeout:
+            return await action(*args, **kwargs)
+    except TimeoutError as err:
+        if timeout.expired():
+            raise DeadlineExceededError(
+                f"Request deadline exceeded during {operation_name(action)}"
+            ) from err
+        raise
+
+
+async def db_call(action: Callable[P, Awaitable[T]], *args: P.args, **kwargs: P.kwargs) -> T:
+    """Run a database call under the current request deadline, timed and traced.
+
+    Args:
+        action: The query to run, e.g. ``db.belief.find_many``.
+        *args: Positional arguments for the query.
+        **kwargs: Keyword arguments for the query.
+
+    Returns:
+        The query result.
+
+    Raises:
+        DeadlineExceededError: If the request deadline passes before the query returns.
+    """
+    operation = operation_name(action)
+    model = getattr(getattr(action, "__self__", None), "_model", None)
+    started = time.perf_counter()
+    with span(
+        "db",
+        operation=operation,
+        model=model.__name__ if model is not None else None,
+        args=argument_shape({"args": list(args), **kwargs}),
+    ) as db_span:
+        try:
+            result = await _run(action, *args, **kwargs)
+        except Exception as err:
+            db_span.attributes["error"] = type(err).__name__
+            raise
+        else:
+            db_span.attributes["rows"] = row_count(result)
+            return result
+        finally:
+            db_query_duration.observe(time.perf_counter() - started, operation)
+            log_if_slow(db_span)
@@ -1,20 +1,24 @@
 """Factor Service."""
-from typing import List
+from typing import Any, List
 
-from prisma.errors import MissingRequiredValueError, PrismaError, RecordNotFoundError
+from prisma.errors import MissingRequiredValueError, PrismaError
 from prisma.models import Factor
 from prisma.types import FactorCreateInput, FactorUpdateInput, FactorWhereUniqueInput
 
-from ..db import db
 from ..exceptions import (
     DatabaseError,
     DeletionError,
     NotFoundError,
+    PreconditionFailedError,
     UpdateError,
     ValidationError,
 )
+from ..metrics import instrument
+from ..repositories import repositories
+from .db_call import db_call
 
 
+@instrument
 async def create_factor(factor_data: FactorCreateInput) -> Factor:
     """Create a new factor.
 
@@ -29,7 +33,7 @@ async def create_factor(factor_data: FactorCreateInput) -> Factor:
         DatabaseError: If there is a more general database issue during factor creation.
     """
     try:
-        new_factor: Factor = await db.factor.create(factor_data)
+        new_factor: Factor = await db_call(repositories.factor.create, factor_data)
     except MissingRequiredValueError as err:
         raise ValidationError("Missing required value") from err
     except PrismaError as err:
@@ -38,23 +42,29 @@ async def create_factor(factor_data: FactorCreateInput) -> Factor:
         return new_factor
 
 
-async def get_factors() -> List[Factor]:
-    """Get all factors.
+@instrument
+async def get_factors(take: int | None = None, skip: int | None = None) -> List[Factor]:
+    """Get all factors, optionally one page at a time.
+
+    Args:
+        take: int | None - The maximum number of factors to return.
+        skip: int | None - The number of factors to skip before returning results.
 
     Returns:
-        List[Factor]: A list of all factors.
+        List[Factor]: A list of factors ordered by id.
 
     Raises:
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        factors: List[Factor] = await db.factor.find_many()
+        factors: List[Factor] = await db_call(repositories.factor.find_many, take=take, skip=skip)
     except PrismaError as err:
         raise DatabaseError("Issue retrieving all factors") from err
     else:
         return factors
 
 
+@instrument
 async def get_factor_by_id(id_obj: FactorWhereUniqueInput) -> Factor:
     """Get a factor by its unique ID.
 
@@ -69,31 +79,125 @@ async def get_factor_by_id(id_obj: FactorWhereUniqueInput) -> Factor:
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        factor: Factor = await db.factor.find_unique_or_raise(id_obj)  # type: ignore
-    except RecordNotFoundError as err:
-        raise NotFoundError(f"Factor with ID: {id_obj} not found") from err
+        factor: Factor | None = await db_call(repositories.factor.find_unique, id_obj)
     except PrismaError as err:
         raise DatabaseError("Issue retrieving factor by ID") from err
-    else:
-        return factor
+    if factor is None:
+        raise NotFoundError(f"Factor with ID: {id_obj} not found")
+    return factor
+
+
+@instrument
+async def get_partial_factors(
+    fields: tuple[str, ...], take: int | None = None, skip: int | None = None
+) -> List[dict[str, Any]]:
+    """Get some fields of all factors, optionally one page at a time.
+
+    Args:
+        fields: tuple[str, ...] - The Factor fields to read, see ``fieldsets.parse_fields``.
+        take: int | None - The maximum number of factors to return.
+        skip: int | None - The number of factors to skip before returning results.
+
+    Returns:
+        List[dict[str, Any]]: The fields of each factor, ordered by id.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(
+            repositories.factor.find_many_partial, fields, take=take, skip=skip
+        )
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving all factors") from err
+
+
+@instrument
+async def get_partial_factor_by_id(
+    id_obj: FactorWhereUniqueInput, fields: tuple[str, ...]
+) -> dict[str, Any]:
+    """Get some fields of a factor by its unique ID.
+
+    Args:
+        id_obj: FactorWhereUniqueInput - The unique identifier for the factor.
+        fields: tuple[str, ...] - The Factor fields to read, see ``fieldsets.parse_fields``.
+
+    Returns:
+        dict[str, Any]: The fields of the requested factor.
+
+    Raises:
+        NotFoundError: If no factor with the given ID is found.
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        factor: dict[str, Any] | None = await db_call(
+            repositories.factor.find_unique_partial, id_obj, fields
+        )
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving factor by ID") from err
+    if factor is None:
+        raise NotFoundError(f"Factor with ID: {id_obj} not found")
+    return factor
+
+
+@instrument
+async def get_factor_version(id_obj: FactorWhereUniqueInput) -> str | None:
+    """Get the version of a factor without loading it, for conditional requests.
+
+    Args:
+        id_obj: FactorWhereUniqueInput - The unique identifier for the factor.
+
+    Returns:
+        str | None: The factor's version, or None if it does not exist.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(repositories.factor.version, id_obj)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving factor version") from err
+
+
+@instrument
+async def get_factors_version() -> str:
+    """Get a version of all factors that changes whenever any of them does.
+
+    Returns:
+        str: The row count and latest update of the factors.
+
+    Raises:
+        DatabaseError: If there is an issue communicating with the database.
+    """
+    try:
+        return await db_call(repositories.factor.collection_version)
+    except PrismaError as err:
+        raise DatabaseError("Issue retrieving factors version") from err
 
 
-async def delete_factor_by_id(id_obj: FactorWhereUniqueInput) -> Factor | None:
+@instrument
+async def delete_factor_by_id(
+    id_obj: FactorWhereUniqueInput, version: str | None = None
+) -> Factor | None:
     """Delete a factor by its unique ID.
 
     Args:
         id_obj: FactorWhereUniqueInput - The unique identifier for the factor.
+        version: str | None - Only delete the factor if it still has this version.
 
     Returns:
         Factor | None: The deleted factor, or None if it wasn't found.
 
     Raises:
         DeletionError: If the factor is not found and Deletion Fails
+        PreconditionFailedError: If a version was given and the factor no longer has it.
         ValidationError: If the factor deletion fails due to missing required values.
         DatabaseError: If there is an issue communicating with the database.
     """
     try:
-        factor: Factor | None = await db.factor.delete(id_obj)  # type: ignore
+        factor: Factor | None = await db_call(repositories.factor.delete, id_obj, version)
+        if factor is None and version is not None:
+            raise PreconditionFailedError("Factor has changed or was deleted since it was read")
         if factor is None:
             raise DeletionError("Factor Not Found - Deletion Failed")
     except MissingRequiredValueError as err:
@@ -104,20 +208,23 @@ async def delete_factor_by_id(id_obj: FactorWhereUniqueInput) -> Factor | None:
         return factor
 
 
+@instrument
 async def update_factor(
-    id_obj: FactorWhereUniqueInput, factor_data: FactorUpdateInput
+    id_obj: FactorWhereUniqueInput, factor_data: FactorUpdateInput, version: str | None = None
 ) -> Factor:
     """Update a factor by its unique ID.
 
     Args:
         id_obj: FactorWhereUniqueInput - The unique identifier for the factor.
         factor_data: FactorUpdateInput - The data to update the factor with.
+        version: str | None - Only update the factor if it still has this version.
 
     Returns:
         Factor: The updated factor.
 
     Raises:
         UpdateError: If the factor cannot be updated or is not found.
+        PreconditionFailedError: If a version was given and the factor no longer has it.
         DatabaseError: If there is an issue communicating with the database.
     """
     if not factor_data:
@@ -126,7 +233,11 @@ async def update_factor(
         raise MissingRequiredValueError("No ID provided for factor update")
 
     try:
-        factor: Factor | None = await db.factor.update(where=id_obj, data=factor_data)  
+        factor: Factor | None = await db_call(
+            repositories.factor.update, id_obj, factor_data, version
+        )
+        if factor is None and version is not None:
+            raise PreconditionFailedError("Factor has changed or was deleted since it was read")
         if factor is None:
             raise UpdateError("Factor update failed or factor not found")
     except PrismaError as err:
@@ -0,0 +1,282 @@
+"""Hot read queries executed directly on the asyncpg read pool.
+
+These mirror the Prisma reads in the service modules but skip the query engine
+round trip. asyncpg prepares every statement on first use and keeps it in a
+per-connection cache, so the queries below are parsed and planned once per
+connection and then executed as prepared statements.
+"""
+from datetime import UTC, datetime
+from functools import cache
+from typing import Any, TypeVar
+
+from prisma.models import Attribution, Belief, Factor
+
+from ..exceptions import DatabaseError
+
+try:
+    from asyncpg import InterfaceError, PostgresError  # type: ignore
+
+    _POOL_ERRORS: tuple[type[Exception], ...] = (PostgresError, InterfaceError, OSError)
+except ImportError:  # pragma: no cover - optional dependency
+    _POOL_ERRORS = (OSError,)
+
+ModelT = TypeVar("ModelT", Attribution, Belief, Factor)
+
+_BELIEF_COLUMNS = 'b."id", b."created_at", b."updated_at", b."description"'
+_ATTRIBUTION_COLUMNS = (
+    'a."id", a."created_at", a."updated_at", a."locus", a."stability", '
+    'a."controllability", a."reason"'
+)
+_FACTOR_COLUMNS = (
+    'f."id", f."created_at", f."updated_at", f."description", '
+    'f."attributionId", f."beliefId"'
+)
+
+BELIEF_BY_ID = f'SELECT {_BELIEF_COLUMNS} FROM "Belief" b WHERE b."id" = $1'
+BELIEF_PAGE = (
+    f'SELECT {_BELIEF_COLUMNS} FROM "Belief" b WHERE b."id" > $3 '
+    'ORDER BY b."id" LIMIT $1 OFFSET $2'
+)
+ATTRIBUTION_BY_ID = f'SELECT {_ATTRIBUTION_COLUMNS} FROM "Attribution" a WHERE a."id" = $1'
+ATTRIBUTION_PAGE = (
+    f'SELECT {_ATTRIBUTION_COLUMNS} FROM "Attribution" a WHERE a."id" > $3 '
+    'ORDER BY a."id" LIMIT $1 OFFSET $2'
+)
+FACTOR_BY_ID = f'SELECT {_FACTOR_COLUMNS} FROM "Factor" f WHERE f."id" = $1'
+FACTOR_PAGE = (
+    f'SELECT {_FACTOR_COLUMNS} FROM "Factor" f WHERE f."id" > $3 '
+    'ORDER BY f."id" LIMIT $1 OFFSET $2'
+)
+
+# "_BeliefAttribution" is Prisma's implicit join table: "A" is the Attribution, "B" the Belief
+ATTRIBUTIONS_FOR_BELIEF = (
+    f'SELECT {_ATTRIBUTION_COLUMNS} FROM "Attribution" a '
+    'JOIN "_BeliefAttribution" ba ON ba."A" = a."id" '
+    'WHERE ba."B" = $1 ORDER BY a."id"'
+)
+BELIEFS_FOR_ATTRIBUTION = (
+    f'SELECT {_BELIEF_COLUMNS} FROM "Belief" b '
+    'JOIN "_BeliefAttribution" ba ON ba."B" = b."id" '
+    'WHERE ba."A" = $1 ORDER BY b."id"'
+)
+
+LINKS = 'SELECT ba."B", ba."A" FROM "_BeliefAttribution" ba'
+
+
+def _row_version(table: str, columns: tuple[str, ...] = ()) -> str:
+    selected = ", ".join(f'"{column}"' for column in ("updated_at", *columns))
+    return f'SELECT {selected} FROM "{table}" WHERE "id" = $1'
+
+
+def _table_version(table: str, columns: tuple[str, ...] = ()) -> str:
+    counts = "".join(f', count("{column}") AS "{column}"' for column in columns)
+    return f'SELECT count(*) AS "count", max("updated_at") AS "updated_at"{counts} FROM "{table}"'
+
+
+# Version queries for conditional requests, see repositories.base; the factor
+# columns match VERSION_COLUMNS there
+_FACTOR_KEYS = ("beliefId", "attributionId")
+ROW_VERSION = {
+    "Belief": _row_version("Belief"),
+    "Attribution": _row_version("Attribution"),
+    "Factor": _row_version("Factor", _FACTOR_KEYS),
+}
+TABLE_VERSION = {
+    "Belief": _table_version("Belief"),
+    "Attribution": _table_version("Attribution"),
+    "Factor": _table_version("Factor", _FACTOR_KEYS),
+}
+
+
+def _selected(table: str, fields: tuple[str, ...]) -> str:
+    # Imported here: the repositories package builds the Prisma repositories,
+    # which use this module, as soon as it is imported
+    from ..repositories.base import FIELDS
+
+    # Field names end up in the statement, so only known columns get through
+    unknown = set(fields) - set(FIELDS[table])
+    if unknown or not fields:
+        raise ValueError(f"Not {table} fields: {sorted(unknown) or 'none given'}")
+    return ", ".join(f'"{field}"' for field in fields)
+
+
+@cache
+def partial_by_id(table: str, fields: tuple[str, ...]) -> str:
+    """The statement reading some columns of one row by id."""
+    return f'SELECT {_selected(table, fields)} FROM "{table}" WHERE "id" = $1'
+
+
+@cache
+def partial_page(table: str, fields: tuple[str, ...]) -> str:
+    """The statement reading some columns of a page of rows, like the ``*_PAGE`` ones."""
+    return (
+        f'SELECT {_selected(table, fields)} FROM "{table}" WHERE "id" > $3 '
+        'ORDER BY "id" LIMIT $1 OFFSET $2'
+    )
+
+
+_BY_ID_STATEMENTS = (BELIEF_BY_ID, ATTRIBUTION_BY_ID, FACTOR_BY_ID, *ROW_VERSION.values())
+_PAGE_STATEMENTS = (BELIEF_PAGE, ATTRIBUTION_PAGE, FACTOR_PAGE)
+_JOIN_STATEMENTS = (ATTRIBUTIONS_FOR_BELIEF, BELIEFS_FOR_ATTRIBUTION)
+
+
+async def prepare_hot_statements(conn: Any) -> None:
+    """Prepare every hot statement on a freshly opened pool connection.
+
+    Used as the asyncpg pool ``init`` hook. Each statement is run once with
+    arguments that match no rows, which puts it in the connection's statement
+    cache so the first real request does not pay for parsing and planning.
+
+    Args:
+        conn: The new asyncpg connection.
+    """
+    for statement in (*_BY_ID_STATEMENTS, *_JOIN_STATEMENTS):
+        await conn.fetch(statement, 0)
+    for statement in _PAGE_STATEMENTS:
+        await conn.fetch(statement, 0, 0, 0)
+
+
+def _to_dict(row: Any) -> dict[str, Any]:
+    """Convert an asyncpg record to a dict.
+
+    Prisma stores ``TIMESTAMP(3)`` columns in UTC without a time zone and returns
+    them as aware datetimes, so naive values are tagged as UTC to match.
+    """
+    fields = dict(row)
+    for key, value in fields.items():
+        if isinstance(value, datetime) and value.tzinfo is None:
+            fields[key] = value.replace(tzinfo=UTC)
+    return fields
+
+
+def _to_model(model: type[ModelT], row: Any) -> ModelT:
+    """Convert an asyncpg record to the matching Prisma model."""
+    return model(**_to_dict(row))
+
+
+async def _fetch_one(pool: Any, model: type[ModelT], statement: str, *args: Any) -> ModelT | None:
+    try:
+        row = await pool.fetchrow(statement, *args)
+    except _POOL_ERRORS as err:
+        raise DatabaseError(f"Read pool query for {model.__name__} failed") from err
+    return None if row is None else _to_model(model, row)
+
+
+async def _fetch_all(pool: Any, model: type[ModelT], statement: str, *args: Any) -> list[ModelT]:
+    try:
+        rows = await pool.fetch(statement, *args)
+    except _POOL_ERRORS as err:
+        raise DatabaseError(f"Read pool query for {model.__name__} failed") from err
+    return [_to_model(model, row) for row in rows]
+
+
+async def fetch_belief_by_id(pool: Any, id: int) -> Belief | None:
+    """Fetch a single belief, or None if it does not exist."""
+    return await _fetch_one(pool, Belief, BELIEF_BY_ID, id)
+
+
+async def fetch_beliefs(
+    pool: Any, take: int | None = None, skip: int | None = None, after: int | None = None
+) -> list[Belief]:
+    """Fetch a page of beliefs ordered by id; ``take=None`` returns every row.
+
+    ``after`` starts the page past that id; unlike ``skip`` it costs the same
+    however deep the page is.
+    """
+    return await _fetch_all(pool, Belief, BELIEF_PAGE, take, skip or 0, after or 0)
+
+
+async def fetch_attribution_by_id(pool: Any, id: int) -> Attribution | None:
+    """Fetch a single attribution, or None if it does not exist."""
+    return await _fetch_one(pool, Attribution, ATTRIBUTION_BY_ID, id)
+
+
+async def fetch_attributions(
+    pool: Any, take: int | None = None, skip: int | None = None, after: int | None = None
+) -> list[Attribution]:
+    """Fetch a page of attributions ordered by id; ``take=None`` returns every row.
+
+    ``after`` starts the page past that id; unlike ``skip`` it costs the same
+    however deep the page is.
+    """
+    return await _fetch_all(pool, Attribution, ATTRIBUTION_PAGE, take, skip or 0, after or 0)
+
+
+async def fetch_factor_by_id(pool: Any, id: int) -> Factor | None:
+    """Fetch a single factor, or None if it does not exist."""
+    return await _fetch_one(pool, Factor, FACTOR_BY_ID, id)
+
+
+async def fetch_factors(
+    pool: Any, take: int | None = None, skip: int | None = None, after: int | None = None
+) -> list[Factor]:
+    """Fetch a page of factors ordered by id; ``take=None`` returns every row.
+
+    ``after`` starts the page past that id; unlike ``skip`` it costs the same
+    however deep the page is.
+    """
+    return await _fetch_all(pool, Factor, FACTOR_PAGE, take, skip or 0, after or 0)
+
+
+async def fetch_attributions_for_belief(pool: Any, belief_id: int) -> list[Attribution]:
+    """Fetch every attribution linked to a belief."""
+    return await _fetch_all(pool, Attribution, ATTRIBUTIONS_FOR_BELIEF, belief_id)
+
+
+async def fetch_beliefs_for_attribution(pool: Any, attribution_id: int) -> list[Belief]:
+    """Fetch every belief linked to an attribution."""
+    return await _fetch_all(pool, Belief, BELIEFS_FOR_ATTRIBUTION, attribution_id)
+
+
+async def fetch_partial_by_id(
+    pool: Any, table: str, fields: tuple[str, ...], id: int
+) -> dict[str, Any] | None:
+    """Fetch some columns of one row, or None if it does not exist."""
+    try:
+        row = await pool.fetchrow(partial_by_id(table, fields), id)
+    except _POOL_ERRORS as err:
+        raise DatabaseError(f"Read pool query for {table} failed") from err
+    return None if row is None else _to_dict(row)
+
+
+async def fetch_partial_page(
+    pool: Any,
+    table: str,
+    fields: tuple[str, ...],
+    take: int | None = None,
+    skip: int | None = None,
+    after: int | None = None,
+) -> list[dict[str, Any]]:
+    """Fetch some columns of a page of rows ordered by id; ``take=None`` returns every row."""
+    try:
+        rows = await pool.fetch(partial_page(table, fields), take, skip or 0, after or 0)
+    except _POOL_ERRORS as err:
+        raise DatabaseError(f"Read pool query for {table} failed") from err
+    return [_to_dict(row) for row in rows]
+
+
+async def fetch_links(pool: Any) -> list[tuple[int, int]]:
+    """Fetch every (belief id, attribution id) link."""
+    try:
+        rows = await pool.fetch(LINKS)
+    except _POOL_ERRORS as err:
+        raise DatabaseError("Read pool query for links failed") from err
+    return [(row[0], row[1]) for row in rows]
+
+
+async def fetch_row_version(pool: Any, table: str, id: int) -> tuple[Any, ...] | None:
+    """Fetch the version columns of one row, or None if it does not exist."""
+    try:
+        row = await pool.fetchrow(ROW_VERSION[table], id)
+    except _POOL_ERRORS as err:
+        raise DatabaseError(f"Read pool query for {table} version failed") from err
+    return None if row is None else tuple(row)
+
+
+async def fetch_table_version(pool: Any, table: str) -> tuple[Any, ...]:
+    """Fetch the row count, largest updated_at and foreign key counts of a table."""
+    try:
+        row = await pool.fetchrow(TABLE_VERSION[table])
+    except _POOL_ERRORS as err:
+        raise DatabaseError(f"Read pool query for {table} version failed") from err
+    return tuple(row)
@@ -0,0 +1,71 @@
+"""Conditional writes for ``If-Match`` preconditions, one statement each.
+
+The precondition is part of the write's own ``WHERE`` clause, so checking it
+takes no extra read and no other write can slip in between the check and the
+change. A row that no longer has the version the client read is simply not
+matched, and the statement returns nothing.
+"""
+from collections.abc import Mapping
+from typing import Any
+
+from ..repositories.base import VERSION_COLUMNS
+
+# Scalar columns an update may set, with the type their parameter is cast to
+COLUMNS: dict[str, dict[str, str]] = {
+    "Belief": {"description": "text"},
+    "Attribution": {
+        "locus": '"Locus"',
+        "stability": '"Stability"',
+        "controllability": '"Controllability"',
+        "reason": "text",
+    },
+    "Factor": {"description": "text", "beliefId": "int", "attributionId": "int"},
+}
+
+
+def scalar_values(table: str, data: Mapping[str, Any]) -> dict[str, Any] | None:
+    """The columns and values ``data`` sets, or None if it does more than set scalars."""
+    values = {}
+    for key, value in data.items():
+        if key not in COLUMNS[table]:
+            return None
+        if isinstance(value, Mapping):
+            if set(value) != {"set"}:
+                return None
+            value = value["set"]
+        values[key] = value
+    return values
+
+
+def _matches_version(table: str, first: int) -> str:
+    """The ``WHERE`` clause matching a row by id and version, from parameter ``first`` on."""
+    clauses = [
+        f'"id" = ${first}',
+        f"\"updated_at\" = ${first + 1}::timestamptz AT TIME ZONE 'UTC'",
+    ]
+    for offset, column in enumerate(VERSION_COLUMNS.get(table, ()), start=first + 2):
+        clauses.append(f'"{column}" IS NOT DISTINCT FROM ${offset}::int')
+    return " AND ".join(clauses)
+
+
+def conditional_update(table: str, columns: list[str]) -> str:
+    """``UPDATE`` the columns of the row with the given id and version, returning it.
+
+    The new values come first as ``$1..$n``, then the id and the version values.
+    """
+    types = COLUMNS[table]
+    assignments = [
+        f'"{column}" = ${position}::{types[column]}'
+        for position, column in enumerate(columns, start=1)
+    ]
+    # Prisma sets @updatedAt itself; raw statements have to do it in UTC like it does
+    assignments.append("\"updated_at\" = CURRENT_TIMESTAMP(3) AT TIME ZONE 'UTC'")
+    return (
+        f'UPDATE "{table}" SET {", ".join(assignments)} '
+        f"WHERE {_matches_version(table, len(columns) + 1)} RETURNING *"
+    )
+
+
+def conditional_delete(table: str) -> str:
+    """``DELETE`` the row with the given id and version, returning it."""
+    return f'DELETE FROM "{table}" WHERE {_matches_version(table, 1)} RETURNING *'
@@ -3,23 +3,26 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException
 
-from prisma.errors import MissingRequiredValueError, PrismaError, RecordNotFoundError
+from prisma.enums import Role
+from prisma.errors import MissingRequiredValueError, PrismaError
 from prisma.models import User
 from prisma.types import (
     UserCreateInput,
     UserWhereUniqueInput,
 )
 
-from ..db import db
 from ..exceptions import AuthenticationError, UserNotFoundError
+from ..metrics import instrument
+from ..repositories import repositories
 from .auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
     extract_username_from_token,
     oauth2_scheme,
-    pwd_context,
+    password_context,
     validate_token,
 )
+from .db_call import db_call
 
 
 # TODO: type this
@@ -34,7 +37,7 @@ def _verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: True if password matches, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def _get_password_hash(password: str) -> str:
@@ -46,18 +49,16 @@ def _get_password_hash(password: str) -> str:
     Returns:
         str: Hashed password.
     """
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 
 # TODO: move to user_service
 async def _get_user_by_username(username: str) -> User | None:
     user_obj: UserWhereUniqueInput = {"email": username}
-    try:
-        user: User | None = await db.user.find_unique_or_raise(user_obj)
-    except RecordNotFoundError as err:
-        raise UserNotFoundError("User not found") from err
-    else:
-        return user
+    user: User | None = await db_call(repositories.user.find_unique, user_obj)
+    if user is None:
+        raise UserNotFoundError("User not found")
+    return user
 
 
 # TODO: move to user_service
@@ -77,6 +78,7 @@ async def _authenticate_user(username: str, password: str) -> User | None:
     return user
 
 
+@instrument
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
     """Retrieve the current user based on the verified token.
 
@@ -97,6 +99,7 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
     return user
 
 
+@instrument
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
 ) -> User:
@@ -116,6 +119,27 @@ async def get_current_active_user(
     return current_user
 
 
+@instrument
+async def get_current_admin_user(
+    current_user: Annotated[User, Depends(get_current_active_user)]
+) -> User:
+    """Get the current active user, provided they are an admin.
+
+    Args:
+        current_user: User object from dependency.
+
+    Returns:
+        User: The current admin user.
+
+    Raises:
+        HTTPException: If the user is not an admin.
+    """
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
+@instrument
 async def authenticate_user_and_create_token(
     username: str, password: str
 ) -> dict[str, str]:
@@ -142,6 +166,7 @@ async def authenticate_user_and_create_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@instrument
 async def create_user(user_data: UserCreateInput) -> User:
     """Create a new user in the system.
 
@@ -156,7 +181,7 @@ async def create_user(user_data: UserCreateInput) -> User:
     """
     user_data["password"] = _get_password_hash(user_data["password"])
     try:
-        new_user: User = await db.user.create(user_data)
+        new_user: User = await db_call(repositories.user.create, user_data)
         return new_user
     # TODO: More specific error handling
     except MissingRequiredValueError as err:
@@ -0,0 +1,90 @@
+"""Cold-start timing: imports, lifespan phases and the first request.
+
+Every worker records how long importing the app took, how long each phase of
+the lifespan took (database connections, snapshot load, warmup, ...), when it
+became ready and how long its first request took. They are logged once the
+worker is ready, and admins can read them at ``GET /debug/startup``.
+
+This module is imported by the package ``__init__``, before anything else, so
+its import time is the start of the clock. It only uses the standard library.
+
+Modules in ``DEFERRED_IMPORTS`` must not be imported with the app; they are
+loaded on first use, or before the workers fork (see ``server.py``).
+``python -m benchmarks.cold_start`` times a cold start from the outside.
+"""
+import logging
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+started = time.perf_counter()
+
+# Slow to import and only needed by some requests: sign-in and tokens, and the HTMX views
+DEFERRED_IMPORTS = ("jose", "passlib", "jinja2")
+
+
+class StartupTimings:
+    """Seconds spent in each step of a worker's start."""
+
+    def __init__(self, started: float) -> None:
+        """Initialize StartupTimings.
+
+        Args:
+            started: ``time.perf_counter()`` when the worker started importing the app.
+        """
+        self.started = started
+        self.imported: float | None = None
+        self.phases: dict[str, float] = {}
+        self.ready: float | None = None
+        self.first_request: dict[str, Any] | None = None
+
+    def mark_imported(self) -> None:
+        """Record that the app has been imported."""
+        self.imported = time.perf_counter() - self.started
+
+    def forked(self) -> None:
+        """Restart the clock in a worker forked from a master that imported the app."""
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time one phase of the lifespan."""
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - phase_started
+
+    def mark_ready(self) -> None:
+        """Record that the worker is ready and log how long it took to get there."""
+        self.ready = time.perf_counter() - self.started
+        phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        log.info(
+            "Ready %.3fs after start (import %.3fs; %s)", self.ready, self.imported or 0, phases
+        )
+
+    def request_finished(self, route: str, seconds: float) -> None:
+        """Record the first request the worker served."""
+        if self.first_request is None:
+            self.first_request = {
+                "route": route,
+                "seconds": seconds,
+                "since_start_seconds": time.perf_counter() - self.started,
+            }
+
+    def report(self) -> dict[str, Any]:
+        """The timings recorded so far, in seconds."""
+        return {
+            "import_seconds": self.imported,
+            "phases": self.phases,
+            "ready_seconds": self.ready,
+            "first_request": self.first_request,
+            "deferred_imports_loaded": [name for name in DEFERRED_IMPORTS if name in sys.modules],
+        }
+
+
+timings = StartupTimings(started)
@@ -0,0 +1,179 @@
+"""The Jinja templates of the HTMX views, with compile and render caching.
+
+Compiled templates are kept on disk in ``TEMPLATE_CACHE_DIR`` through Jinja's
+bytecode cache, so a fresh worker loads them instead of compiling them again.
+
+Jinja itself is only imported, and the environment only created, when the
+first template is needed (``get_templates``), so workers that never render a
+page do not pay for it; see startup.py.
+
+Belief cards are rendered once per version of a belief: ``belief_card`` is a
+template global that looks the card up by ``(belief.id, belief.updated_at)``
+and only calls the ``belief_card.html`` macro on a miss. Every card field is
+written in the same update that bumps ``updated_at``, so a cached card is never
+stale; cards of old versions simply fall out of the LRU.
+"""
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from markupsafe import Markup
+
+from . import config
+from .assets import asset_url
+from .memory import track_size
+from .metrics import Counter, Histogram, registry
+
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
+    from jinja2 import FileSystemBytecodeCache
+
+RENDER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+
+render_duration = registry.register(
+    Histogram(
+        "template_render_duration_seconds",
+        "Time spent rendering a template response, by template.",
+        ("template",),
+        buckets=RENDER_BUCKETS,
+    )
+)
+fragment_lookups = registry.register(
+    Counter(
+        "template_fragment_cache_total",
+        "Fragment cache lookups by fragment and result (hit or miss).",
+        ("fragment", "result"),
+    )
+)
+
+
+class FragmentCache:
+    """Rendered HTML fragments by key, evicting the least recently used."""
+
+    def __init__(self, max_entries: int) -> None:
+        """Initialize a FragmentCache.
+
+        Args:
+            max_entries: Fragments kept before the least recently used is dropped;
+                0 disables the cache.
+        """
+        self.max_entries = max_entries
+        self.entries: OrderedDict[Any, Markup] = OrderedDict()
+
+    def get(self, key: Any) -> Markup | None:
+        """The fragment stored under ``key``, or None."""
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+        return html
+
+    def put(self, key: Any, html: Markup) -> None:
+        """Store a fragment, dropping the oldest one when full."""
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        """The number of fragments held."""
+        return len(self.entries)
+
+
+def _bytecode_cache() -> "FileSystemBytecodeCache | None":
+    from jinja2 import FileSystemBytecodeCache
+
+    if not config.TEMPLATE_CACHE_DIR:
+        return None
+    directory = Path(config.TEMPLATE_CACHE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(directory))
+
+
+@cache
+def get_templates() -> "Jinja2Templates":
+    """The templates of the views, loaded on first use."""
+    from fastapi.templating import Jinja2Templates
+
+    templates = Jinja2Templates(directory="static/templates")
+    templates.env.bytecode_cache = _bytecode_cache()
+    templates.env.globals["belief_card"] = belief_card
+    templates.env.globals["asset_url"] = asset_url
+    return templates
+
+
+def _compiled_templates() -> int:
+    if not get_templates.cache_info().currsize:
+        return 0
+    return len(get_templates().env.cache or {})
+
+
+track_size("jinja_templates", _compiled_templates)
+
+fragments = FragmentCache(config.FRAGMENT_CACHE_SIZE)
+track_size("template_fragments", lambda: len(fragments))
+
+
+def belief_card(belief: Any) -> Markup:
+    """The ``belief_card.html`` macro for one belief, rendered once per version."""
+    key = ("belief_card", belief.id, belief.updated_at)
+    html = fragments.get(key)
+    if html is not None:
+        fragment_lookups.inc("belief_card", "hit")
+        return html
+    fragment_lookups.inc("belief_card", "miss")
+    module: Any = get_templates().get_template("belief_card.html").module
+    html = Markup(module.belief_card(belief))
+    fragments.put(key, html)
+    return html
+
+
+def render(
+    request: Request, name: str, context: dict[str, Any], status_code: int = 200
+) -> Response:
+    """Render a template response, recording how long rendering took.
+
+    Args:
+        request: The request being answered.
+        name: The template file, e.g. ``"belief_list.html"``.
+        context: The template variables, besides ``request``.
+        status_code: The response status.
+
+    Returns:
+        Response: The rendered HTML response.
+    """
+    started = time.perf_counter()
+    html = get_templates().get_template(name).render({"request": request, **context})
+    render_duration.observe(time.perf_counter() - started, name)
+    return HTMLResponse(html, status_code=status_code)
+
+
+async def stream(name: str, contexts: AsyncIterable[dict[str, Any]]) -> AsyncIterator[str]:
+    """Render a template once per context as the contexts arrive, for a streamed response.
+
+    The render time recorded is the time spent generating HTML, summed over the
+    contexts, not the time spent waiting for them.
+
+    Args:
+        name: The template file, e.g. ``"belief_list.html"``.
+        contexts: The template variables of each part of the response.
+
+    Yields:
+        str: The HTML of each part.
+    """
+    template = get_templates().get_template(name)
+    rendering = 0.0
+    try:
+        async for context in contexts:
+            started = time.perf_counter()
+            html = "".join(template.generate(context))
+            rendering += time.perf_counter() - started
+            yield html
+    finally:
+        render_duration.observe(rendering, name)
@@ -0,0 +1,272 @@
+"""Request ids, per-request span trees and the slow query log.
+
+TracingMiddleware opens a root span for every request and tags it with a request
+id (taken from the ``X-Request-ID`` header or generated, and echoed back).
+``db_call`` opens a child span per database call recording the operation, the
+model, the shape of the arguments (keys and types, never values) and the row
+count. Calls slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with the request
+id.
+
+Prisma turns rows into models inside the query call, so a database span covers
+engine time plus hydration. The root span also records when the response
+started, so the gap between the last database span and ``response_start_ms`` is
+the time spent building and serializing the response.
+
+When ``TRACE_EXPORT`` is ``file`` the finished trees are appended as JSON lines
+to ``TRACE_EXPORT_PATH``; with ``collector`` they are POSTed in batches to
+``TRACE_COLLECTOR_URL``. Export happens off the request path in a background
+task and traces are dropped rather than queued without bound.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from typing import Any
+
+from . import config
+from .memory import track_size
+
+log = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+class Span:
+    """A timed operation with attributes and child spans."""
+
+    __slots__ = ("attributes", "children", "end", "name", "start")
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        """Initialize a Span and start its clock."""
+        self.name = name
+        self.attributes = attributes
+        self.children: list[Span] = []
+        self.start = time.perf_counter()
+        self.end: float | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        """Milliseconds from start to end, or to now while the span is open."""
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self, origin: float | None = None) -> dict[str, Any]:
+        """Serialize the span tree with start offsets relative to the root."""
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+def current_request_id() -> str | None:
+    """The id of the request being served, if any."""
+    return _request_id.get()
+
+
+def current_span() -> Span | None:
+    """The innermost open span, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Open a span as a child of the current one for the duration of the block."""
+    parent = _current_span.get()
+    new = Span(name, attributes)
+    if parent is not None:
+        parent.children.append(new)
+    token = _current_span.set(new)
+    try:
+        yield new
+    finally:
+        new.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def argument_shape(value: Any, depth: int = 0) -> Any:
+    """Describe a query argument by its keys and types, leaving out the values."""
+    if isinstance(value, dict):
+        if depth >= 2:
+            return "dict"
+        return {str(key): argument_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return f"list[{len(value)}]"
+    if value is None:
+        return None
+    return type(value).__name__
+
+
+def row_count(result: Any) -> int:
+    """Rows returned or affected by a query result."""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 1
+
+
+def log_if_slow(db_span: Span) -> None:
+    """Log a finished database span if it took longer than the threshold."""
+    duration = db_span.duration_ms
+    if duration >= config.SLOW_QUERY_THRESHOLD_MS:
+        attributes = db_span.attributes
+        log.warning(
+            "Slow query %s took %.1fms rows=%s args=%s request_id=%s",
+            attributes.get("operation"),
+            duration,
+            attributes.get("rows"),
+            json.dumps(attributes.get("args")),
+            current_request_id(),
+        )
+
+
+class TraceExporter:
+    """Ship finished span trees to a file or collector from a background task."""
+
+    def __init__(self, kind: str, path: str, url: str, max_queue: int = 1000) -> None:
+        """Initialize a TraceExporter.
+
+        Args:
+            kind: "file", "collector", or anything else to disable exporting.
+            path: The JSON lines file used by the "file" exporter.
+            url: The endpoint the "collector" exporter POSTs batches to.
+            max_queue: Traces kept waiting for export before new ones are dropped.
+        """
+        self.kind = kind if kind in {"file", "collector"} else ""
+        self.path = path
+        self.url = url
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: asyncio.Queue[dict[str, Any]] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def queued(self) -> int:
+        """Traces waiting to be exported."""
+        return 0 if self._queue is None else self._queue.qsize()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether traces are being exported."""
+        return self._queue is not None
+
+    def export(self, trace: dict[str, Any]) -> None:
+        """Queue a trace without blocking; dropped if the queue is full."""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _append(self, lines: list[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    async def _write(self, batch: list[dict[str, Any]]) -> None:
+        if self.kind == "file":
+            lines = [json.dumps(trace, default=str) + "\n" for trace in batch]
+            await asyncio.to_thread(self._append, lines)
+        else:
+            import httpx
+
+            async with httpx.AsyncClient(timeout=5) as client:
+                await client.post(self.url, content=json.dumps(batch, default=str))
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < 100:
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._write(batch)
+            except Exception:
+                log.warning("Dropping %d traces, export failed", len(batch), exc_info=True)
+
+    def start(self) -> None:
+        """Start exporting if an exporter is configured."""
+        if self.kind and self._task is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush what is queued and stop exporting."""
+        if self._task is None or self._queue is None:
+            return
+        task, queue = self._task, self._queue
+        self._task, self._queue = None, None
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        remaining = [queue.get_nowait() for _ in range(queue.qsize())]
+        if remaining:
+            with suppress(Exception):
+                await self._write(remaining)
+
+
+trace_exporter = TraceExporter(
+    config.TRACE_EXPORT, config.TRACE_EXPORT_PATH, config.TRACE_COLLECTOR_URL
+)
+track_size("trace_export_queue", trace_exporter.queued)
+
+
+class TracingMiddleware:
+    """Give every request an id and a root span, and export the finished tree."""
+
+    def __init__(self, app: Any, exporter: TraceExporter = trace_exporter) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            exporter: Where finished span trees are sent.
+        """
+        self.app = app
+        self.exporter = exporter
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        """Serve the request inside its root span."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == REQUEST_ID_HEADER),
+            None,
+        ) or uuid.uuid4().hex
+        root = Span(
+            "request", {"method": scope["method"], "path": scope["path"], "request_id": request_id}
+        )
+
+        async def send_with_request_id(message: Any) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["status"] = message["status"]
+                root.attributes["response_start_ms"] = round(root.duration_ms, 3)
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        id_token = _request_id.set(request_id)
+        span_token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            root.end = time.perf_counter()
+            route = scope.get("route")
+            root.attributes["route"] = getattr(route, "path", None)
+            _current_span.reset(span_token)
+            _request_id.reset(id_token)
+            if self.exporter.enabled:
+                self.exporter.export(root.to_dict())
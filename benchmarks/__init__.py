@@ -0,0 +1 @@
+"""Performance tooling: HTTP benchmarks and data generation."""
@@ -0,0 +1,148 @@
+"""Cold start of the app: import time per package, lifespan phases and first requests.
+
+Starts the app in a fresh interpreter under ``python -X importtime``, sends it
+one request for every ``--path`` and prints the time spent importing each
+top-level package, the lifespan phases recorded by ``attributions_wiki.startup``,
+when the app became ready and how long each first request took.
+
+Usage::
+
+    python -m benchmarks.cold_start --backend memory --path / --path /api/v1/belief/get_all
+
+Exits with status 1 when a module of ``DEFERRED_IMPORTS`` was imported with the app.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+from attributions_wiki.startup import DEFERRED_IMPORTS
+
+_MARKER = "--- attributions_wiki.app imported ---"
+
+
+@dataclass
+class ImportTime:
+    """One line of ``python -X importtime``, in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_import_times(stderr: str) -> list[ImportTime]:
+    """Parse the ``-X importtime`` lines of an interpreter's stderr."""
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        times.append(ImportTime(module.strip(), int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def by_package(times: list[ImportTime]) -> dict[str, float]:
+    """Seconds spent importing each top-level package, slowest first."""
+    totals: dict[str, int] = {}
+    for entry in times:
+        package = entry.module.split(".")[0]
+        totals[package] = totals.get(package, 0) + entry.self_us
+    return {
+        package: us / 1e6 for package, us in sorted(totals.items(), key=lambda item: -item[1])
+    }
+
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from attributions_wiki.app import app
+imported = time.perf_counter() - started
+deferred = [name for name in {deferred!r} if name in sys.modules]
+sys.stderr.write({marker!r} + "\\n")
+from starlette.testclient import TestClient
+from attributions_wiki.startup import timings
+first = {{}}
+with TestClient(app) as client:
+    ready = time.perf_counter() - started
+    for path in {paths!r}:
+        request_started = time.perf_counter()
+        status = client.get(path).status_code
+        first[path] = {{"status": status, "seconds": time.perf_counter() - request_started}}
+print(json.dumps({{
+    "import_seconds": imported,
+    "deferred_imports_loaded": deferred,
+    "phases": timings.phases,
+    "ready_seconds": ready,
+    "first_requests": first,
+}}))
+"""
+
+
+def measure(paths: list[str], env: dict[str, str] | None = None) -> dict[str, Any]:
+    """Start the app in a fresh interpreter and time its cold start.
+
+    Args:
+        paths: Paths requested once each after the app is ready, in order.
+        env: Environment variables set for the interpreter on top of ours.
+
+    Returns:
+        dict[str, Any]: ``import_seconds``, ``deferred_imports_loaded``,
+        ``phases``, ``ready_seconds``, ``first_requests`` by path and the import
+        time of every module (``imports``, in microseconds).
+
+    Raises:
+        RuntimeError: If the app failed to start.
+    """
+    probe = _PROBE.format(deferred=DEFERRED_IMPORTS, marker=_MARKER, paths=list(paths))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"The app failed to start:\n{result.stderr[-4000:]}")
+    imports = parse_import_times(result.stderr.split(_MARKER)[0])
+    return {**json.loads(result.stdout.splitlines()[-1]), "imports": imports}
+
+
+def format_report(report: dict[str, Any], top: int = 15) -> str:
+    """Render a cold start report as plain text."""
+    lines = [f"import        {report['import_seconds']:.3f}s"]
+    for package, seconds in list(by_package(report["imports"]).items())[:top]:
+        lines.append(f"  {package:<30}{seconds:.3f}s")
+    lines.extend(f"{name:<14}{seconds:.3f}s" for name, seconds in report["phases"].items())
+    lines.append(f"ready         {report['ready_seconds']:.3f}s")
+    lines.extend(
+        f"first GET {path} -> {request['status']} in {request['seconds']:.3f}s"
+        for path, request in report["first_requests"].items()
+    )
+    if report["deferred_imports_loaded"]:
+        loaded = ", ".join(report["deferred_imports_loaded"])
+        lines.append(f"imported with the app but meant to be deferred: {loaded}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Time a cold start from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--path", action="append", dest="paths", help="Default: / and /healthz")
+    parser.add_argument("--backend", choices=("prisma", "memory"), default=None)
+    parser.add_argument("--top", type=int, default=15, help="Packages listed by import time")
+    args = parser.parse_args(argv)
+
+    env = {"REPOSITORY_BACKEND": args.backend} if args.backend else {}
+    report = measure(args.paths or ["/", "/healthz"], env)
+    sys.stdout.write(format_report(report, args.top))
+    return 1 if report["deferred_imports_loaded"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
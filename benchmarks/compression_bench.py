@@ -0,0 +1,150 @@
+"""CPU cost against bytes saved of each response compression codec and level.
+
+Compresses two of our own payloads, a ``get_all`` JSON page of attributions
+and a rendered belief list, with every installed codec (gzip, plus brotli and
+zstd with their extras) at a range of levels, and reports the compressed size,
+the ratio and the CPU time per response. ``streamed`` is the size when the body
+is flushed after each of ``--chunks`` parts, as ``CompressionMiddleware`` does
+for streamed responses; every flush costs a little ratio.
+
+Usage::
+
+    python -m benchmarks.compression_bench --rows 100 --output compression.json
+
+Pick the ``COMPRESSION_*`` levels from the knee of the curve: past it every
+byte saved costs several times more CPU.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any
+
+from attributions_wiki.compression import CODECS
+from attributions_wiki.templating import get_templates
+from benchmarks.seed import COLUMNS, Plan, attributions, beliefs
+
+LEVELS = {
+    "gzip": (1, 3, 6, 9),
+    "br": (0, 2, 4, 6, 9, 11),
+    "zstd": (1, 3, 6, 9, 19),
+}
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(type(value).__name__)
+
+
+def payloads(rows: int, seed: int = 0) -> dict[str, bytes]:
+    """The response bodies to compress, ``rows`` entities each.
+
+    Args:
+        rows: Entities per payload.
+        seed: Seed of the generated data.
+
+    Returns:
+        dict[str, bytes]: Bodies by name.
+    """
+    plan = Plan(beliefs=rows, attributions=rows, factors=0, seed=seed)
+    columns = COLUMNS["Attribution"]
+    page = [dict(zip(columns, row, strict=True)) for row in attributions(plan)]
+    cards = [
+        SimpleNamespace(id=id, created_at=created, updated_at=updated, description=description)
+        for id, created, updated, description in beliefs(plan)
+    ]
+    html = get_templates().get_template("belief_list.html").render(beliefs=cards, next_after=rows)
+    return {
+        "attribution.get_all.json": json.dumps(page, default=_json_default).encode(),
+        "belief_list.html": html.encode(),
+    }
+
+
+def compress(codec: str, level: int, body: bytes, chunks: int = 1) -> bytes:
+    """Compress ``body`` in ``chunks`` parts, flushing after each but the last."""
+    compressor = CODECS[codec](level)
+    size = -(-len(body) // chunks) or 1
+    parts = [body[start : start + size] for start in range(0, len(body), size)] or [b""]
+    output = b"".join(compressor.compress(part) + compressor.flush() for part in parts[:-1])
+    return output + compressor.compress(parts[-1]) + compressor.finish()
+
+
+def measure(
+    codec: str, level: int, body: bytes, repeats: int = 20, chunks: int = 4
+) -> dict[str, Any]:
+    """Compress ``body`` ``repeats`` times and report the size and CPU time.
+
+    Returns:
+        dict[str, Any]: Sizes in bytes, the ratio, the CPU time per response in
+        milliseconds and the throughput in MB/s of uncompressed input.
+    """
+    started = time.process_time()
+    for _ in range(repeats):
+        compressed = compress(codec, level, body)
+    cpu = (time.process_time() - started) / repeats
+    return {
+        "codec": codec,
+        "level": level,
+        "original": len(body),
+        "compressed": len(compressed),
+        "streamed": len(compress(codec, level, body, chunks)),
+        "ratio": round(len(body) / max(len(compressed), 1), 2),
+        "cpu_ms": round(cpu * 1000, 3),
+        "mb_per_s": round(len(body) / cpu / 1e6, 1) if cpu > 0 else None,
+    }
+
+
+def run(rows: int, repeats: int, chunks: int, codecs: list[str] | None = None) -> dict[str, Any]:
+    """Measure every level of every installed codec on every payload."""
+    results: dict[str, Any] = {}
+    for name, body in payloads(rows).items():
+        results[name] = [
+            measure(codec, level, body, repeats, chunks)
+            for codec in codecs or list(CODECS)
+            for level in LEVELS[codec]
+        ]
+    return results
+
+
+def format_table(results: dict[str, Any]) -> str:
+    """Render the results as one plain text table per payload."""
+    lines = []
+    for name, rows in results.items():
+        lines.append(f"{name} ({rows[0]['original']:,} bytes)")
+        lines.append(
+            f"  {'codec':<6}{'level':>6}{'bytes':>10}{'streamed':>10}{'ratio':>8}"
+            f"{'cpu ms':>9}{'MB/s':>8}"
+        )
+        lines.extend(
+            f"  {row['codec']:<6}{row['level']:>6}{row['compressed']:>10,}"
+            f"{row['streamed']:>10,}{row['ratio']:>8}{row['cpu_ms']:>9}"
+            f"{row['mb_per_s'] or '-':>8}"
+            for row in rows
+        )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the compression benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=100, help="Entities per payload")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=4, help="Flushed parts of a streamed body")
+    parser.add_argument("--codec", action="append", choices=sorted(CODECS), dest="codecs")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.repeats, args.chunks, args.codecs)
+    sys.stdout.write(format_table(results))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""End-to-end HTTP benchmarks with latency percentiles and baseline comparison.
+
+Every scenario issues one kind of request: create, get, get_all, update and
+delete for each entity, sign-in, the authenticated ``/user/me/`` and the HTMX
+views. Each scenario runs at every concurrency level with a fixed number of
+requests, and the report lists throughput, p50/p95/p99 latency and errors.
+
+By default the app is driven in-process through ``httpx.ASGITransport``, which
+measures the application without network overhead; ``--url`` benchmarks a
+running server instead. Either way the app talks to whatever database
+``DATABASE_URL`` points at, so use a local database you do not mind filling.
+``--backend memory`` runs the in-process app on the in-memory repositories,
+which leaves out database time altogether.
+
+Usage::
+
+    python -m benchmarks.http_bench --concurrency 1,10,50 --baseline baseline.json
+
+Results are written as JSON. With ``--baseline`` the run is compared with a
+saved result and the command exits with status 1 if any scenario's p95 latency
+or throughput got worse by more than ``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+API = "/api/v1"
+
+ENTITY_PAYLOADS: dict[str, Callable[[int], dict[str, Any]]] = {
+    "belief": lambda n: {"description": f"Benchmark belief {n}"},
+    "factor": lambda n: {"description": f"Benchmark factor {n}"},
+    "attribution": lambda n: {
+        "locus": random.choice(["INTERNAL", "EXTERNAL"]),
+        "stability": random.choice(["STABLE", "UNSTABLE"]),
+        "controllability": random.choice(["CONTROLLABLE", "UNCONTROLLABLE"]),
+        "reason": f"Benchmark attribution {n}",
+    },
+}
+
+
+@dataclass
+class Context:
+    """State shared by the scenarios: the client, a signed-in user and live ids."""
+
+    client: httpx.AsyncClient
+    email: str = ""
+    password: str = ""
+    token: str = ""
+    ids: dict[str, list[int]] = field(default_factory=dict)
+    # Ids created for the delete scenarios, consumed one per request
+    doomed: dict[str, list[int]] = field(default_factory=dict)
+    counter: int = 0
+
+    def next_number(self) -> int:
+        """A number unique within the run, for payloads."""
+        self.counter += 1
+        return self.counter
+
+
+Request = Callable[[Context], Awaitable[httpx.Response]]
+
+
+async def create(ctx: Context, entity: str) -> int:
+    """Create an entity through the API and return its id."""
+    payload = ENTITY_PAYLOADS[entity](ctx.next_number())
+    response = await ctx.client.post(f"{API}/{entity}/create", json=payload)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def _entity_scenarios(entity: str) -> dict[str, Request]:
+    base = f"{API}/{entity}"
+
+    async def create_one(ctx: Context) -> httpx.Response:
+        payload = ENTITY_PAYLOADS[entity](ctx.next_number())
+        return await ctx.client.post(f"{base}/create", json=payload)
+
+    async def get_one(ctx: Context) -> httpx.Response:
+        return await ctx.client.get(f"{base}/get/{random.choice(ctx.ids[entity])}")
+
+    async def get_all(ctx: Context) -> httpx.Response:
+        return await ctx.client.get(f"{base}/get_all", params={"take": 50})
+
+    async def update_one(ctx: Context) -> httpx.Response:
+        payload = ENTITY_PAYLOADS[entity](ctx.next_number())
+        return await ctx.client.put(f"{base}/update/{random.choice(ctx.ids[entity])}", json=payload)
+
+    async def delete_one(ctx: Context) -> httpx.Response:
+        return await ctx.client.delete(f"{base}/delete/{ctx.doomed[entity].pop()}")
+
+    return {
+        f"{entity}.create": create_one,
+        f"{entity}.get": get_one,
+        f"{entity}.get_all": get_all,
+        f"{entity}.update": update_one,
+        f"{entity}.delete": delete_one,
+    }
+
+
+async def sign_in(ctx: Context) -> httpx.Response:
+    """Exchange the benchmark user's password for a token."""
+    return await ctx.client.post(
+        f"{API}/user/sign-in", data={"username": ctx.email, "password": ctx.password}
+    )
+
+
+async def me(ctx: Context) -> httpx.Response:
+    """Fetch the signed-in user."""
+    return await ctx.client.get(
+        f"{API}/user/user/me/", headers={"Authorization": f"Bearer {ctx.token}"}
+    )
+
+
+async def home_view(ctx: Context) -> httpx.Response:
+    """Render the home page."""
+    return await ctx.client.get("/")
+
+
+async def belief_list_view(ctx: Context) -> httpx.Response:
+    """Render the HTMX belief list."""
+    return await ctx.client.get("/templates/belief/get_all")
+
+
+async def belief_card_view(ctx: Context) -> httpx.Response:
+    """Render one HTMX belief card."""
+    return await ctx.client.get(f"/templates/belief/get/{random.choice(ctx.ids['belief'])}")
+
+
+SCENARIOS: dict[str, Request] = {
+    **_entity_scenarios("belief"),
+    **_entity_scenarios("attribution"),
+    **_entity_scenarios("factor"),
+    "user.sign_in": sign_in,
+    "user.me": me,
+    "views.home": home_view,
+    "views.belief_list": belief_list_view,
+    "views.belief_card": belief_card_view,
+}
+
+
+async def setup(ctx: Context, seed_rows: int) -> None:
+    """Create the benchmark user and a few rows of every entity to read and update."""
+    ctx.email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    ctx.password = uuid.uuid4().hex
+    response = await ctx.client.post(
+        f"{API}/user/user/create", json={"email": ctx.email, "password": ctx.password}
+    )
+    response.raise_for_status()
+    response = await sign_in(ctx)
+    response.raise_for_status()
+    ctx.token = response.json()["access_token"]
+    for entity in ENTITY_PAYLOADS:
+        ctx.ids[entity] = [await create(ctx, entity) for _ in range(seed_rows)]
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values: The observations in ascending order.
+        fraction: The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The smallest value with at least ``fraction`` of the values at or below it.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, Any]:
+    """Throughput and latency percentiles, in milliseconds, of one run."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+async def run_scenario(
+    ctx: Context, name: str, concurrency: int, requests: int
+) -> dict[str, Any]:
+    """Issue ``requests`` requests of one scenario from ``concurrency`` workers.
+
+    Returns:
+        dict: The summary from ``summarize``.
+    """
+    entity = name.split(".")[0]
+    if name.endswith(".delete"):
+        ctx.doomed[entity] = [await create(ctx, entity) for _ in range(requests)]
+
+    request = SCENARIOS[name]
+    remaining = requests
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await request(ctx)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """List the scenarios that got slower than the baseline.
+
+    Args:
+        results: The current run.
+        baseline: A saved run.
+        tolerance: Allowed relative change, e.g. 0.1 for 10%.
+
+    Returns:
+        list: One message per regressed scenario and concurrency level.
+    """
+    regressions = []
+    for name, levels in results["scenarios"].items():
+        for level, current in levels.items():
+            before = baseline.get("scenarios", {}).get(name, {}).get(level)
+            if before is None:
+                continue
+            if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} @ {level}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms"
+                )
+            if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} @ {level}: throughput {before['throughput_rps']} -> "
+                    f"{current['throughput_rps']} rps"
+                )
+            if current["errors"] > before["errors"]:
+                regressions.append(
+                    f"{name} @ {level}: errors {before['errors']} -> {current['errors']}"
+                )
+    return regressions
+
+
+@asynccontextmanager
+async def open_client(url: str | None) -> AsyncIterator[httpx.AsyncClient]:
+    """A client for a running server, or for the app in-process with its lifespan."""
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            yield client
+        return
+
+    from attributions_wiki.app import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=30
+        ) as client:
+            yield client
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every selected scenario at every concurrency level."""
+    random.seed(args.seed)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    names = [name for name in SCENARIOS if not args.only or name.startswith(tuple(args.only))]
+    results: dict[str, Any] = {
+        "meta": {
+            "started_at": time.time(),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "backend": os.environ.get("REPOSITORY_BACKEND", "prisma"),
+            "requests": args.requests,
+            "concurrency": levels,
+        },
+        "scenarios": {},
+    }
+    async with open_client(args.url) as client:
+        ctx = Context(client)
+        await setup(ctx, args.seed_rows)
+        for name in names:
+            for level in levels:
+                summary = await run_scenario(ctx, name, level, args.requests)
+                results["scenarios"].setdefault(name, {})[str(level)] = summary
+                sys.stdout.write(
+                    f"{name:<22} c={level:<4} {summary['throughput_rps']:>9.1f} rps  "
+                    f"p50 {summary['p50_ms']:>8.2f}ms  p95 {summary['p95_ms']:>8.2f}ms  "
+                    f"p99 {summary['p99_ms']:>8.2f}ms  errors {summary['errors']}\n"
+                )
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="Benchmark a running server instead of the app in-process")
+    parser.add_argument(
+        "--backend",
+        choices=("prisma", "memory"),
+        help="Repository backend of the in-process app, defaults to REPOSITORY_BACKEND",
+    )
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+    parser.add_argument("--seed-rows", type=int, default=50, help="Rows of each entity to read")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for ids and payloads")
+    parser.add_argument("--only", action="append", help="Scenario name prefix, repeatable")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write results")
+    parser.add_argument("--baseline", help="A saved result to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative change")
+    args = parser.parse_args(argv)
+    if args.backend:
+        # Read by the app's config when open_client imports it
+        os.environ["REPOSITORY_BACKEND"] = args.backend
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            sys.stderr.write(f"REGRESSION {regression}\n")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
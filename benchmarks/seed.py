@@ -0,0 +1,299 @@
+"""Deterministic synthetic data and a fast Postgres seeder.
+
+The generator produces Beliefs, Attributions, Factors and ``_BeliefAttribution``
+links from a seed, so two runs with the same arguments produce the same rows.
+The shape follows what the wiki sees in practice:
+
+- enums are skewed (most attributions are internal, unstable and controllable)
+  and a fifth of the attributions have no reason;
+- most beliefs link to one to three attributions, a few link to dozens, and
+  popular attributions are shared by many beliefs;
+- some factors point at a belief and some at an attribution, each at most once
+  as the schema requires.
+
+Ids are assigned up front, continuing after the largest id already in each
+table, so links can be generated without a round trip. Rows are loaded with
+``COPY`` (``--method copy``) or batched ``INSERT ... SELECT FROM unnest()``
+(``--method insert``, for poolers that do not allow ``COPY``), and the id
+sequences are moved past the new rows afterwards. Beliefs and attributions are
+loaded in parallel, then factors and links.
+
+Usage::
+
+    python -m benchmarks.seed --beliefs 250000 --attributions 250000 --factors 100000
+
+The defaults add about a million rows. Needs the ``asyncpg`` extra.
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from attributions_wiki import config
+
+try:
+    import asyncpg  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    asyncpg = None
+
+_SENTENCE = (
+    "I am not good enough at math because the test was unfair and my teacher "
+    "never explains anything so practice will help me improve over time while "
+    "luck and effort both matter when friends study together after school"
+)
+WORDS = _SENTENCE.split()
+
+# Weights of the first value of each enum, the rest goes to the second
+LOCUS = (("INTERNAL", "EXTERNAL"), 0.7)
+STABILITY = (("UNSTABLE", "STABLE"), 0.6)
+CONTROLLABILITY = (("CONTROLLABLE", "UNCONTROLLABLE"), 0.65)
+
+COLUMNS = {
+    "Belief": ("id", "created_at", "updated_at", "description"),
+    "Attribution": (
+        "id",
+        "created_at",
+        "updated_at",
+        "locus",
+        "stability",
+        "controllability",
+        "reason",
+    ),
+    "Factor": ("id", "created_at", "updated_at", "description", "attributionId", "beliefId"),
+    "_BeliefAttribution": ("A", "B"),
+}
+# Postgres type of each column, used to build the unnest() inserts
+TYPES = {
+    "id": "int4",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+    "description": "text",
+    "locus": '"Locus"',
+    "stability": '"Stability"',
+    "controllability": '"Controllability"',
+    "reason": "text",
+    "attributionId": "int4",
+    "beliefId": "int4",
+    "A": "int4",
+    "B": "int4",
+}
+
+# Prisma stores DateTime columns as UTC timestamps without a time zone
+_EPOCH = datetime(2024, 1, 1)
+_TWO_YEARS = 2 * 365 * 24 * 3600
+_ONE_MONTH = 30 * 24 * 3600
+MAX_FAN_OUT = 64
+TEXT_POOL = 4096
+
+
+@dataclass
+class Plan:
+    """How many rows to generate and the ids to start from."""
+
+    beliefs: int
+    attributions: int
+    factors: int
+    mean_fan_out: float = 1.6
+    seed: int = 0
+    first_belief: int = 1
+    first_attribution: int = 1
+    first_factor: int = 1
+
+
+def _texts(rng: random.Random, low: int, high: int) -> list[str]:
+    # Picking from a pool is several times cheaper than building every text
+    return [
+        " ".join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+        for _ in range(TEXT_POOL)
+    ]
+
+
+def _timestamps(rng: random.Random) -> tuple[datetime, datetime]:
+    created = _EPOCH + timedelta(seconds=rng.random() * _TWO_YEARS)
+    return created, created + timedelta(seconds=rng.random() * _ONE_MONTH)
+
+
+def _skewed(rng: random.Random, choice: tuple[tuple[str, str], float]) -> str:
+    (first, second), weight = choice
+    return first if rng.random() < weight else second
+
+
+def beliefs(plan: Plan) -> Iterator[tuple[Any, ...]]:
+    """Yield Belief rows."""
+    rng = random.Random(f"{plan.seed}-belief")
+    texts = _texts(rng, 4, 16)
+    for offset in range(plan.beliefs):
+        yield (plan.first_belief + offset, *_timestamps(rng), texts[offset % TEXT_POOL])
+
+
+def attributions(plan: Plan) -> Iterator[tuple[Any, ...]]:
+    """Yield Attribution rows with skewed enums."""
+    rng = random.Random(f"{plan.seed}-attribution")
+    texts = _texts(rng, 3, 12)
+    for offset in range(plan.attributions):
+        yield (
+            plan.first_attribution + offset,
+            *_timestamps(rng),
+            _skewed(rng, LOCUS),
+            _skewed(rng, STABILITY),
+            _skewed(rng, CONTROLLABILITY),
+            None if rng.random() < 0.2 else texts[offset % TEXT_POOL],
+        )
+
+
+def factors(plan: Plan) -> Iterator[tuple[Any, ...]]:
+    """Yield Factor rows; some point at a belief, some at an attribution, never twice."""
+    rng = random.Random(f"{plan.seed}-factor")
+    texts = _texts(rng, 2, 8)
+    for offset in range(plan.factors):
+        # The n-th factor may only use the n-th belief and attribution, which
+        # keeps both foreign keys unique without remembering which ids were used
+        belief_id = plan.first_belief + offset if offset < plan.beliefs else None
+        attribution_id = (
+            plan.first_attribution + offset if offset < plan.attributions else None
+        )
+        yield (
+            plan.first_factor + offset,
+            *_timestamps(rng),
+            texts[offset % TEXT_POOL],
+            attribution_id if rng.random() < 0.3 else None,
+            belief_id if rng.random() < 0.3 else None,
+        )
+
+
+def _fan_out(rng: random.Random, mean: float) -> int:
+    """Geometric number of links with the given mean, at least one."""
+    if mean <= 1:
+        return 1
+    return 1 + int(math.log(1.0 - rng.random()) / math.log(1 - 1 / mean))
+
+
+def links(plan: Plan) -> Iterator[tuple[int, int]]:
+    """Yield ("A", "B") attribution/belief pairs with a long-tailed fan-out."""
+    if not plan.attributions:
+        return
+    rng = random.Random(f"{plan.seed}-link")
+    for offset in range(plan.beliefs):
+        fan_out = min(_fan_out(rng, plan.mean_fan_out), MAX_FAN_OUT, plan.attributions)
+        chosen: set[int] = set()
+        while len(chosen) < fan_out:
+            # Cubing skews the pick towards low indices: the first 1% of the
+            # attributions get about a fifth of the links
+            chosen.add(int(plan.attributions * rng.random() ** 3))
+        belief_id = plan.first_belief + offset
+        for attribution in sorted(chosen):
+            yield plan.first_attribution + attribution, belief_id
+
+
+GENERATORS = {
+    "Belief": beliefs,
+    "Attribution": attributions,
+    "Factor": factors,
+    "_BeliefAttribution": links,
+}
+
+
+def _chunks(rows: Iterator[tuple[Any, ...]], size: int) -> Iterator[list[tuple[Any, ...]]]:
+    chunk: list[tuple[Any, ...]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def unnest_insert(table: str) -> str:
+    """An INSERT that takes one array parameter per column."""
+    columns = COLUMNS[table]
+    names = ", ".join(f'"{column}"' for column in columns)
+    arrays = ", ".join(f"${n}::{TYPES[column]}[]" for n, column in enumerate(columns, 1))
+    return f'INSERT INTO "{table}" ({names}) SELECT * FROM unnest({arrays})'
+
+
+async def load_table(pool: Any, table: str, plan: Plan, method: str, batch: int) -> int:
+    """Generate and load one table, returning the number of rows written."""
+    written = 0
+    async with pool.acquire() as conn:
+        await conn.execute("SET synchronous_commit TO off")
+        for chunk in _chunks(GENERATORS[table](plan), batch):
+            if method == "copy":
+                await conn.copy_records_to_table(table, records=chunk, columns=COLUMNS[table])
+            else:
+                await conn.execute(unnest_insert(table), *map(list, zip(*chunk, strict=True)))
+            written += len(chunk)
+    return written
+
+
+async def seed(plan: Plan, dsn: str, method: str = "copy", batch: int = 50_000) -> dict[str, int]:
+    """Load a plan into the database.
+
+    Args:
+        plan: What to generate; the first ids are moved past the existing rows.
+        dsn: An asyncpg connection string.
+        method: "copy" or "insert".
+        batch: Rows per COPY or INSERT.
+
+    Returns:
+        dict: Rows written per table.
+    """
+    if asyncpg is None:
+        raise RuntimeError("Seeding needs asyncpg, install the asyncpg extra")
+    pool = await asyncpg.create_pool(dsn, min_size=2, max_size=2)
+    try:
+        for table in ("Belief", "Attribution", "Factor"):
+            last = await pool.fetchval(f'SELECT COALESCE(MAX("id"), 0) FROM "{table}"')
+            setattr(plan, f"first_{table.lower()}", last + 1)
+
+        written: dict[str, int] = {}
+        for stage in (("Belief", "Attribution"), ("Factor", "_BeliefAttribution")):
+            counts = await asyncio.gather(
+                *(load_table(pool, table, plan, method, batch) for table in stage)
+            )
+            written.update(zip(stage, counts, strict=True))
+
+        for table in ("Belief", "Attribution", "Factor"):
+            await pool.execute(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f'(SELECT COALESCE(MAX("id"), 1) FROM "{table}"))'
+            )
+        return written
+    finally:
+        await pool.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Seed the database from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--beliefs", type=int, default=250_000)
+    parser.add_argument("--attributions", type=int, default=250_000)
+    parser.add_argument("--factors", type=int, default=100_000)
+    parser.add_argument("--fan-out", type=float, default=1.6, help="Mean links per belief")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--method", choices=("copy", "insert"), default="copy")
+    parser.add_argument("--batch", type=int, default=50_000, help="Rows per COPY or INSERT")
+    parser.add_argument("--database-url", default=config.DATABASE_URL)
+    args = parser.parse_args(argv)
+    # Imported here, the generator itself does not need the Prisma client
+    from attributions_wiki.db import asyncpg_dsn
+
+    plan = Plan(args.beliefs, args.attributions, args.factors, args.fan_out, args.seed)
+    started = time.perf_counter()
+    written = asyncio.run(seed(plan, asyncpg_dsn(args.database_url), args.method, args.batch))
+    elapsed = time.perf_counter() - started
+    total = sum(written.values())
+    for table, count in written.items():
+        sys.stdout.write(f"{table:<20} {count:>10}\n")
+    sys.stdout.write(f"{total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
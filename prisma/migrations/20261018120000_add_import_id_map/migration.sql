@@ -0,0 +1,9 @@
+-- CreateTable
+CREATE TABLE "ImportIdMap" (
+    "source" TEXT NOT NULL,
+    "entity" TEXT NOT NULL,
+    "source_id" TEXT NOT NULL,
+    "id" INTEGER NOT NULL,
+
+    CONSTRAINT "ImportIdMap_pkey" PRIMARY KEY ("source","entity","source_id")
+);
@@ -1,11 +1,15 @@
 import asyncio
 import os
+from collections.abc import Callable
 from typing import AsyncGenerator, Iterator
 
 import pytest
+from fastapi import APIRouter, FastAPI
 from fastapi.testclient import TestClient
 
 from attributions_wiki.app import app
+from attributions_wiki.repositories.base import Repositories
+from attributions_wiki.repositories.memory_repository import create_memory_repositories
 from prisma import Prisma, register
 
 # from server.database.base import *
@@ -87,3 +91,27 @@ async def client(event_loop: asyncio.BaseEventLoop) -> AsyncGenerator[TestClient
         yield c
     await prisma.disconnect()
     # await teardown_db(client=prisma)
+
+
+@pytest.fixture()
+def repos(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> Repositories:
+    """Fresh in-memory repositories, swapped in for the database.
+
+    Parametrize indirectly with the modules whose ``repositories`` should be replaced.
+    """
+    repos = create_memory_repositories()
+    for module in request.param:
+        monkeypatch.setattr(module, "repositories", repos)
+    return repos
+
+
+@pytest.fixture()
+def router_client() -> Callable[[APIRouter], TestClient]:
+    """Build test clients for apps that serve a single router."""
+
+    def make(router: APIRouter) -> TestClient:
+        app = FastAPI()
+        app.include_router(router)
+        return TestClient(app)
+
+    return make
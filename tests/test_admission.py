@@ -0,0 +1,58 @@
+"""Tests for admission control and load shedding."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki.admission import AdmissionController, AdmissionMiddleware
+from attributions_wiki.exceptions import OverloadedError
+
+
+@pytest.mark.asyncio()
+async def test_requests_beyond_the_queue_are_rejected_immediately():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    await controller.acquire()
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.queued == 1
+
+    with pytest.raises(OverloadedError):
+        await controller.acquire()
+    assert controller.rejected_queue_full_total == 1
+
+    controller.release()
+    await waiter
+    assert controller.in_flight == 1
+    assert controller.queued == 0
+
+
+@pytest.mark.asyncio()
+async def test_queued_requests_give_up_after_the_deadline():
+    controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=0.01)
+    async with controller.slot():
+        with pytest.raises(OverloadedError):
+            await controller.acquire()
+    assert controller.rejected_timeout_total == 1
+    assert controller.in_flight == 0
+    assert controller.stats()["queue_seconds_max"] >= 0.01
+
+
+def test_middleware_answers_503_with_retry_after():
+    controller = AdmissionController(max_in_flight=0, max_queue=0, queue_timeout=0)
+    app = FastAPI()
+
+    @app.get("/api/v1/thing")
+    async def thing() -> dict[str, str]:
+        return {"ok": "yes"}
+
+    @app.get("/healthz")
+    async def healthz() -> dict[str, str]:
+        return {"status": "ok"}
+
+    client = TestClient(AdmissionMiddleware(app, controller, retry_after=3))
+    response = client.get("/api/v1/thing")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    # Routes that do not touch the database are never limited
+    assert client.get("/healthz").status_code == 200
@@ -0,0 +1,95 @@
+"""Tests for the static asset pipeline."""
+import gzip
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki import assets
+from attributions_wiki.assets import (
+    AssetFiles,
+    Vendored,
+    asset_url,
+    build,
+    fingerprinted,
+    vendor,
+)
+
+SCRIPT = b"console.log('hello');\n" * 200
+
+
+@pytest.fixture()
+def static_dir(tmp_path: Path) -> Path:
+    (tmp_path / "vendor").mkdir()
+    (tmp_path / "vendor" / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("{{ not_an_asset }}")
+    return tmp_path
+
+
+def test_build_fingerprints_and_precompresses(static_dir: Path):
+    manifest = build(static_dir)
+
+    name = manifest["vendor/app.js"]
+    assert name == fingerprinted("vendor/app.js", SCRIPT)
+    assert name.startswith("vendor/app.") and name.endswith(".js")
+    assert list(manifest) == ["vendor/app.js"]
+    dist = static_dir / "dist"
+    assert (dist / name).read_bytes() == SCRIPT
+    assert gzip.decompress((dist / f"{name}.gz").read_bytes()) == SCRIPT
+    assert build(static_dir) == manifest
+
+
+def test_built_assets_are_immutable_and_served_precompressed(static_dir: Path):
+    name = build(static_dir)["vendor/app.js"]
+    app = FastAPI()
+    app.mount("/static", AssetFiles(directory=static_dir), name="static")
+    client = TestClient(app)
+
+    response = client.get(f"/static/dist/{name}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == SCRIPT
+
+    plain = client.get(f"/static/dist/{name}", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == SCRIPT
+    refused = client.get(f"/static/dist/{name}", headers={"Accept-Encoding": "br;q=0, gzip;q=0, *"})
+    assert "content-encoding" not in refused.headers
+    assert client.get("/static/vendor/app.js").headers["cache-control"] == "no-cache"
+
+
+def test_asset_urls_fall_back_until_built(monkeypatch, static_dir: Path):
+    monkeypatch.setattr(assets, "STATIC_DIR", static_dir)
+
+    assert asset_url("vendor/app.js") == "/static/vendor/app.js"
+    with pytest.raises(FileNotFoundError, match="vendor"):
+        asset_url("vendor/htmx.min.js")
+    name = build(static_dir)["vendor/app.js"]
+    assert asset_url("vendor/app.js") == f"/static/dist/{name}"
+
+
+def test_vendor_only_writes_downloads_matching_their_pin(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(
+        assets.urllib.request, "urlopen", lambda url, timeout: io.BytesIO(SCRIPT)
+    )
+    pinned = Vendored("https://example.com/app.js", hashlib.sha256(SCRIPT).hexdigest())
+    monkeypatch.setattr(assets, "VENDORED", {"vendor/app.js": pinned})
+
+    assert vendor(tmp_path) == ["vendor/app.js"]
+    assert (tmp_path / "vendor" / "app.js").read_bytes() == SCRIPT
+    assert vendor(tmp_path) == []
+
+    for sha256 in ("0" * 64, None):
+        other = tmp_path / "other"
+        monkeypatch.setattr(
+            assets, "VENDORED", {"vendor/app.js": Vendored("https://example.com/app.js", sha256)}
+        )
+        with pytest.raises(ValueError, match="sha256"):
+            vendor(other)
+        assert not other.exists()
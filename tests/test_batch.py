@@ -0,0 +1,170 @@
+"""Tests for the batch endpoint."""
+from collections.abc import Callable
+
+import pytest
+from fastapi import APIRouter
+from fastapi.testclient import TestClient
+
+from attributions_wiki.exceptions import ValidationError
+from attributions_wiki.read_snapshot import ReadEngine
+from attributions_wiki.repositories.base import Repositories
+from attributions_wiki.routers.api import batch_router
+from attributions_wiki.services import (
+    attribution_service,
+    batch_service,
+    belief_service,
+    factor_service,
+)
+from attributions_wiki.services.batch_service import BatchOperation, check, stages
+
+ATTRIBUTION = {"locus": "INTERNAL", "stability": "STABLE", "controllability": "CONTROLLABLE"}
+
+
+in_memory = pytest.mark.parametrize(
+    "repos",
+    [(attribution_service, batch_service, belief_service, factor_service)],
+    indirect=True,
+    ids=["memory"],
+)
+
+
+def _operations(*specs: tuple) -> list[BatchOperation]:
+    return [BatchOperation(id=id, op=op, args=args) for id, op, args in specs]
+
+
+def test_reads_share_a_stage_until_a_write_or_a_reference():
+    operations = _operations(
+        ("a", "belief.get", {"id": 1}),
+        (None, "belief.get_all", {}),
+        ("c", "belief.create", {"data": {"description": "x"}}),
+        ("d", "belief.get", {"id": {"$ref": "c.id"}}),
+        (None, "belief.attributions", {"id": {"$ref": "d.id"}}),
+        (None, "factor.get_all", {"take": 1}),
+    )
+
+    assert stages(operations) == [[0, 1], [2], [3], [4, 5]]
+
+
+def test_malformed_batches_are_rejected_before_running():
+    with pytest.raises(ValidationError, match="unknown operation"):
+        check(_operations((None, "belief.drop", {})))
+    with pytest.raises(ValidationError, match="needs id"):
+        check(_operations((None, "belief.get", {"take": 1})))
+    with pytest.raises(ValidationError, match="earlier operation"):
+        check(
+            _operations(
+                (None, "belief.get", {"id": {"$ref": "later.id"}}),
+                ("later", "belief.get_all", {}),
+            )
+        )
+
+
+@in_memory
+def test_later_operations_use_ids_created_earlier(
+    repos: Repositories, router_client: Callable[[APIRouter], TestClient]
+):
+    client = router_client(batch_router.router)
+    belief = {"$ref": "belief.id"}
+    response = client.post(
+        "/batch",
+        json={
+            "operations": [
+                {"id": "belief", "op": "belief.create", "args": {"data": {"description": "b"}}},
+                {
+                    "id": "attribution",
+                    "op": "attribution.create",
+                    "args": {"data": {**ATTRIBUTION, "belief": {"connect": [{"id": belief}]}}},
+                },
+                {
+                    "op": "factor.create",
+                    "args": {
+                        "data": {
+                            "description": "f",
+                            "beliefId": belief,
+                            "attributionId": {"$ref": "attribution.id"},
+                        }
+                    },
+                },
+                {"op": "belief.attributions", "args": {"id": belief}},
+                {"id": "missing", "op": "belief.get", "args": {"id": 99}},
+                {"op": "belief.delete", "args": {"id": {"$ref": "missing.id"}}},
+            ]
+        },
+    )
+
+    results = response.json()
+    assert [result["status"] for result in results] == [200, 200, 200, 200, 404, 424]
+    assert results[0]["body"]["description"] == "b"
+    assert results[0]["etag"].startswith('"1-')
+    assert results[2]["body"]["beliefId"] == results[0]["body"]["id"]
+    assert [attribution["id"] for attribution in results[3]["body"]] == [1]
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_independent_writes_succeed_or_fail_on_their_own(
+    repos: Repositories, router_client: Callable[[APIRouter], TestClient]
+):
+    client = router_client(batch_router.router)
+    belief = await repos.belief.create({"description": "before"})
+    fresh = {"id": belief.id, "data": {"description": "after"}}
+    stale = {"id": belief.id, "data": {"description": "x"}, "if_match": f'"{belief.id}-0"'}
+
+    results = client.post(
+        "/batch",
+        json={
+            "operations": [
+                {"op": "belief.update", "args": fresh},
+                {"op": "belief.update", "args": stale},
+                {"op": "belief.get", "args": {"id": belief.id, "fields": "description"}},
+            ]
+        },
+    ).json()
+
+    assert [result["status"] for result in results] == [200, 412, 200]
+    assert results[2]["body"] == {"id": belief.id, "description": "after"}
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_atomic_batches_roll_back_on_the_first_failure(
+    repos: Repositories, router_client: Callable[[APIRouter], TestClient]
+):
+    client = router_client(batch_router.router)
+    operations = [
+        {"id": "kept", "op": "belief.create", "args": {"data": {"description": "kept?"}}},
+        {"op": "belief.get", "args": {"id": {"$ref": "kept.id"}}},
+        {"op": "belief.delete", "args": {"id": 99}},
+        {"op": "belief.create", "args": {"data": {"description": "never"}}},
+    ]
+
+    results = client.post("/batch", json={"operations": operations, "atomic": True}).json()
+
+    assert [result["status"] for result in results] == [424, 424, 404, 424]
+    assert await repos.belief.find_many() == []
+    committed = client.post("/batch", json={"operations": operations[:2], "atomic": True}).json()
+    assert [result["status"] for result in committed] == [200, 200]
+    assert [belief.description for belief in await repos.belief.find_many()] == ["kept?"]
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_snapshot_only_sees_committed_transactions(repos: Repositories):
+    engine = ReadEngine(reload_seconds=0)
+    snapshot = engine.wrap(repos)
+    await engine.load()
+
+    async def write_then_fail():
+        async with snapshot.transaction():
+            await snapshot.belief.create({"description": "rolled back"})
+            # Reads inside the transaction see its writes
+            assert len(await snapshot.belief.find_many()) == 1
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await write_then_fail()
+    assert await snapshot.belief.find_many() == []
+    async with snapshot.transaction():
+        await snapshot.belief.create({"description": "committed"})
+        assert engine.snapshot.tables["Belief"].rows == {}
+    assert [b.description for b in await snapshot.belief.find_many()] == ["committed"]
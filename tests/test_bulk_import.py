@@ -0,0 +1,269 @@
+"""Tests for the streaming bulk import."""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from attributions_wiki.bulk_import import (
+    ENTITIES,
+    Batch,
+    Checkpoint,
+    Entity,
+    Importer,
+    Malformed,
+    batches,
+    parse,
+    read_records,
+)
+
+
+class Conflict(Exception):
+    pass
+
+
+class FakeWriter:
+    """Keeps the tables and the id map in memory, like the real writers would."""
+
+    conflict_errors = (Conflict,)
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.rows: dict[str, list[dict[str, Any]]] = {}
+        self.id_map: dict[tuple[str, str, str], int] = {}
+        self.links: set[tuple[int, int]] = set()
+        # Called with the batch's rows before every write; may raise
+        self.before_write: Any = None
+
+    def now(self) -> datetime:
+        return datetime(2026, 1, 1)
+
+    async def reserve_ids(self, table: str, count: int) -> list[int]:
+        start = self.ids.get(table, 0)
+        self.ids[table] = start + count
+        return list(range(start + 1, start + count + 1))
+
+    async def lookup(self, source: str, entity: str, source_ids: list[str]) -> dict[str, int]:
+        return {
+            source_id: self.id_map[source, entity, source_id]
+            for source_id in source_ids
+            if (source, entity, source_id) in self.id_map
+        }
+
+    async def taken(self, entity: Entity, column: str, ids: list[int]) -> set[int]:
+        return {row[column] for row in self.rows.get(entity.table, [])} & set(ids)
+
+    async def write(self, entity, rows, mapped, links) -> None:
+        if self.before_write is not None:
+            self.before_write(rows)
+        for source, name, source_id, new_id in mapped:
+            if (source, name, source_id) in self.id_map:
+                raise Conflict
+            self.id_map[source, name, source_id] = new_id
+        table = self.rows.setdefault(entity.table, [])
+        table.extend(dict(zip(entity.columns, row, strict=True)) for row in rows)
+        self.links.update(links)
+
+    def add(self, entity: str, source_id: str, **row: Any) -> int:
+        """Store a row imported earlier."""
+        table = ENTITIES[entity].table
+        new_id = self.ids[table] = self.ids.get(table, 0) + 1
+        self.rows.setdefault(table, []).append({"id": new_id, **row})
+        self.id_map["old", entity, source_id] = new_id
+        return new_id
+
+
+def _importer(tmp_path: Path, entity: str, writer: FakeWriter) -> Importer:
+    rejects = (tmp_path / "rejects.jsonl").open("a", encoding="utf-8")
+    checkpoint = Checkpoint(tmp_path / "checkpoint.json", rejects)
+    return Importer(ENTITIES[entity], "old", writer, checkpoint)
+
+
+def _rejects(tmp_path: Path) -> list[tuple[int, str]]:
+    lines = (tmp_path / "rejects.jsonl").read_text().splitlines()
+    return [(reject["line"], reject["reason"]) for reject in map(json.loads, lines)]
+
+
+def _write(path: Path, *records: Any) -> Path:
+    path.write_text(
+        "".join(
+            (record if isinstance(record, str) else json.dumps(record)) + "\n" for record in records
+        )
+    )
+    return path
+
+
+def test_csv_records_are_read_lazily_after_the_checkpoint(tmp_path: Path):
+    path = tmp_path / "attributions.csv"
+    path.write_text(
+        "id,locus,stability,controllability,reason,beliefs\n"
+        "a1,INTERNAL,STABLE,CONTROLLABLE,,b1|b2\n"
+        "a2,EXTERNAL,UNSTABLE,UNCONTROLLABLE,luck,\n"
+    )
+
+    records = read_records(path, "csv", start_after=2)
+
+    assert next(records) == (
+        3,
+        {
+            "id": "a2",
+            "locus": "EXTERNAL",
+            "stability": "UNSTABLE",
+            "controllability": "UNCONTROLLABLE",
+            "reason": "luck",
+            "beliefs": None,
+        },
+    )
+    assert next(records, None) is None
+    first = next(read_records(path, "csv"))
+    assert first[1]["beliefs"] == ["b1", "b2"]
+
+
+def test_parse_validates_against_the_create_input():
+    entity = ENTITIES["attribution"]
+    parsed = parse(
+        entity,
+        1,
+        {"id": 7, "locus": "INTERNAL", "stability": "STABLE", "controllability": "CONTROLLABLE",
+         "beliefs": [1, 2]},
+    )
+
+    assert parsed.source_id == "7"
+    assert parsed.references == {"beliefs": ["1", "2"]}
+    with pytest.raises(ValueError, match="locus"):
+        parse(entity, 2, {"id": 8, "stability": "STABLE", "controllability": "CONTROLLABLE"})
+    with pytest.raises(ValueError, match="missing id"):
+        parse(ENTITIES["belief"], 3, {"description": "No id"})
+
+
+def test_checkpoint_only_moves_past_contiguous_batches(tmp_path: Path):
+    path = tmp_path / "import.checkpoint.json"
+    checkpoint = Checkpoint(path)
+    first, second, third = batches(iter((n, {}) for n in range(1, 7)), 2)
+
+    checkpoint.finish(second)
+    assert checkpoint.line == 0
+    checkpoint.finish(first)
+    assert checkpoint.line == 4
+    checkpoint.finish(third)
+
+    assert json.loads(path.read_text())["line"] == 6
+    assert Checkpoint(path).line == 6
+    assert isinstance(third, Batch)
+
+
+def test_malformed_lines_are_read_as_rejects(tmp_path: Path):
+    path = _write(tmp_path / "beliefs.jsonl", {"id": "b1"}, "{not json", "[1]")
+
+    records = list(read_records(path, "jsonl"))
+
+    assert records[0] == (1, {"id": "b1"})
+    assert isinstance(records[1][1], Malformed)
+    with pytest.raises(ValueError, match="invalid JSON"):
+        parse(ENTITIES["belief"], *records[1])
+    with pytest.raises(ValueError, match="not a JSON object"):
+        parse(ENTITIES["belief"], *records[2])
+
+
+@pytest.mark.asyncio()
+async def test_unknown_references_and_duplicate_ids_are_rejected(tmp_path: Path):
+    writer = FakeWriter()
+    belief = writer.add("belief", "b1", description="known")
+    path = _write(
+        tmp_path / "factors.jsonl",
+        {"id": "f1", "description": "ok", "belief": "b1"},
+        {"id": "f2", "description": "dangling", "belief": "b9"},
+        {"id": "f1", "description": "again"},
+        "{not json",
+    )
+    importer = _importer(tmp_path, "factor", writer)
+
+    await importer.run(read_records(path, "jsonl"), size=10, workers=1)
+
+    assert [row["beliefId"] for row in writer.rows["Factor"]] == [belief]
+    (unknown, duplicate, malformed) = _rejects(tmp_path)
+    assert (unknown, duplicate) == ((2, "unknown belief b9"), (3, "duplicate id f1"))
+    assert malformed[0] == 4
+    assert malformed[1].startswith("invalid JSON")
+    assert (importer.stats.imported, importer.stats.rejected) == (1, 3)
+
+
+@pytest.mark.asyncio()
+async def test_unique_references_are_checked_against_the_table_and_the_batches(tmp_path: Path):
+    writer = FakeWriter()
+    writer.add("belief", "b1", description="one")
+    writer.add("belief", "b2", description="two")
+    writer.add("factor", "old", description="old", beliefId=1, attributionId=None)
+    path = _write(
+        tmp_path / "factors.jsonl",
+        {"id": "f1", "description": "b1 has one", "belief": "b1"},
+        {"id": "f2", "description": "first for b2", "belief": "b2"},
+        {"id": "f3", "description": "same batch", "belief": "b2"},
+        {"id": "f4", "description": "earlier batch", "belief": "b2"},
+    )
+    importer = _importer(tmp_path, "factor", writer)
+
+    await importer.run(read_records(path, "jsonl"), size=3, workers=1)
+
+    assert [row["description"] for row in writer.rows["Factor"]] == ["old", "first for b2"]
+    assert _rejects(tmp_path) == [
+        (1, "belief b1 already has a factor"),
+        (3, "belief b2 already has a factor"),
+        (4, "belief b2 already has a factor"),
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_conflicting_writes_are_planned_again(tmp_path: Path):
+    writer = FakeWriter()
+    path = _write(
+        tmp_path / "beliefs.jsonl", {"id": "b1", "description": "x"}, {"id": "b2", "description": "y"}
+    )
+
+    def import_b1_meanwhile(rows: list) -> None:
+        writer.before_write = None
+        writer.add("belief", "b1", description="other worker")
+
+    writer.before_write = import_b1_meanwhile
+    importer = _importer(tmp_path, "belief", writer)
+
+    await importer.run(read_records(path, "jsonl"), size=10, workers=1)
+
+    assert [row["description"] for row in writer.rows["Belief"]] == ["other worker", "y"]
+    assert (importer.stats.imported, importer.stats.skipped) == (1, 1)
+
+
+@pytest.mark.asyncio()
+async def test_a_rerun_resumes_without_rejecting_twice(tmp_path: Path):
+    writer = FakeWriter()
+    path = _write(
+        tmp_path / "beliefs.jsonl",
+        {"id": "b1", "description": "x"},
+        "{not json",
+        {"id": "b3", "description": "y"},
+        {"description": "no id"},
+    )
+
+    def fail_on_b3(rows: list) -> None:
+        if any(row[3] == "y" for row in rows):
+            raise RuntimeError("connection lost")
+
+    writer.before_write = fail_on_b3
+    importer = _importer(tmp_path, "belief", writer)
+    with pytest.raises(ExceptionGroup):
+        await importer.run(read_records(path, "jsonl"), size=2, workers=1)
+    importer.checkpoint.rejects.close()
+    assert importer.checkpoint.line == 2
+    assert [line for line, _ in _rejects(tmp_path)] == [2]
+
+    writer.before_write = None
+    importer = _importer(tmp_path, "belief", writer)
+    await importer.run(
+        read_records(path, "jsonl", start_after=importer.checkpoint.line), size=2, workers=1
+    )
+    importer.checkpoint.rejects.close()
+
+    assert [row["description"] for row in writer.rows["Belief"]] == ["x", "y"]
+    assert [line for line, _ in _rejects(tmp_path)] == [2, 4]
+    assert (importer.stats.imported, importer.stats.rejected) == (2, 2)
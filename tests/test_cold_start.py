@@ -0,0 +1,52 @@
+"""Cold start budget and the startup timings behind it."""
+from attributions_wiki.startup import StartupTimings
+from benchmarks.cold_start import by_package, measure, parse_import_times
+
+# Seconds on a loaded CI machine; regressions (an eager Prisma or Jinja import,
+# a blocking call in the lifespan) tend to cost multiples of these
+IMPORT_BUDGET = 3.0
+READY_BUDGET = 5.0
+FIRST_REQUEST_BUDGET = 1.0
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     jinja2.utils
+import time:       300 |        420 |   jinja2
+import time:        80 |        500 | attributions_wiki.templating
+"""
+
+
+def test_import_times_are_grouped_by_package():
+    times = parse_import_times(IMPORTTIME)
+
+    assert [(entry.module, entry.depth) for entry in times] == [
+        ("jinja2.utils", 2),
+        ("jinja2", 1),
+        ("attributions_wiki.templating", 0),
+    ]
+    assert by_package(times) == {"jinja2": 0.00042, "attributions_wiki": 0.00008}
+
+
+def test_only_the_first_request_is_recorded():
+    timings = StartupTimings(started=0.0)
+    with timings.phase("warmup"):
+        pass
+    timings.request_finished("/healthz", 0.25)
+    timings.request_finished("/", 0.5)
+
+    assert set(timings.phases) == {"warmup"}
+    assert timings.report()["first_request"]["route"] == "/healthz"
+
+
+def test_cold_start_stays_within_budget():
+    report = measure(
+        ["/", "/api/v1/belief/get_all", "/healthz"],
+        {"REPOSITORY_BACKEND": "memory", "WARMUP_ON_STARTUP": "false"},
+    )
+
+    assert report["deferred_imports_loaded"] == []
+    assert report["import_seconds"] < IMPORT_BUDGET
+    assert report["ready_seconds"] < READY_BUDGET
+    for path, request in report["first_requests"].items():
+        assert request["status"] == 200, path
+        assert request["seconds"] < FIRST_REQUEST_BUDGET, path
@@ -0,0 +1,130 @@
+"""Tests for response compression."""
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from attributions_wiki.compression import (
+    CompressionMiddleware,
+    compressed_bytes,
+    negotiate,
+)
+from attributions_wiki.etags import matches
+
+BODY = {"beliefs": [{"id": n, "description": "my teacher never explains"} for n in range(100)]}
+
+
+@pytest.fixture()
+def client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large() -> Response:
+        return JSONResponse(BODY)
+
+    @app.get("/tagged")
+    async def tagged(request: Request) -> Response:
+        etag = '"1-1700000000000"'
+        if matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse(BODY, headers={"ETag": etag})
+
+    @app.get("/small")
+    async def small() -> Response:
+        return JSONResponse({"id": 1})
+
+    @app.get("/binary")
+    async def binary() -> Response:
+        return Response(b"\0" * 4096, media_type="application/octet-stream")
+
+    @app.get("/encoded")
+    async def encoded() -> Response:
+        body = gzip.compress(b"a" * 4096)
+        return PlainTextResponse(body, headers={"Content-Encoding": "gzip"})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500, levels={"gzip": 1})
+    return TestClient(app)
+
+
+def test_large_responses_are_compressed(client: TestClient):
+    before = compressed_bytes.values.get(("gzip", "in"), 0)
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == BODY
+    assert compressed_bytes.values[("gzip", "in")] == before + len(response.content)
+
+
+def test_compressed_responses_get_their_own_etag(client: TestClient):
+    compressed = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/tagged", headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["etag"] == '"1-1700000000000:gzip"'
+    assert plain.headers["etag"] == '"1-1700000000000"'
+
+    for etag in (compressed.headers["etag"], plain.headers["etag"]):
+        revalidated = client.get(
+            "/tagged", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
+
+
+def test_small_binary_encoded_and_unaccepted_responses_are_left_alone(client: TestClient):
+    accept = {"Accept-Encoding": "gzip"}
+    small = client.get("/small", headers=accept)
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in client.get("/binary", headers=accept).headers
+
+    encoded = client.get("/encoded", headers=accept)
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.content == b"a" * 4096
+    assert "vary" not in encoded.headers
+
+    plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == BODY
+
+
+def test_codings_refused_with_q_0_are_not_allowed_by_the_wildcard():
+    def accept(value: str) -> Headers:
+        return Headers({"accept-encoding": value})
+
+    assert negotiate(accept("*"), ("br", "gzip")) == "br"
+    assert negotiate(accept("br;q=0, *"), ("br", "gzip")) == "gzip"
+    assert negotiate(accept("gzip;q=0, *;q=0.5"), ("gzip",)) is None
+
+
+@pytest.mark.asyncio()
+async def test_streamed_responses_are_flushed_chunk_by_chunk():
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"text/html; charset=utf-8")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for n in range(3):
+            body = f"<div>part {n}</div>".encode()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app, minimum_size=500)(scope, None, send)
+
+    start, *parts = messages
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    assert [part["more_body"] for part in parts] == [True, True, True, False]
+    # Every chunk decompresses as soon as it arrives, without waiting for the end
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for n, part in enumerate(parts[:3]):
+        assert decompressor.decompress(part["body"]) == f"<div>part {n}</div>".encode()
+    assert decompressor.decompress(parts[3]["body"]) == b""
+    assert decompressor.eof
@@ -0,0 +1,24 @@
+"""Tests for the compression benchmark."""
+import gzip
+
+from benchmarks.compression_bench import compress, format_table, measure, payloads
+
+
+def test_streamed_compression_round_trips():
+    body = b"<div>belief</div>" * 500
+
+    assert gzip.decompress(compress("gzip", 6, body)) == body
+    assert gzip.decompress(compress("gzip", 6, body, chunks=7)) == body
+
+
+def test_report_covers_every_payload_and_level():
+    bodies = payloads(rows=10)
+    results = {
+        name: [measure("gzip", level, body, repeats=1) for level in (1, 9)]
+        for name, body in bodies.items()
+    }
+
+    assert set(results) == {"attribution.get_all.json", "belief_list.html"}
+    for rows in results.values():
+        assert all(row["compressed"] < row["original"] for row in rows)
+    assert "belief_list.html" in format_table(results)
@@ -0,0 +1,120 @@
+"""Tests for request deadlines and cancellation on disconnect."""
+import asyncio
+from typing import Any
+
+import pytest
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki import deadline
+from attributions_wiki.deadline import DeadlineMiddleware, remaining
+from attributions_wiki.exceptions import DeadlineExceededError
+from attributions_wiki.services.db_call import db_call
+
+
+@pytest.mark.asyncio()
+async def test_db_call_fails_once_the_deadline_passes():
+    token = deadline._deadline.set(asyncio.get_running_loop().time() + 0.01)
+    try:
+        with pytest.raises(DeadlineExceededError):
+            await db_call(asyncio.sleep, 1)
+    finally:
+        deadline._deadline.reset(token)
+
+
+@pytest.mark.asyncio()
+async def test_db_call_without_deadline_runs_to_completion():
+    assert await db_call(asyncio.sleep, 0, result="done") == "done"
+
+
+def test_header_overrides_the_default_timeout_up_to_the_maximum():
+    app = FastAPI()
+
+    @app.get("/budget")
+    async def budget() -> dict[str, float | None]:
+        return {"remaining": remaining()}
+
+    client = TestClient(DeadlineMiddleware(app, default_timeout=5, max_timeout=20))
+    assert 4 < client.get("/budget").json()["remaining"] <= 5
+    assert 1 < client.get("/budget", headers={"X-Request-Timeout": "2"}).json()["remaining"] <= 2
+    assert 19 < client.get("/budget", headers={"X-Request-Timeout": "600"}).json()["remaining"] <= 20
+    assert 4 < client.get("/budget", headers={"X-Request-Timeout": "soon"}).json()["remaining"] <= 5
+
+
+@pytest.mark.asyncio()
+async def test_disconnected_client_cancels_the_request():
+    cancelled = asyncio.Event()
+
+    async def slow_app(scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive() -> dict[str, Any]:
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message: Any) -> None:
+        raise AssertionError("No response should be sent")
+
+    before = deadline.counters["disconnect_cancellations"]
+    scope = {"type": "http", "headers": [], "path": "/", "method": "GET"}
+    await asyncio.wait_for(DeadlineMiddleware(slow_app)(scope, receive, send), timeout=1)
+    assert cancelled.is_set()
+    assert deadline.counters["disconnect_cancellations"] == before + 1
+
+
+def test_background_tasks_run_after_the_response_is_complete():
+    app = FastAPI()
+    finished = []
+
+    async def after(n: int) -> None:
+        await asyncio.sleep(0.01)
+        finished.append(n)
+
+    @app.get("/{n}")
+    async def respond(n: int, background: BackgroundTasks) -> dict[str, int]:
+        background.add_task(after, n)
+        return {"n": n}
+
+    before = deadline.counters["disconnect_cancellations"]
+    client = TestClient(DeadlineMiddleware(app))
+    for n in range(5):
+        assert client.get(f"/{n}").json() == {"n": n}
+    assert finished == [0, 1, 2, 3, 4]
+    assert deadline.counters["disconnect_cancellations"] == before
+
+
+@pytest.mark.asyncio()
+async def test_the_body_is_read_no_faster_than_the_app_consumes_it():
+    chunks = [{"type": "http.request", "body": b"x" * 1024, "more_body": True}] * 100
+    read = 0
+
+    async def receive() -> dict[str, Any]:
+        nonlocal read
+        if read == len(chunks):
+            await asyncio.sleep(10)
+        read += 1
+        return chunks[read - 1]
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        # Busy with something else before it reads the upload
+        await asyncio.sleep(0.05)
+        for _ in range(3):
+            await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def send(message: Any) -> None:
+        pass
+
+    scope = {"type": "http", "headers": [], "path": "/", "method": "POST"}
+    await asyncio.wait_for(DeadlineMiddleware(app)(scope, receive, send), timeout=1)
+    # What the app took, one in the queue and one waiting to be put
+    assert read <= 5
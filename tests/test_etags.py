@@ -0,0 +1,116 @@
+"""Tests for ETags and the versions they are built from."""
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from attributions_wiki.etags import (
+    collection_etag,
+    entity_etag,
+    if_match,
+    matches,
+    not_modified,
+)
+from attributions_wiki.exceptions import PreconditionFailedError
+from attributions_wiki.read_snapshot import ReadEngine
+from attributions_wiki.repositories.base import Repositories, row_version
+from attributions_wiki.repositories.memory_repository import create_memory_repositories
+
+
+@pytest.fixture()
+def repos() -> Repositories:
+    return create_memory_repositories()
+
+
+def test_if_none_match_is_compared_weakly():
+    etag = entity_etag(1, "1700000000000")
+
+    assert etag == '"1-1700000000000"'
+    assert matches(f'"other", W/{etag}', etag)
+    assert matches('"1-1700000000000:gzip"', etag)
+    assert matches("*", etag)
+    assert not matches(None, etag)
+    assert not matches('"1-1699999999999"', etag)
+
+
+def test_collection_etags_differ_per_page():
+    assert collection_etag("3-1") != collection_etag("3-1", take=2)
+    assert collection_etag("3-1", take=2) != collection_etag("3-1", take=2, skip=2)
+    assert collection_etag("3-1", skip=0) == collection_etag("3-1", take=None, skip=0)
+
+
+def test_matching_requests_get_an_empty_304():
+    app = FastAPI()
+    etag = entity_etag(1, "5")
+
+    @app.get("/")
+    async def index(request: Request) -> Response:
+        return not_modified(request, etag) or Response("body", headers={"ETag": etag})
+
+    client = TestClient(app)
+    assert client.get("/").text == "body"
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+@pytest.mark.asyncio()
+async def test_row_versions_follow_updates(repos: Repositories):
+    belief = await repos.belief.create({"description": "before"})
+
+    assert await repos.belief.version({"id": belief.id}) == row_version(belief)
+    assert await repos.belief.version({"id": 99}) is None
+    updated = await repos.belief.update({"id": belief.id}, {"description": "after"})
+    assert await repos.belief.version({"id": belief.id}) == row_version(updated)
+
+
+@pytest.mark.asyncio()
+async def test_collection_versions_catch_deletes_and_cleared_foreign_keys(repos: Repositories):
+    belief = await repos.belief.create({"description": "belief"})
+    factor = await repos.factor.create({"description": "factor", "beliefId": belief.id})
+    engine = ReadEngine(reload_seconds=0)
+    snapshot = engine.wrap(repos)
+    await engine.load()
+
+    beliefs, factors = await repos.belief.collection_version(), await repos.factor.collection_version()
+    assert await snapshot.belief.collection_version() == beliefs
+    assert await snapshot.factor.collection_version() == factors
+    assert await snapshot.factor.version({"id": factor.id}) == row_version(factor)
+
+    # The factor's updated_at is untouched when its belief goes
+    await snapshot.belief.delete({"id": belief.id})
+    assert await repos.belief.collection_version() != beliefs
+    assert await repos.factor.collection_version() != factors
+    assert await snapshot.factor.collection_version() == await repos.factor.collection_version()
+    assert await snapshot.factor.version({"id": factor.id}) != row_version(factor)
+
+
+def test_if_match_names_the_version_of_the_row():
+    def request(header: str) -> Request:
+        return Request({"type": "http", "headers": [(b"if-match", header.encode())]})
+
+    assert if_match(request("*"), "Belief", 1) is None
+    assert if_match(request('"2-5", "1-1700000000000"'), "Belief", 1) == "1700000000000"
+    assert if_match(request('"1-1700000000000-3-"'), "Factor", 1) == "1700000000000-3-"
+    assert if_match(request('"1-1700000000000:br"'), "Belief", 1) == "1700000000000"
+    for header in ('W/"1-1700000000000"', '"2-5"', '"1-soon"'):
+        with pytest.raises(PreconditionFailedError):
+            if_match(request(header), "Belief", 1)
+    with pytest.raises(PreconditionFailedError):
+        if_match(request('"1-1700000000000"'), "Factor", 1)
+
+
+@pytest.mark.asyncio()
+async def test_conditional_writes_only_touch_the_version_read(repos: Repositories):
+    belief = await repos.belief.create({"description": "first"})
+    # A version the row never had, as if another client had written it since
+    stale = "0"
+
+    assert await repos.belief.update({"id": belief.id}, {"description": "lost"}, stale) is None
+    assert await repos.belief.delete({"id": belief.id}, stale) is None
+    updated = await repos.belief.update(
+        {"id": belief.id}, {"description": "second"}, row_version(belief)
+    )
+    assert updated is not None
+    assert updated.description == "second"
+    assert await repos.belief.delete({"id": belief.id}, row_version(updated)) is not None
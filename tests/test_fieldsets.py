@@ -0,0 +1,93 @@
+"""Tests for sparse fieldsets."""
+from collections.abc import Callable
+
+import pytest
+from fastapi import APIRouter
+from fastapi.testclient import TestClient
+
+from attributions_wiki.exceptions import ValidationError
+from attributions_wiki.fieldsets import parse_fields
+from attributions_wiki.read_snapshot import ReadEngine
+from attributions_wiki.repositories.base import Repositories
+from attributions_wiki.routers.api import belief_router
+from attributions_wiki.services import belief_service, sql_reads
+
+in_memory = pytest.mark.parametrize("repos", [(belief_service,)], indirect=True, ids=["memory"])
+
+
+def test_fields_are_validated_and_put_in_table_order():
+    assert parse_fields("Belief", None) is None
+    assert parse_fields("Belief", "description, updated_at") == ("id", "updated_at", "description")
+    assert parse_fields("Factor", "beliefId,id,beliefId") == ("id", "beliefId")
+    with pytest.raises(ValidationError, match="password"):
+        parse_fields("Belief", "description,password")
+    with pytest.raises(ValidationError):
+        parse_fields("Belief", " , ")
+
+
+def test_only_known_columns_reach_the_sql():
+    assert sql_reads.partial_page("Belief", ("id", "description")).startswith(
+        'SELECT "id", "description" FROM "Belief"'
+    )
+    with pytest.raises(ValueError, match="Belief"):
+        sql_reads.partial_by_id("Belief", ('id"; DROP TABLE "Belief"; --',))
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_partial_reads_match_the_full_rows(repos: Repositories):
+    for n in range(4):
+        await repos.belief.create({"description": f"b{n}"})
+    fields = ("id", "description")
+    engine = ReadEngine(reload_seconds=0)
+    snapshot = engine.wrap(repos)
+    await engine.load()
+
+    for backend in (repos, snapshot):
+        page = await backend.belief.find_many_partial(fields, take=2, skip=1)
+        assert page == [{"id": 2, "description": "b1"}, {"id": 3, "description": "b2"}]
+        assert await backend.belief.find_many_partial(fields, after=3) == [
+            {"id": 4, "description": "b3"}
+        ]
+        assert await backend.belief.find_unique_partial({"id": 1}, fields) == {
+            "id": 1,
+            "description": "b0",
+        }
+        assert await backend.belief.find_unique_partial({"id": 9}, fields) is None
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_routes_return_just_the_fields_asked_for(
+    repos: Repositories, router_client: Callable[[APIRouter], TestClient]
+):
+    client = router_client(belief_router.router)
+    belief = await repos.belief.create({"description": "only"})
+
+    full = client.get(f"/belief/get/{belief.id}")
+    sparse = client.get(f"/belief/get/{belief.id}", params={"fields": "description"})
+    assert sparse.json() == {"id": belief.id, "description": "only"}
+    assert sparse.headers["etag"] == full.headers["etag"]
+    listed = client.get("/belief/get_all", params={"fields": "updated_at"})
+    assert list(listed.json()[0]) == ["id", "updated_at"]
+    assert client.get("/belief/get_all", params={"fields": "nope"}).status_code == 400
+    assert client.get("/belief/get/99", params={"fields": "id"}).status_code == 404
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_a_partial_get_reads_its_etag_from_the_same_row(
+    repos: Repositories, router_client: Callable[[APIRouter], TestClient], monkeypatch
+):
+    client = router_client(belief_router.router)
+    belief = await repos.belief.create({"description": "one query"})
+    etag = client.get(f"/belief/get/{belief.id}").headers["etag"]
+
+    async def no_version_query(*args, **kwargs):
+        raise AssertionError("the version was read separately")
+
+    monkeypatch.setattr(repos.belief, "version", no_version_query)
+    sparse = client.get(f"/belief/get/{belief.id}", params={"fields": "description"})
+
+    assert sparse.json() == {"id": belief.id, "description": "one query"}
+    assert sparse.headers["etag"] == etag
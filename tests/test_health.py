@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from attributions_wiki import config
+
+
+@pytest.mark.asyncio()
+async def test_healthz(client: TestClient, event_loop: asyncio.AbstractEventLoop):
+    response = client.get("http://localhost:8000/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio()
+async def test_readyz_reports_pool_saturation(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+):
+    response = client.get("http://localhost:8000/readyz")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["warmed_up"] is True
+    prisma_pool = data["pools"]["prisma"]
+    assert set(prisma_pool) == {
+        "limit",
+        "available",
+        "open",
+        "busy",
+        "idle",
+        "waiting_queries",
+        "saturation",
+    }
+    assert prisma_pool["available"] is True
+    assert prisma_pool["limit"] == config.PRISMA_CONNECTION_LIMIT
+    assert 0 <= prisma_pool["busy"] <= prisma_pool["open"] <= prisma_pool["limit"]
+    assert prisma_pool["saturation"] == round(prisma_pool["busy"] / prisma_pool["limit"], 3)
@@ -0,0 +1,30 @@
+"""Tests for the benchmark report and baseline comparison."""
+from benchmarks.http_bench import compare, percentile, summarize
+
+
+def test_percentiles_use_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
+
+
+def test_summary_reports_throughput_in_requests_per_second():
+    summary = summarize([0.01] * 100, errors=2, elapsed=0.5)
+
+    assert summary["throughput_rps"] == 200
+    assert summary["p95_ms"] == 10
+    assert summary["errors"] == 2
+
+
+def test_compare_flags_slower_p95_and_lower_throughput():
+    baseline = {"scenarios": {"belief.get": {"10": summarize([0.01] * 100, 0, 1.0)}}}
+    same = {"scenarios": {"belief.get": {"10": summarize([0.0105] * 100, 0, 1.05)}}}
+    slower = {"scenarios": {"belief.get": {"10": summarize([0.02] * 100, 0, 2.0)}}}
+
+    assert compare(same, baseline, tolerance=0.1) == []
+    regressions = compare(slower, baseline, tolerance=0.1)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("belief.get @ 10: p95")
@@ -0,0 +1,37 @@
+"""Tests for the event loop lag monitor."""
+import asyncio
+import sys
+import time
+
+import pytest
+
+from attributions_wiki.loop_monitor import LoopMonitor, describe_stack
+
+
+def blocking_handler() -> dict:
+    scope = {"type": "http", "method": "GET", "path": "/beliefs/get_all"}  # noqa: F841
+    return describe_stack(sys._getframe())
+
+
+def test_describe_stack_finds_the_request_scope():
+    report = blocking_handler()
+
+    assert report["route"] == "/beliefs/get_all"
+    assert report["method"] == "GET"
+    assert "blocking_handler" in report["stack"]
+
+
+@pytest.mark.asyncio()
+async def test_blocking_the_loop_is_reported():
+    monitor = LoopMonitor(interval=0.01, threshold_ms=50)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    time.sleep(0.3)  # noqa: ASYNC251 - blocks the event loop on purpose
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    (event,) = monitor.events
+    assert event["blocked_ms"] >= 50
+    assert "test_blocking_the_loop_is_reported" in event["stack"]
+    monitor.collect()
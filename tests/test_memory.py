@@ -0,0 +1,59 @@
+"""Tests for memory accounting."""
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki import memory
+from attributions_wiki.memory import MemorySamplingMiddleware, SnapshotStore
+
+
+@pytest.fixture()
+def tracing():
+    memory.start_tracing(5)
+    yield
+    memory.stop_tracing()
+
+
+def test_snapshot_diff_shows_what_grew(tracing):
+    store = SnapshotStore(keep=2)
+    base = store.take()
+    hoard = [bytes(1024) for _ in range(1000)]
+    target = store.take()
+
+    (biggest, *_) = memory.diff_allocations(store.get(base), store.get(target), limit=5)
+    assert biggest["bytes_diff"] >= 1000 * 1024
+    assert "test_memory.py" in biggest["where"]
+    assert len(hoard) == 1000
+
+    store.take()
+    assert [snapshot["name"] for snapshot in store.list()] == ["s2", "s3"]
+
+
+def test_snapshots_need_tracing():
+    with pytest.raises(RuntimeError):
+        SnapshotStore().take()
+
+
+def test_peak_allocation_is_recorded_by_route(tracing):
+    app = FastAPI()
+
+    @app.get("/beliefs/{belief_id}")
+    async def belief(belief_id: int) -> int:
+        return len([bytes(1024) for _ in range(500)]) + belief_id
+
+    with TestClient(MemorySamplingMiddleware(app, sample_rate=1.0)) as client:
+        client.get("/beliefs/1")
+
+    series = memory.peak_alloc.values[("/beliefs/{belief_id}",)]
+    assert series[-1] == 1
+    assert series[-2] >= 500 * 1024
+
+
+def test_cache_sizes_are_tracked():
+    entries = {"a": 1, "b": 2}
+    memory.track_size("test_cache", lambda: len(entries))
+
+    assert memory.cache_sizes()["test_cache"] == 2
+    assert memory.rss_bytes() > 0
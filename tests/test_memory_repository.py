@@ -0,0 +1,116 @@
+"""Tests for the in-memory repository backend."""
+import pytest
+
+from attributions_wiki.repositories.base import Repositories
+from attributions_wiki.repositories.memory_repository import create_memory_repositories
+from prisma.errors import (
+    ForeignKeyViolationError,
+    MissingRequiredValueError,
+    RecordNotFoundError,
+    UniqueViolationError,
+)
+
+ATTRIBUTION = {"locus": "INTERNAL", "stability": "STABLE", "controllability": "CONTROLLABLE"}
+
+
+@pytest.fixture()
+def repos() -> Repositories:
+    return create_memory_repositories()
+
+
+@pytest.mark.asyncio()
+async def test_rows_get_ids_timestamps_and_pages_in_id_order(repos: Repositories):
+    created = [await repos.belief.create({"description": f"b{n}"}) for n in range(5)]
+
+    assert [belief.id for belief in created] == [1, 2, 3, 4, 5]
+    assert created[0].created_at.tzinfo is not None
+    assert created[0].created_at.microsecond % 1000 == 0
+    page = await repos.belief.find_many(take=2, skip=1)
+    assert [belief.description for belief in page] == ["b1", "b2"]
+    after = await repos.belief.find_many(take=2, after=3)
+    assert [belief.id for belief in after] == [4, 5]
+    assert await repos.belief.find_unique({"id": 42}) is None
+
+
+@pytest.mark.asyncio()
+async def test_missing_values_raise_like_prisma(repos: Repositories):
+    with pytest.raises(MissingRequiredValueError):
+        await repos.belief.create({})
+    with pytest.raises(MissingRequiredValueError):
+        await repos.attribution.create({"locus": "INTERNAL"})
+
+
+@pytest.mark.asyncio()
+async def test_update_and_delete_of_missing_rows_return_none(repos: Repositories):
+    belief = await repos.belief.create({"description": "before"})
+
+    updated = await repos.belief.update({"id": belief.id}, {"description": "after"})
+    assert updated is not None
+    assert updated.description == "after"
+    assert updated.updated_at >= belief.updated_at
+    assert await repos.belief.update({"id": 99}, {"description": "x"}) is None
+    assert await repos.belief.delete({"id": belief.id}) is not None
+    assert await repos.belief.delete({"id": belief.id}) is None
+
+
+@pytest.mark.asyncio()
+async def test_links_are_indexed_both_ways_and_dropped_on_delete(repos: Repositories):
+    first = await repos.belief.create({"description": "first"})
+    second = await repos.belief.create({"description": "second"})
+    attribution = await repos.attribution.create(
+        {**ATTRIBUTION, "belief": {"connect": [{"id": second.id}, {"id": first.id}]}}
+    )
+
+    beliefs = await repos.attribution.beliefs_of({"id": attribution.id})
+    assert [belief.id for belief in beliefs] == [first.id, second.id]
+    linked = await repos.belief.attributions_of({"id": first.id})
+    assert [row.id for row in linked] == [attribution.id]
+
+    await repos.belief.delete({"id": first.id})
+    beliefs = await repos.attribution.beliefs_of({"id": attribution.id})
+    assert [belief.id for belief in beliefs] == [second.id]
+
+    with pytest.raises(RecordNotFoundError):
+        await repos.belief.create(
+            {"description": "x", "attribution": {"connect": [{"id": 99}]}}
+        )
+
+
+@pytest.mark.asyncio()
+async def test_factor_foreign_keys_are_unique_and_cleared_on_delete(repos: Repositories):
+    belief = await repos.belief.create({"description": "belief"})
+    factor = await repos.factor.create({"description": "factor", "beliefId": belief.id})
+
+    with pytest.raises(UniqueViolationError):
+        await repos.factor.create({"description": "again", "beliefId": belief.id})
+    with pytest.raises(ForeignKeyViolationError):
+        await repos.factor.create({"description": "dangling", "beliefId": 99})
+    assert (await repos.factor.find_unique({"beliefId": belief.id})).id == factor.id  # type: ignore
+
+    await repos.belief.delete({"id": belief.id})
+    cleared = await repos.factor.find_unique({"id": factor.id})
+    assert cleared is not None
+    assert cleared.beliefId is None
+
+
+@pytest.mark.asyncio()
+async def test_users_are_unique_by_email(repos: Repositories):
+    user = await repos.user.create({"email": "a@example.com", "password": "hash"})
+
+    assert user.role == "USER"
+    assert not user.disabled
+    found = await repos.user.find_unique({"email": "a@example.com"})
+    assert found is not None
+    assert found.id == user.id
+    with pytest.raises(UniqueViolationError):
+        await repos.user.create({"email": "a@example.com", "password": "other"})
+
+
+@pytest.mark.asyncio()
+async def test_returned_rows_are_copies(repos: Repositories):
+    belief = await repos.belief.create({"description": "original"})
+    belief.description = "changed"
+
+    stored = await repos.belief.find_unique({"id": belief.id})
+    assert stored is not None
+    assert stored.description == "original"
@@ -0,0 +1,83 @@
+"""Tests for the metrics collectors and instrumentation."""
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from attributions_wiki.exceptions import NotFoundError
+from attributions_wiki.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    exceptions_raised,
+    http_request_duration,
+    instrument,
+    registry,
+    service_calls,
+)
+from attributions_wiki.routers.ops import metrics_router  # noqa: F401 - registers its metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1.0' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2.0' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3.0' in lines
+    assert 'test_seconds_count{route="/a"} 3.0' in lines
+
+
+def test_requests_are_labeled_by_route_template_and_status():
+    app = FastAPI()
+
+    @app.get("/thing/get/{id}")
+    async def get_thing(id: int) -> dict[str, int]:
+        if id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": id}
+
+    client = TestClient(MetricsMiddleware(app))
+    client.get("/thing/get/1")
+    client.get("/thing/get/2")
+    client.get("/thing/get/0")
+    assert http_request_duration.values[("GET", "/thing/get/{id}", "200")][-1] == 2
+    assert http_request_duration.values[("GET", "/thing/get/{id}", "404")][-1] == 1
+
+
+@pytest.mark.asyncio()
+async def test_instrumented_service_counts_outcomes_and_exceptions():
+    @instrument
+    async def find_thing(found: bool) -> str:
+        if not found:
+            raise NotFoundError("missing")
+        return "thing"
+
+    before = exceptions_raised.values[("NotFoundError",)]
+    assert await find_thing(True) == "thing"
+    with pytest.raises(NotFoundError):
+        await find_thing(False)
+    assert service_calls.values[("find_thing", "ok")] == 1
+    assert service_calls.values[("find_thing", "NotFoundError")] == 1
+    assert exceptions_raised.values[("NotFoundError",)] == before + 1
+
+
+def test_every_app_exception_is_exported():
+    rendered = registry.render()
+    for name in ("DatabaseError", "DeadlineExceededError", "OverloadedError", "UserNotFoundError"):
+        assert f'app_exceptions_total{{exception="{name}"}}' in rendered
+
+
+def test_admission_and_deadline_totals_are_counters():
+    rendered = registry.render().splitlines()
+
+    assert "# TYPE admission_requests_total counter" in rendered
+    assert 'admission_requests_total{outcome="admitted"}' in " ".join(rendered)
+    assert "# TYPE admission_queue_seconds_total counter" in rendered
+    assert "# TYPE deadline_events_total counter" in rendered
+    gauges = [line for line in rendered if line.startswith("admission_requests{")]
+    assert sorted(line.split("}")[0] for line in gauges) == [
+        'admission_requests{state="in_flight"',
+        'admission_requests{state="queued"',
+    ]
+    assert "# TYPE admission_limit gauge" in rendered
@@ -0,0 +1,71 @@
+"""Tests for on-demand request profiling."""
+import os
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki import profiling
+from attributions_wiki.profiling import ProfilingMiddleware
+from attributions_wiki.tracing import TracingMiddleware
+
+
+def make_app(profile_dir: Path, keep: int = 100) -> TracingMiddleware:
+    app = FastAPI()
+
+    @app.get("/beliefs")
+    async def beliefs() -> list[int]:
+        return [1, 2, 3]
+
+    return TracingMiddleware(ProfilingMiddleware(app, str(profile_dir), keep))
+
+
+def test_requests_without_the_header_are_not_profiled(tmp_path: Path):
+    with TestClient(make_app(tmp_path)) as client:
+        response = client.get("/beliefs")
+
+    assert response.json() == [1, 2, 3]
+    assert "x-profile-id" not in response.headers
+
+
+def test_profiling_requires_a_token(tmp_path: Path):
+    with TestClient(make_app(tmp_path)) as client:
+        response = client.get("/beliefs", headers={"X-Profile": "cprofile"})
+
+    assert response.status_code == 401
+    assert not any(tmp_path.iterdir())
+
+
+def test_admin_profile_is_stored_under_the_request_id(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    async def admin(scope):
+        return None
+
+    monkeypatch.setattr(profiling, "_authorize", admin)
+    with TestClient(make_app(tmp_path)) as client:
+        response = client.get("/beliefs?profile=cprofile", headers={"X-Request-ID": "req1"})
+        inline = client.get(
+            "/beliefs", headers={"X-Profile": "cprofile", "X-Profile-Output": "inline"}
+        )
+
+    assert response.json() == [1, 2, 3]
+    assert response.headers["x-profile-id"] == "req1.prof"
+    assert (tmp_path / "req1.prof").stat().st_size > 0
+    assert "function calls" in inline.text
+
+
+def test_only_the_newest_profiles_are_kept(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    async def admin(scope):
+        return None
+
+    monkeypatch.setattr(profiling, "_authorize", admin)
+    for name, modified in [("old.prof", 200), ("older.html", 100)]:
+        (tmp_path / name).write_bytes(b"")
+        os.utime(tmp_path / name, (modified, modified))
+    (tmp_path / "notes.txt").write_text("not a profile")
+    with TestClient(make_app(tmp_path, keep=2)) as client:
+        client.get("/beliefs?profile=cprofile", headers={"X-Request-ID": "new"})
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["new.prof", "notes.txt", "old.prof"]
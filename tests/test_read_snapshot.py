@@ -0,0 +1,166 @@
+"""Tests for the in-process read snapshot."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki.read_snapshot import (
+    ReadEngine,
+    Snapshot,
+    SnapshotVersionMiddleware,
+    Table,
+)
+from attributions_wiki.repositories.base import Repositories
+from attributions_wiki.repositories.memory_repository import create_memory_repositories
+
+ATTRIBUTION = {"locus": "INTERNAL", "stability": "STABLE", "controllability": "CONTROLLABLE"}
+
+
+@pytest.fixture()
+def backend() -> Repositories:
+    return create_memory_repositories()
+
+
+@pytest.fixture()
+def engine() -> ReadEngine:
+    return ReadEngine(reload_seconds=0)
+
+
+@pytest.mark.asyncio()
+async def test_reads_come_from_the_snapshot_once_loaded(
+    backend: Repositories, engine: ReadEngine
+):
+    repos = engine.wrap(backend)
+    await backend.belief.create({"description": "before load"})
+    assert [b.description for b in await repos.belief.find_many()] == ["before load"]
+
+    await engine.load()
+    # Written behind the engine's back, so only a reload picks it up
+    hidden = await backend.belief.create({"description": "hidden"})
+    assert await repos.belief.find_unique({"id": hidden.id}) is None
+    assert len(await repos.belief.find_many()) == 1
+
+    await engine.load()
+    assert (await repos.belief.find_unique({"id": hidden.id})) is not None
+    assert engine.version == 2
+
+
+@pytest.mark.asyncio()
+async def test_writes_are_applied_to_the_snapshot(backend: Repositories, engine: ReadEngine):
+    repos = engine.wrap(backend)
+    await engine.load()
+
+    belief = await repos.belief.create({"description": "belief"})
+    attribution = await repos.attribution.create(
+        {**ATTRIBUTION, "belief": {"connect": [{"id": belief.id}]}}
+    )
+    factor = await repos.factor.create({"description": "factor", "beliefId": belief.id})
+
+    assert [a.id for a in await repos.belief.attributions_of({"id": belief.id})] == [
+        attribution.id
+    ]
+    assert [b.id for b in await repos.attribution.beliefs_of({"id": attribution.id})] == [
+        belief.id
+    ]
+    assert (await repos.factor.find_unique({"beliefId": belief.id})).id == factor.id  # type: ignore
+
+    await repos.belief.update({"id": belief.id}, {"description": "renamed"})
+    assert (await repos.belief.find_unique({"id": belief.id})).description == "renamed"  # type: ignore
+
+    version = engine.version
+    await repos.belief.delete({"id": belief.id})
+    assert engine.version == version + 1
+    assert await repos.belief.find_unique({"id": belief.id}) is None
+    assert await repos.attribution.beliefs_of({"id": attribution.id}) == []
+    assert (await repos.factor.find_unique({"id": factor.id})).beliefId is None  # type: ignore
+
+
+@pytest.mark.asyncio()
+async def test_changes_made_during_a_reload_are_replayed(
+    backend: Repositories, engine: ReadEngine
+):
+    repos = engine.wrap(backend)
+    await engine.load()
+    find_many = backend.belief.find_many
+    written: list[int] = []
+
+    async def slow_find_many(*args, **kwargs):
+        rows = await find_many(*args, **kwargs)
+        # A write lands after the reload has read the table
+        written.append((await repos.belief.create({"description": "late"})).id)
+        return rows
+
+    backend.belief.find_many = slow_find_many  # type: ignore[method-assign]
+    await engine.load()
+
+    assert await repos.belief.find_unique({"id": written[0]}) is not None
+
+
+@pytest.mark.asyncio()
+async def test_writes_during_the_first_load_are_replayed(
+    backend: Repositories, engine: ReadEngine
+):
+    repos = engine.wrap(backend)
+    find_many = backend.belief.find_many
+    reading = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def blocked_find_many(*args, **kwargs):
+        rows = await find_many(*args, **kwargs)
+        reading.set()
+        await resume.wait()
+        return rows
+
+    backend.belief.find_many = blocked_find_many  # type: ignore[method-assign]
+    load = asyncio.create_task(engine.load())
+    await reading.wait()
+    # No snapshot yet, so this goes to the backend the load has already read
+    belief = await repos.belief.create({"description": "during load"})
+    resume.set()
+    await load
+
+    assert engine.snapshot is not None
+    assert (await repos.belief.find_unique({"id": belief.id})) is not None
+
+
+def test_table_pages_and_keeps_newer_rows():
+    class Row:
+        def __init__(self, id: int, updated_at: int) -> None:
+            self.id = id
+            self.updated_at = updated_at
+
+    table = Table([Row(3, 1), Row(1, 1)])
+    table.put(Row(2, 1))
+    assert [row.id for row in table.page(take=2, skip=1)] == [2, 3]
+    assert [row.id for row in table.page(take=1, after=1)] == [2]
+
+    table.put(Row(2, 5))
+    table.put(Row(2, 4))
+    assert table.rows[2].updated_at == 5
+    table.drop(2)
+    assert list(table.ids) == [1, 3]
+
+
+def test_links_are_indexed_both_ways():
+    snapshot = Snapshot([], [], [], [(1, 10), (1, 11), (2, 10)])
+
+    snapshot.set_links("Belief", 1, [11, 12])
+    assert snapshot.links["Belief"][1] == (11, 12)
+    assert snapshot.links["Attribution"][10] == (2,)
+    assert snapshot.links["Attribution"][12] == (1,)
+
+
+def test_responses_carry_the_snapshot_version(engine: ReadEngine, backend: Repositories):
+    app = FastAPI()
+
+    @app.get("/")
+    async def index() -> dict[str, bool]:
+        return {"ok": True}
+
+    client = TestClient(SnapshotVersionMiddleware(app, engine))
+    assert "x-snapshot-version" not in client.get("/").headers
+
+    engine.wrap(backend)
+    asyncio.run(engine.load())
+    assert client.get("/").headers["x-snapshot-version"] == "1"
@@ -0,0 +1,100 @@
+"""Tests for read-replica routing."""
+import math
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from attributions_wiki import db as database
+from attributions_wiki.routing import (
+    STICKY_COOKIE,
+    ReplicaRoutingMiddleware,
+    reader,
+    replica_lag_monitor,
+)
+
+
+class FakeReplica:
+    """Stands in for a connected replica Prisma client."""
+
+    def is_connected(self) -> bool:
+        return True
+
+
+@pytest.fixture()
+def replica(monkeypatch: pytest.MonkeyPatch) -> FakeReplica:
+    fake = FakeReplica()
+    monkeypatch.setattr(database, "replica_db", fake)
+    monkeypatch.setattr(replica_lag_monitor, "lag_seconds", 0.0)
+    return fake
+
+
+@pytest.fixture()
+def routed_client(replica: FakeReplica) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/read")
+    async def read() -> dict[str, bool]:
+        return {"replica": reader() is replica}
+
+    @app.post("/write")
+    async def write() -> dict[str, bool]:
+        database.writer()
+        return {"replica": reader() is replica}
+
+    @app.post("/failed-write")
+    async def failed_write() -> None:
+        database.writer()
+        raise HTTPException(status_code=409)
+
+    @app.post("/signin")
+    async def signin() -> dict[str, bool]:
+        return {"replica": reader() is replica}
+
+    return TestClient(ReplicaRoutingMiddleware(app, sticky_seconds=30))
+
+
+def test_reads_go_to_healthy_replica(replica: FakeReplica):
+    assert reader() is replica
+
+
+def test_lagging_replica_falls_back_to_primary(replica: FakeReplica):
+    replica_lag_monitor.lag_seconds = replica_lag_monitor.max_lag + 1
+    assert reader() is database.db
+    replica_lag_monitor.lag_seconds = math.inf
+    assert reader() is database.db
+
+
+def test_no_replica_reads_from_primary(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(database, "replica_db", None)
+    assert reader() is database.db
+
+
+def test_writes_pin_client_to_primary(routed_client: TestClient):
+    assert routed_client.get("/read").json() == {"replica": True}
+
+    response = routed_client.post("/write")
+    assert response.json() == {"replica": False}
+    assert STICKY_COOKIE in response.cookies
+
+    # The client now carries the cookie and reads its own writes from the primary
+    assert routed_client.get("/read").json() == {"replica": False}
+
+
+def test_only_successful_writes_pin_client_to_primary(routed_client: TestClient):
+    signin = routed_client.post("/signin")
+    # The request itself still reads from the primary
+    assert signin.json() == {"replica": False}
+    assert STICKY_COOKIE not in signin.cookies
+
+    failed = routed_client.post("/failed-write")
+    assert failed.status_code == 409
+    assert STICKY_COOKIE not in failed.cookies
+
+    assert routed_client.get("/read").json() == {"replica": True}
+
+
+def test_expired_sticky_cookie_reads_from_replica(routed_client: TestClient):
+    routed_client.cookies.set(STICKY_COOKIE, str(time.time() - 1))
+    assert routed_client.get("/read").json() == {"replica": True}
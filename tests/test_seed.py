@@ -0,0 +1,43 @@
+"""Tests for the synthetic dataset generator."""
+from collections import Counter
+
+from benchmarks.seed import Plan, attributions, beliefs, factors, links, unnest_insert
+
+
+def test_same_seed_same_rows():
+    plan = Plan(beliefs=200, attributions=100, factors=50, seed=7)
+
+    assert list(beliefs(plan)) == list(beliefs(plan))
+    assert list(links(plan)) == list(links(plan))
+    assert list(links(plan)) != list(links(Plan(200, 100, 50, seed=8)))
+
+
+def test_rows_respect_the_schema_constraints():
+    plan = Plan(beliefs=2000, attributions=500, factors=800, first_belief=11, first_attribution=21)
+    pairs = list(links(plan))
+    factor_rows = list(factors(plan))
+
+    assert len(set(pairs)) == len(pairs)
+    assert {b for _, b in pairs} == set(range(11, 2011))
+    assert all(21 <= a < 521 for a, _ in pairs)
+    for column in (4, 5):
+        used = [row[column] for row in factor_rows if row[column] is not None]
+        assert len(set(used)) == len(used)
+
+
+def test_distributions_are_skewed():
+    plan = Plan(beliefs=5000, attributions=1000, factors=0, mean_fan_out=2.0)
+    pairs = list(links(plan))
+    loci = Counter(row[3] for row in attributions(plan))
+    popularity = Counter(a for a, _ in pairs).most_common()
+
+    assert 1.8 < len(pairs) / plan.beliefs < 2.2
+    assert loci["INTERNAL"] > 2 * loci["EXTERNAL"]
+    assert popularity[0][1] > 20 * popularity[len(popularity) // 2][1]
+
+
+def test_unnest_insert_casts_every_column():
+    assert unnest_insert("_BeliefAttribution") == (
+        'INSERT INTO "_BeliefAttribution" ("A", "B") '
+        "SELECT * FROM unnest($1::int4[], $2::int4[])"
+    )
@@ -0,0 +1,28 @@
+"""Tests for the production server settings."""
+import pytest
+
+pytest.importorskip("gunicorn")
+
+from attributions_wiki.server import Worker, gunicorn_options, parse_args
+
+
+def test_command_line_overrides_the_configured_settings():
+    options = gunicorn_options(
+        parse_args(["serve", "--port", "9000", "--workers", "3", "--max-requests", "50"])
+    )
+
+    assert options["bind"] == ["0.0.0.0:9000"]
+    assert options["workers"] == 3
+    assert options["max_requests"] == 50
+    assert options["preload_app"] is True
+    assert options["worker_class"] is Worker
+    assert gunicorn_options(parse_args(["serve", "--no-preload"]))["preload_app"] is False
+
+
+def test_workers_pick_the_fastest_installed_loop_and_parser():
+    uvloop = pytest.importorskip("uvloop")
+    pytest.importorskip("httptools")
+
+    assert uvloop is not None
+    assert Worker.CONFIG_KWARGS["loop"] == "uvloop"
+    assert Worker.CONFIG_KWARGS["http"] == "httptools"
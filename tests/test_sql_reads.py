@@ -0,0 +1,117 @@
+"""Parity tests between the Prisma reads and the asyncpg read pool."""
+import os
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+
+from attributions_wiki.db import asyncpg_dsn
+from attributions_wiki.services import sql_reads
+from prisma import Prisma
+
+asyncpg = pytest.importorskip("asyncpg")
+
+TEST_DB_DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DB_DSN, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest_asyncio.fixture()
+async def clients() -> AsyncGenerator[tuple[Prisma, Any], None]:
+    """Connect a Prisma client and an asyncpg pool to the same test database."""
+    prisma = Prisma(datasource={"url": TEST_DB_DSN})  # type: ignore
+    await prisma.connect()
+    pool = await asyncpg.create_pool(
+        asyncpg_dsn(TEST_DB_DSN),  # type: ignore
+        min_size=1,
+        max_size=2,
+        init=sql_reads.prepare_hot_statements,
+    )
+    yield prisma, pool
+    await pool.close()
+    await prisma.disconnect()
+
+
+@pytest_asyncio.fixture()
+async def linked_rows(clients: tuple[Prisma, Any]) -> AsyncGenerator[dict[str, int], None]:
+    """Create a belief linked to an attribution, plus a factor on each."""
+    prisma, _ = clients
+    belief = await prisma.belief.create({"description": "Parity Belief"})
+    attribution = await prisma.attribution.create(
+        {
+            "locus": "INTERNAL",
+            "stability": "STABLE",
+            "controllability": "CONTROLLABLE",
+            "reason": "Parity",
+            "belief": {"connect": [{"id": belief.id}]},
+        }
+    )
+    factor = await prisma.factor.create(
+        {"description": "Parity Factor", "beliefId": belief.id, "attributionId": attribution.id}
+    )
+    yield {"belief": belief.id, "attribution": attribution.id, "factor": factor.id}
+    await prisma.factor.delete(where={"id": factor.id})
+    await prisma.attribution.delete(where={"id": attribution.id})
+    await prisma.belief.delete(where={"id": belief.id})
+
+
+def _dump(records: Any) -> Any:
+    if records is None:
+        return None
+    if isinstance(records, list):
+        return [record.model_dump() for record in records]
+    return records.model_dump()
+
+
+@pytest.mark.asyncio()
+async def test_by_id_parity(clients: tuple[Prisma, Any], linked_rows: dict[str, int]):
+    prisma, pool = clients
+    assert _dump(await sql_reads.fetch_belief_by_id(pool, linked_rows["belief"])) == _dump(
+        await prisma.belief.find_unique(where={"id": linked_rows["belief"]})
+    )
+    assert _dump(
+        await sql_reads.fetch_attribution_by_id(pool, linked_rows["attribution"])
+    ) == _dump(await prisma.attribution.find_unique(where={"id": linked_rows["attribution"]}))
+    assert _dump(await sql_reads.fetch_factor_by_id(pool, linked_rows["factor"])) == _dump(
+        await prisma.factor.find_unique(where={"id": linked_rows["factor"]})
+    )
+    assert await sql_reads.fetch_belief_by_id(pool, -1) is None
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize(("take", "skip"), [(None, None), (1, 0), (2, 1)])
+async def test_paginated_list_parity(
+    clients: tuple[Prisma, Any], linked_rows: dict[str, int], take: int | None, skip: int | None
+):
+    prisma, pool = clients
+    order: Any = {"id": "asc"}
+    assert _dump(await sql_reads.fetch_beliefs(pool, take, skip)) == _dump(
+        await prisma.belief.find_many(take=take, skip=skip, order=order)
+    )
+    assert _dump(await sql_reads.fetch_attributions(pool, take, skip)) == _dump(
+        await prisma.attribution.find_many(take=take, skip=skip, order=order)
+    )
+    assert _dump(await sql_reads.fetch_factors(pool, take, skip)) == _dump(
+        await prisma.factor.find_many(take=take, skip=skip, order=order)
+    )
+
+
+@pytest.mark.asyncio()
+async def test_keyset_page_parity(clients: tuple[Prisma, Any], linked_rows: dict[str, int]):
+    prisma, pool = clients
+    after = linked_rows["belief"] - 1
+    assert _dump(await sql_reads.fetch_beliefs(pool, 1, after=after)) == _dump(
+        await prisma.belief.find_many(take=1, where={"id": {"gt": after}}, order={"id": "asc"})
+    )
+
+
+@pytest.mark.asyncio()
+async def test_relation_join_parity(clients: tuple[Prisma, Any], linked_rows: dict[str, int]):
+    prisma, pool = clients
+    attributions = await sql_reads.fetch_attributions_for_belief(pool, linked_rows["belief"])
+    assert _dump(attributions) == _dump(
+        await prisma.attribution.find_many(
+            where={"belief": {"some": {"id": linked_rows["belief"]}}}, order={"id": "asc"}
+        )
+    )
+    beliefs = await sql_reads.fetch_beliefs_for_attribution(pool, linked_rows["attribution"])
+    assert [belief.id for belief in beliefs] == [linked_rows["belief"]]
@@ -0,0 +1,28 @@
+"""Tests for the conditional write statements."""
+from attributions_wiki.services.sql_writes import (
+    conditional_delete,
+    conditional_update,
+    scalar_values,
+)
+
+
+def test_updates_check_the_version_in_their_where_clause():
+    statement = conditional_update("Attribution", ["locus", "reason"])
+
+    assert statement.startswith('UPDATE "Attribution" SET "locus" = $1::"Locus", "reason" = $2::text')
+    assert "WHERE \"id\" = $3 AND \"updated_at\" = $4::timestamptz AT TIME ZONE 'UTC'" in statement
+    assert statement.endswith("RETURNING *")
+
+
+def test_factor_statements_check_the_foreign_keys_too():
+    statement = conditional_delete("Factor")
+
+    assert '"beliefId" IS NOT DISTINCT FROM $3::int' in statement
+    assert '"attributionId" IS NOT DISTINCT FROM $4::int' in statement
+
+
+def test_only_plain_column_updates_become_raw_statements():
+    assert scalar_values("Belief", {"description": {"set": "x"}}) == {"description": "x"}
+    assert scalar_values("Factor", {"beliefId": None}) == {"beliefId": None}
+    assert scalar_values("Belief", {"attribution": {"connect": [{"id": 1}]}}) is None
+    assert scalar_values("Belief", {"id": 4}) is None
@@ -0,0 +1,77 @@
+"""Tests for template caching and render metrics."""
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import Request
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from attributions_wiki import templating
+from attributions_wiki.templating import FragmentCache, belief_card, fragments, render
+
+
+def _belief(id: int, description: str, minutes: int = 0) -> SimpleNamespace:
+    created = datetime(2024, 1, 1, tzinfo=UTC)
+    return SimpleNamespace(
+        id=id,
+        description=description,
+        created_at=created,
+        updated_at=created + timedelta(minutes=minutes),
+    )
+
+
+def _lookups(result: str) -> float:
+    return templating.fragment_lookups.values.get(("belief_card", result), 0)
+
+
+def test_cards_are_rendered_once_per_version():
+    fragments.entries.clear()
+    belief = _belief(1, "first")
+    misses = _lookups("miss")
+
+    card = belief_card(belief)
+    assert "first" in card
+    assert belief_card(belief) is card
+    assert _lookups("miss") == misses + 1
+
+    changed = _belief(1, "second", minutes=1)
+    assert "second" in belief_card(changed)
+    assert _lookups("miss") == misses + 2
+
+
+def test_list_responses_reuse_cards_and_record_render_time():
+    fragments.entries.clear()
+    request = Request({"type": "http", "headers": [], "method": "GET", "path": "/"})
+    beliefs = [_belief(1, "a"), _belief(2, "<b>escaped</b>")]
+
+    first = render(request, "belief_list.html", {"beliefs": beliefs})
+    hits = _lookups("hit")
+    second = render(request, "belief_list.html", {"beliefs": beliefs})
+
+    assert first.body == second.body
+    assert b"&lt;b&gt;escaped&lt;/b&gt;" in second.body
+    assert _lookups("hit") == hits + 2
+    assert templating.render_duration.values[("belief_list.html",)][-1] >= 2
+
+
+def test_fragment_cache_evicts_the_least_recently_used():
+    cache = FragmentCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key)  # type: ignore[arg-type]
+    cache.get("a")
+    cache.put("c", "c")  # type: ignore[arg-type]
+
+    assert list(cache.entries) == ["a", "c"]
+    FragmentCache(max_entries=0).put("a", "a")  # type: ignore[arg-type]
+
+
+def test_compiled_templates_are_cached_on_disk(tmp_path):
+    def environment() -> Environment:
+        return Environment(
+            loader=FileSystemLoader("static/templates"),
+            bytecode_cache=FileSystemBytecodeCache(str(tmp_path)),
+        )
+
+    environment().get_template("belief_card.html")
+    assert list(tmp_path.iterdir())
+    # A new environment, as in a new worker, loads the cached code
+    assert environment().get_template("belief_card.html").module.belief_card  # type: ignore
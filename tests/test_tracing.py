@@ -0,0 +1,72 @@
+"""Tests for request tracing and the slow query log."""
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from attributions_wiki import config
+from attributions_wiki.services.db_call import db_call
+from attributions_wiki.tracing import TraceExporter, TracingMiddleware, argument_shape
+
+
+class FakeActions:
+    """Looks like a Prisma model actions object to db_call."""
+
+    _model = type("Belief", (), {})
+
+    async def find_many(self, take: int | None = None, where: dict | None = None) -> list[int]:
+        return [1, 2, 3]
+
+
+def test_argument_shape_hides_values():
+    assert argument_shape({"where": {"id": 5, "description": "secret"}, "take": 10}) == {
+        "where": {"id": "int", "description": "str"},
+        "take": "int",
+    }
+
+
+def test_db_spans_record_operation_shape_and_rows(tmp_path: Path):
+    exporter = TraceExporter("file", str(tmp_path / "traces.jsonl"), "")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Like db.lifespan, so the queue lives on the loop the requests run on
+        exporter.start()
+        yield
+        await exporter.stop()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/beliefs")
+    async def beliefs() -> list[int]:
+        return await db_call(FakeActions().find_many, take=3, where={"id": 1})
+
+    with TestClient(TracingMiddleware(app, exporter)) as client:
+        response = client.get("/beliefs", headers={"X-Request-ID": "abc123"})
+
+    assert response.headers["x-request-id"] == "abc123"
+    trace = json.loads((tmp_path / "traces.jsonl").read_text().splitlines()[0])
+    assert trace["attributes"]["request_id"] == "abc123"
+    assert trace["attributes"]["route"] == "/beliefs"
+    (db_span,) = trace["children"]
+    assert db_span["attributes"] == {
+        "operation": "Belief.find_many",
+        "model": "Belief",
+        "args": {"args": "list[0]", "take": "int", "where": {"id": "int"}},
+        "rows": 3,
+    }
+
+
+@pytest.mark.asyncio()
+async def test_slow_queries_are_logged(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    monkeypatch.setattr(config, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+    with caplog.at_level(logging.WARNING, logger="attributions_wiki.tracing"):
+        await db_call(FakeActions().find_many, take=1)
+    assert "Slow query Belief.find_many" in caplog.text
@@ -0,0 +1,51 @@
+"""Tests for the HTMX views."""
+from collections.abc import Callable
+
+import pytest
+from fastapi import APIRouter
+from fastapi.testclient import TestClient
+
+from attributions_wiki import config
+from attributions_wiki.repositories.base import Repositories
+from attributions_wiki.routers.views import views
+
+in_memory = pytest.mark.parametrize("repos", [(views,)], indirect=True, ids=["memory"])
+
+
+def _card_ids(html: str) -> list[int]:
+    return [int(part.split('"')[0]) for part in html.split('<div id="belief-')[1:]]
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_belief_list_streams_a_page_then_a_sentinel(
+    repos: Repositories,
+    router_client: Callable[[APIRouter], TestClient],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(config, "BELIEF_LIST_PAGE_SIZE", 5)
+    monkeypatch.setattr(config, "BELIEF_LIST_CHUNK_SIZE", 2)
+    client = router_client(views.router)
+    for n in range(7):
+        await repos.belief.create({"description": f"belief {n}"})
+
+    first = client.get("/templates/belief/get_all")
+    assert first.headers["content-type"].startswith("text/html")
+    assert _card_ids(first.text) == [1, 2, 3, 4, 5]
+    assert 'hx-get="/templates/belief/get_all?after=5" hx-trigger="revealed"' in first.text
+
+    rest = client.get("/templates/belief/get_all", params={"after": 5})
+    assert _card_ids(rest.text) == [6, 7]
+    assert "hx-trigger" not in rest.text
+
+
+@in_memory
+@pytest.mark.asyncio()
+async def test_single_belief_view_renders_its_card(
+    repos: Repositories, router_client: Callable[[APIRouter], TestClient]
+):
+    client = router_client(views.router)
+    belief = await repos.belief.create({"description": "only"})
+
+    assert "only" in client.get(f"/templates/belief/get/{belief.id}").text
+    assert client.get("/templates/belief/get/99").status_code == 404